@@ -13,14 +13,26 @@ Key improvements:
 from __future__ import annotations
 
 import asyncio
+import bisect
+import concurrent.futures
+import contextlib
 import json
 import logging
 import os
-from typing import Annotated
+import queue
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime
-from typing import AsyncIterable, List, Optional, Tuple
+from typing import Annotated, Any, AsyncIterable, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from dotenv import load_dotenv
 
 from livekit import agents, rtc, api
@@ -31,9 +43,15 @@ from livekit.agents import (
     RunContext,
     function_tool,
     stt,
+    ChatContext,
     ModelSettings,
+    NOT_GIVEN,
 )
+from livekit.agents.llm import ChatMessage
+from livekit.agents.metrics import EOUMetrics, LLMMetrics
 from livekit.agents.utils import combine_frames
+from livekit.agents.voice import SpeechHandle
+from livekit.agents.voice.io import AudioOutput
 from livekit.agents import RoomInputOptions, RoomOutputOptions
 from livekit.plugins import deepgram, elevenlabs, hedra, openai, silero
 from livekit.plugins import noise_cancellation
@@ -62,6 +80,36 @@ try:
 except Exception:  # pragma: no cover
     REQUESTS_AVAILABLE = False
 
+try:  # psutil for process memory (RSS) reporting
+    import psutil
+    PSUTIL_AVAILABLE = True
+except Exception:  # pragma: no cover
+    PSUTIL_AVAILABLE = False
+    psutil = None
+
+try:  # tiktoken for exact prompt token counts (falls back to a character estimate)
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except Exception:  # pragma: no cover
+    TIKTOKEN_AVAILABLE = False
+    tiktoken = None
+
+try:  # fcntl for the cross-process admission lock (POSIX only)
+    import fcntl
+    FCNTL_AVAILABLE = True
+except Exception:  # pragma: no cover
+    FCNTL_AVAILABLE = False
+    fcntl = None
+
+try:  # silero plugin internals, only for the opt-in shared VAD batcher (see vad_batching_supported)
+    from importlib.metadata import version as _package_version
+    from livekit.plugins.silero import onnx_model as silero_onnx
+    from livekit.plugins.silero.vad import _VADOptions as SileroVADOptions
+    SILERO_VERSION = _package_version("livekit-plugins-silero")
+except Exception:  # pragma: no cover
+    SILERO_VERSION = None
+    silero_onnx = SileroVADOptions = None
+
 load_dotenv(".env.local")
 
 
@@ -110,11 +158,132 @@ class Config:
             return "http://localhost:3000/api/avatar-state"
     poll_interval_secs: float = float(os.getenv("POLL_INTERVAL_SECS", 3))
 
+    # Shared state directory for job processes and the worker (session registry, etc.)
+    state_dir: str = os.getenv(
+        "AGENT_STATE_DIR", os.path.join(tempfile.gettempdir(), "livekit-avatar-agent")
+    )
+    registry_stale_secs: float = float(os.getenv("REGISTRY_STALE_SECS", 30))
+    # The worker this process belongs to; set by __main__ so job processes inherit it
+    worker_pid: int = int(os.getenv("AGENT_WORKER_PID", os.getpid()))
+
+    # Memory instrumentation
+    memory_tracemalloc: bool = os.getenv("MEMORY_TRACEMALLOC", "0") == "1"  # allocation-site tracing (adds overhead)
+    memory_snapshot_interval_secs: float = float(os.getenv("MEMORY_SNAPSHOT_INTERVAL_SECS", 30))
+    memory_top_n: int = int(os.getenv("MEMORY_TOP_N", 5))
+    memory_trace_frames: int = int(os.getenv("MEMORY_TRACE_FRAMES", 1))
+    worker_memory_budget_mb: float = float(os.getenv("WORKER_MEMORY_BUDGET_MB", 2048))
+
+    # Worker load: each signal is scaled against its capacity; the dispatcher stops sending
+    # jobs once the highest one reaches load_threshold
+    load_threshold: float = float(os.getenv("LOAD_THRESHOLD", 0.7))
+    load_publish_interval_secs: float = float(os.getenv("LOAD_PUBLISH_INTERVAL_SECS", 2))
+    load_max_loop_lag_ms: float = float(os.getenv("LOAD_MAX_LOOP_LAG_MS", 200))
+    load_max_sessions: int = int(os.getenv("LOAD_MAX_SESSIONS", 10))
+    load_max_avatar_sessions: int = int(os.getenv("LOAD_MAX_AVATAR_SESSIONS", 4))
+    load_max_media_jobs: int = int(os.getenv("LOAD_MAX_MEDIA_JOBS", 6))
+
+    # Admission control shared by every worker on the host (0 = unlimited). Each admitted session
+    # holds one of each for its whole lifetime, so these are concurrent-session limits
+    admission_max_hedra: int = int(os.getenv("ADMISSION_MAX_HEDRA", 4))
+    admission_max_clones: int = int(os.getenv("ADMISSION_MAX_CLONES", 10))
+    admission_max_tts: int = int(os.getenv("ADMISSION_MAX_TTS", 16))
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", 8))  # longer queues reject new jobs
+    admission_max_wait_secs: float = float(os.getenv("ADMISSION_MAX_WAIT_SECS", 120))
+    admission_poll_secs: float = float(os.getenv("ADMISSION_POLL_SECS", 1))
+
+    # Keep a session's state this long after the user drops, in case they reconnect (0 = close at once)
+    resume_grace_secs: float = float(os.getenv("RESUME_GRACE_SECS", 60))
+
+    # Orphaned voice GC (worker process): clones no live session owns, older than the age floor.
+    # It only sees sessions in this state_dir, so it reports instead of deleting unless told it
+    # sees them all: a single host, or AGENT_STATE_DIR on storage every host shares
+    voice_gc_enabled: bool = os.getenv("VOICE_GC", "1") == "1"
+    voice_gc_dry_run: bool = os.getenv("VOICE_GC_DRY_RUN", "1") == "1"
+    voice_gc_interval_secs: float = float(os.getenv("VOICE_GC_INTERVAL_SECS", 600))
+    voice_gc_min_age_secs: float = float(os.getenv("VOICE_GC_MIN_AGE_SECS", 3600))
+    voice_gc_batch_size: int = int(os.getenv("VOICE_GC_BATCH_SIZE", 5))
+    voice_gc_batch_pause_secs: float = float(os.getenv("VOICE_GC_BATCH_PAUSE_SECS", 2))
+    voice_gc_max_per_run: int = int(os.getenv("VOICE_GC_MAX_PER_RUN", 50))
+
+    # Drain on SIGTERM: stop taking jobs, let conversations finish until the deadline, then clean up
+    drain_timeout_secs: float = float(os.getenv("DRAIN_TIMEOUT_SECS", 900))
+    drain_cleanup_margin_secs: float = float(os.getenv("DRAIN_CLEANUP_MARGIN_SECS", 30))
+    drain_log_interval_secs: float = float(os.getenv("DRAIN_LOG_INTERVAL_SECS", 10))
+
+    # Avatar health: restart the Hedra avatar when its video stalls, with exponential backoff
+    avatar_health_enabled: bool = os.getenv("AVATAR_HEALTH", "1") == "1"
+    avatar_stall_secs: float = float(os.getenv("AVATAR_STALL_SECS", 3))
+    avatar_start_grace_secs: float = float(os.getenv("AVATAR_START_GRACE_SECS", 15))
+    avatar_restart_backoff_secs: float = float(os.getenv("AVATAR_RESTART_BACKOFF_SECS", 5))
+    avatar_restart_backoff_max_secs: float = float(os.getenv("AVATAR_RESTART_BACKOFF_MAX_SECS", 120))
+    avatar_restart_max: int = int(os.getenv("AVATAR_RESTART_MAX", 5))  # consecutive, before giving up
+    avatar_healthy_reset_secs: float = float(os.getenv("AVATAR_HEALTHY_RESET_SECS", 60))
+    avatar_handover_timeout_secs: float = float(os.getenv("AVATAR_HANDOVER_TIMEOUT_SECS", 10))
+    # Measure the latency the avatar adds between our TTS audio and its published audio
+    lipsync_probe: bool = os.getenv("LIPSYNC_PROBE", "1") == "1"
+    # Barge-in: cut the avatar off as soon as VAD hears the user; target is user speech → avatar silence
+    barge_in_fast_cancel: bool = os.getenv("BARGE_IN_FAST_CANCEL", "1") == "1"
+    barge_in_target_ms: float = float(os.getenv("BARGE_IN_TARGET_MS", 300))
+    # Announcements waiting for the agent to go quiet; past this the least important give way
+    speech_queue_max: int = int(os.getenv("SPEECH_QUEUE_MAX", 8))
+    # Prompt budget: history past the budget is folded into a rolling summary down to the keep size;
+    # until that lands, requests are trimmed to the hard cap
+    prompt_history_budget_tokens: int = int(os.getenv("PROMPT_HISTORY_BUDGET_TOKENS", 3000))
+    prompt_history_keep_tokens: int = int(os.getenv("PROMPT_HISTORY_KEEP_TOKENS", 1500))
+    prompt_history_max_tokens: int = int(os.getenv("PROMPT_HISTORY_MAX_TOKENS", 6000))
+    prompt_summary_words: int = int(os.getenv("PROMPT_SUMMARY_WORDS", 150))
+    summary_llm_model: str = os.getenv("SUMMARY_LLM_MODEL", os.getenv("LLM_MODEL", "gpt-4o-mini"))
+
+    # Per-room snapshots (SQLite in state_dir) that a replacement job restores after a crash
+    snapshots_enabled: bool = os.getenv("SESSION_SNAPSHOTS", "1") == "1"
+    snapshot_max_age_secs: float = float(os.getenv("SNAPSHOT_MAX_AGE_SECS", 1800))
+    snapshot_max_chat_items: int = int(os.getenv("SNAPSHOT_MAX_CHAT_ITEMS", 40))
+
+    # Fallback timeout for frontend RPC methods without their own budget
+    rpc_default_timeout_secs: float = float(os.getenv("RPC_DEFAULT_TIMEOUT_SECS", 5))
+    # Tools acknowledge immediately and run their frontend RPC in the background
+    deferred_tool_rpcs: bool = os.getenv("DEFERRED_TOOL_RPCS", "1") == "1"
+    # Dispatch UI commands from final transcripts without waiting for the LLM
+    local_intents: bool = os.getenv("LOCAL_INTENTS", "1") == "1"
+    fast_path_ttl_secs: float = float(os.getenv("FAST_PATH_TTL_SECS", 10))
+    # Start the LLM reply on stable transcript segments while the user is still pausing
+    preemptive_generation: bool = os.getenv("PREEMPTIVE_GENERATION", "1") == "1"
+    # Adaptive endpointing: VAD silence threshold bounds and per-turn adjustments
+    endpoint_silence_start_secs: float = float(os.getenv("ENDPOINT_SILENCE_START_SECS", 1.0))
+    endpoint_silence_min_secs: float = float(os.getenv("ENDPOINT_SILENCE_MIN_SECS", 0.4))
+    endpoint_silence_max_secs: float = float(os.getenv("ENDPOINT_SILENCE_MAX_SECS", 1.5))
+    endpoint_step_down_secs: float = float(os.getenv("ENDPOINT_STEP_DOWN_SECS", 0.05))
+    endpoint_step_up_secs: float = float(os.getenv("ENDPOINT_STEP_UP_SECS", 0.25))
+    endpoint_cutoff_window_secs: float = float(os.getenv("ENDPOINT_CUTOFF_WINDOW_SECS", 1.5))
+    # Extra wait after the silence: short when the transcript reads finished, long when it doesn't
+    endpoint_delay_secs: float = float(os.getenv("ENDPOINT_DELAY_SECS", 0.2))
+    endpoint_hold_secs: float = float(os.getenv("ENDPOINT_HOLD_SECS", 1.2))
+    # Shared VAD (opt-in): batch Silero windows from every session in this process into one call
+    # per tick. Only pays off with JOB_EXECUTOR=thread, where a process hosts several jobs
+    vad_batching: bool = os.getenv("VAD_BATCHING", "0") == "1"
+    vad_batch_max: int = int(os.getenv("VAD_BATCH_MAX", 32))
+    vad_batch_max_wait_ms: float = float(os.getenv("VAD_BATCH_MAX_WAIT_MS", 4))
+    # "thread" hosts several jobs per process so they share one VAD batcher; "process" isolates each job
+    job_executor: str = os.getenv("JOB_EXECUTOR", "process")
+
+    # Upper bound on concurrently running background tasks per session
+    max_session_tasks: int = int(os.getenv("MAX_SESSION_TASKS", 64))
+
 
 # ---------------------------
 # Shared strings
 # ---------------------------
 class Msg:
+    # The only system instructions the LLM sees up front; persona and task go after the history
+    BASE_INSTRUCTIONS = (
+        "You are the voice of an app that turns the user into a talking avatar. First you guide them as Alexa, "
+        "Amazon's voice assistant: they tell you about themselves, then take a photo or describe an image, and their "
+        "avatar is created. After that you speak as their avatar, in a voice cloned from theirs.\n"
+        "- Everything you say is spoken aloud: keep replies short and conversational, with no lists, markdown or emoji.\n"
+        "- Use the tools for camera, photo and avatar actions instead of describing them.\n"
+        "- The last system message gives your current persona and task; it overrides earlier ones."
+    )
+
     ALEXA_GREETING = (
         "Hey there! Let's create an avatar...your very own digital clone! In a few sentences, tell me a bit about yourself."
     )
@@ -127,6 +296,38 @@ class Msg:
         "Start by greeting them and explaining the process. Ask them to say 'take my photo' or 'describe an image' when ready."
     )
 
+    QUEUE_POSITION = (
+        "Thanks for your patience! You're number {position} in line, and I'll be right with you."
+    )
+
+    DRAIN_NOTICE = (
+        "I need to step away for a quick update, so this session is ending. Please reconnect in a moment to start a new one."
+    )
+
+    QUEUE_TIMEOUT = (
+        "Sorry, we're at capacity right now. Please try again in a few minutes."
+    )
+
+    # A deferred tool RPC failed after the tool already told the user it was on its way
+    DEFERRED_ACTION_FAILED = (
+        "Sorry, I couldn't {description} after all, {reason}. Could you try that again?"
+    )
+
+    SESSION_RESTORED = (
+        "Sorry about that, I lost you for a second. I'm back now, where were we?"
+    )
+
+    AVATAR_GREETING = (
+        "Hello! I'm your personalized avatar, created from your photo. Thank you for creating me. How can I help you today?"
+    )
+
+    AVATAR_DESCRIPTION_TASK = (
+        "The user just clicked 'Describe an image' and was asked to describe the avatar they want. "
+        "When they describe it (like 'professional businesswoman with short brown hair' or 'friendly teacher with glasses'), "
+        "immediately call the generate_avatar function with their description as the prompt parameter. "
+        "Be encouraging and let them know you're creating their custom avatar."
+    )
+
     AVATAR_INSTRUCTIONS = (
         "You are the user's newly created personalized avatar. You were just brought to life from their photo.\n"
         "- Greet warmly as their avatar, using their name if you know it. \n- Express excitement\n- Ask how you can help\n- Be friendly and engaging"
@@ -175,29 +376,1929 @@ class Msg:
 # ---------------------------
 # Helpers
 # ---------------------------
-async def _get_first_remote_participant(room: rtc.Room) -> Optional[str]:
-    for pid in room.remote_participants.keys():
-        return pid
-    return None
+async def _replay_frames(frames: List[rtc.AudioFrame]) -> AsyncIterable[rtc.AudioFrame]:
+    for frame in frames:
+        yield frame
 
 
-async def _rpc_frontend(room: rtc.Room, participant_id: str, method: str, payload: str = "", timeout: float = 30.0) -> None:
-    try:
-        await room.local_participant.perform_rpc(
-            destination_identity=participant_id,
-            method=method,
-            payload=payload,
-            response_timeout=timeout,
+class LatencyStats:
+    """Rolling latency samples (seconds) with percentile and histogram summaries."""
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, max_samples: int = 200):
+        self.samples: deque[float] = deque(maxlen=max_samples)
+        self.histogram: List[int] = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+
+    def add(self, secs: float) -> None:
+        self.samples.append(secs)
+        self.count += 1
+        self.histogram[bisect.bisect_left(self.BUCKETS, secs)] += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"count": self.count}
+        labels = [f"<={b}s" for b in self.BUCKETS] + [f">{self.BUCKETS[-1]}s"]
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(50), 3),
+            "p95": round(self.percentile(95), 3),
+            "max": round(max(self.samples), 3),
+            "histogram": {label: n for label, n in zip(labels, self.histogram) if n},
+        }
+
+
+# ---------------------------
+# Frontend RPC client
+# ---------------------------
+class FrontendRpcError(Exception):
+    """A frontend RPC call failed, timed out, or had no one to call."""
+
+    def __init__(self, method: str, message: str, timed_out: bool = False):
+        super().__init__(f"{method}: {message}")
+        self.method = method
+        self.timed_out = timed_out
+
+
+class FrontendRpcClient:
+    """Calls the RPC methods the frontend registers (see frontend/app/page.tsx).
+
+    Payloads are JSON-encoded, results are JSON-decoded and returned, and failures raise
+    FrontendRpcError. Each method has its own timeout budget so a slow browser cannot hold
+    a tool call open for long. Calls may run concurrently; per-method latency and error
+    counts are kept for reporting.
+    """
+
+    METHOD_TIMEOUTS = {
+        "isCameraActive": 2.0,
+        "startCamera": 5.0,
+        "capturePhoto": 5.0,
+        "skipPhoto": 5.0,
+        "generateAvatar": 8.0,
+        "modifyAvatar": 8.0,
+    }
+
+    def __init__(self, room: rtc.Room, target: Callable[[], Optional[str]], default_timeout: float):
+        self.room = room
+        self.target = target  # returns the identity to call (the primary user)
+        self.default_timeout = default_timeout
+        self.in_flight = 0
+        self.latency: Dict[str, LatencyStats] = {}
+        self.errors: Dict[str, int] = {}
+        self.timeouts: Dict[str, int] = {}
+
+    async def call(self, method: str, payload: Optional[dict] = None, *, timeout: Optional[float] = None, destination: Optional[str] = None):
+        """Perform an RPC and return the decoded result."""
+        destination = destination or self.target()
+        if not destination:
+            raise FrontendRpcError(method, "no user connected")
+        timeout = timeout or self.METHOD_TIMEOUTS.get(method, self.default_timeout)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self.room.local_participant.perform_rpc(
+                destination_identity=destination,
+                method=method,
+                payload=json.dumps(payload) if payload is not None else "",
+                response_timeout=timeout,
+            )
+        except rtc.RpcError as e:
+            self.errors[method] = self.errors.get(method, 0) + 1
+            timed_out = e.code in (rtc.RpcError.ErrorCode.RESPONSE_TIMEOUT, rtc.RpcError.ErrorCode.CONNECTION_TIMEOUT)
+            if timed_out:
+                self.timeouts[method] = self.timeouts.get(method, 0) + 1
+            raise FrontendRpcError(method, e.message, timed_out=timed_out) from e
+        except Exception as e:
+            self.errors[method] = self.errors.get(method, 0) + 1
+            raise FrontendRpcError(method, str(e)) from e
+        finally:
+            self.in_flight -= 1
+            self.latency.setdefault(method, LatencyStats()).add(time.perf_counter() - started)
+
+        try:
+            return json.loads(response) if response else None
+        except ValueError:
+            return response
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "methods": {
+                m: {**s.summary(), "errors": self.errors.get(m, 0), "timeouts": self.timeouts.get(m, 0)}
+                for m, s in self.latency.items()
+            },
+        }
+
+
+# ---------------------------
+# Session registry (shared between job processes and the worker)
+# ---------------------------
+class SessionRegistry:
+    """File-backed registry of live sessions on this host.
+
+    Jobs run in separate processes, so each Orchestrator publishes its stats as a small
+    JSON file under `Config.state_dir`; the worker process (load reporting) reads them back.
+    Several workers may share a host (and state_dir), so entries carry their worker's pid.
+    """
+
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.sessions_dir = os.path.join(cfg.state_dir, "sessions")
+        os.makedirs(self.sessions_dir, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{session_id}.json")
+
+    def publish(self, session_id: str, stats: dict) -> None:
+        """Atomically write the latest stats for a session."""
+        entry = dict(stats, session_id=session_id, pid=os.getpid(), worker_pid=self.cfg.worker_pid, updated_at=time.time())
+        path = self._path(session_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def remove(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def entries(self, worker_pid: Optional[int] = None) -> List[dict]:
+        """Return entries that are still fresh (optionally of one worker); stale files (crashed jobs) are skipped."""
+        now = time.time()
+        out: List[dict] = []
+        try:
+            names = os.listdir(self.sessions_dir)
+        except FileNotFoundError:
+            return out
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.sessions_dir, name), "r") as f:
+                    entry = json.load(f)
+            except Exception:
+                continue  # partially written or removed concurrently
+            if now - entry.get("updated_at", 0) > self.cfg.registry_stale_secs:
+                continue
+            if worker_pid is None or entry.get("worker_pid") == worker_pid:
+                out.append(entry)
+        return out
+
+
+# ---------------------------
+# Admission control
+# ---------------------------
+class AdmissionController:
+    """Reserves the upstream capacity a session will need before it starts its flow.
+
+    Limits are per session: a session may reach avatar mode at any point, so it holds one
+    Hedra avatar, one voice clone and one TTS stream from admission until it closes, even
+    while it is still in Alexa mode. The Hedra and clone limits therefore cap how many
+    sessions run at once, not how many avatars or clones exist at a moment. Reservations and the FIFO wait queue live in a single JSON file under `state_dir`,
+    guarded by an flock, so all workers on the host share the same counts. Sessions refresh
+    their entry periodically; stale entries (crashed jobs) are dropped.
+    """
+
+    NEEDS = {"hedra": 1, "clone": 1, "tts": 1}
+
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.path = os.path.join(cfg.state_dir, "admission.json")
+        self.capacity = {"hedra": cfg.admission_max_hedra, "clone": cfg.admission_max_clones, "tts": cfg.admission_max_tts}
+        os.makedirs(cfg.state_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Yield the pruned store under an exclusive lock and write it back on exit."""
+        with open(f"{self.path}.lock", "w") as lock:
+            if FCNTL_AVAILABLE:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                state = self._load()
+                yield state
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp, self.path)
+            finally:
+                if FCNTL_AVAILABLE:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except Exception:
+            state = {}
+        now = time.time()
+        return {
+            section: {
+                sid: entry for sid, entry in state.get(section, {}).items()
+                if now - entry.get("updated_at", 0) <= self.cfg.registry_stale_secs
+            }
+            for section in ("admitted", "queue")
+        }
+
+    def _fits(self, admitted: dict) -> bool:
+        for resource, capacity in self.capacity.items():
+            in_use = sum(entry["needs"].get(resource, 0) for entry in admitted.values())
+            if capacity > 0 and in_use + self.NEEDS[resource] > capacity:
+                return False
+        return True
+
+    def try_admit(self, session_id: str) -> int:
+        """Admit the session if it is first in line and capacity allows; returns its queue position (0 = admitted)."""
+        with self._locked() as state:
+            now = time.time()
+            if session_id in state["admitted"]:
+                state["admitted"][session_id]["updated_at"] = now
+                return 0
+            waiting = state["queue"].setdefault(session_id, {"enqueued_at": now})
+            waiting["updated_at"] = now
+            order = sorted(state["queue"], key=lambda sid: state["queue"][sid]["enqueued_at"])
+            position = order.index(session_id) + 1
+            if position == 1 and self._fits(state["admitted"]):
+                del state["queue"][session_id]
+                state["admitted"][session_id] = {"needs": self.NEEDS, "updated_at": now}
+                return 0
+            return position
+
+    def heartbeat(self, session_id: str) -> None:
+        with self._locked() as state:
+            for section in ("admitted", "queue"):
+                if session_id in state[section]:
+                    state[section][session_id]["updated_at"] = time.time()
+
+    def release(self, session_id: str) -> None:
+        with self._locked() as state:
+            state["admitted"].pop(session_id, None)
+            state["queue"].pop(session_id, None)
+
+    def queue_length(self) -> int:
+        return len(self._load()["queue"])
+
+    async def acquire(self, session_id: str, on_position: Callable[[int], Any]) -> bool:
+        """Wait for admission, calling `on_position` whenever the queue position changes.
+
+        Returns False (and leaves the queue) if the wait exceeds `admission_max_wait_secs`.
+        """
+        deadline = time.monotonic() + self.cfg.admission_max_wait_secs
+        last_position = None
+        while True:
+            position = await asyncio.to_thread(self.try_admit, session_id)
+            if position == 0:
+                return True
+            if position != last_position:
+                last_position = position
+                await on_position(position)
+            if time.monotonic() >= deadline:
+                await asyncio.to_thread(self.release, session_id)
+                return False
+            await asyncio.sleep(self.cfg.admission_poll_secs)
+
+
+# ---------------------------
+# Drain mode
+# ---------------------------
+class DrainNotices:
+    """Per-job drain deadlines, written by the worker process and read by its jobs.
+
+    Job processes run with SIGTERM ignored and only the worker learns about the drain, so it
+    drops a `<job_id>.json` file with the deadline for each running job.
+    """
+
+    def __init__(self, cfg: Config):
+        self.dir = os.path.join(cfg.state_dir, "drain")
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.dir, f"{job_id}.json")
+
+    def post(self, job_id: str, deadline: float) -> None:
+        path = self._path(job_id)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"deadline": deadline}, f)
+        os.replace(tmp, path)
+
+    def deadline(self, job_id: str) -> Optional[float]:
+        try:
+            with open(self._path(job_id), "r") as f:
+                return float(json.load(f)["deadline"])
+        except Exception:
+            return None
+
+    def clear(self, job_id: str) -> None:
+        try:
+            os.remove(self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+# ---------------------------
+# Session snapshots
+# ---------------------------
+class SessionSnapshotStore:
+    """Latest session state per room, in a SQLite file under `Config.state_dir`.
+
+    If a job process dies mid-conversation, LiveKit dispatches a replacement job to the same
+    room; it loads the snapshot and resumes with the same mode, voice and avatar. Calls block,
+    so run them via asyncio.to_thread.
+    """
+
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        os.makedirs(cfg.state_dir, exist_ok=True)
+        self.path = os.path.join(cfg.state_dir, "snapshots.sqlite3")
+        self.writes = 0
+        self.errors = 0
+        self.write_latency = LatencyStats()
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")  # readers in other jobs don't block our writes
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "room TEXT PRIMARY KEY, job_id TEXT NOT NULL, updated_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    @contextlib.contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.path, timeout=5)
+        try:
+            with db:  # commit on success, roll back on error
+                yield db
+        finally:
+            db.close()
+
+    def save(self, room: str, job_id: str, data: dict) -> None:
+        started = time.perf_counter()
+        try:
+            with self._db() as db:
+                db.execute(
+                    "INSERT INTO snapshots (room, job_id, updated_at, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(room) DO UPDATE SET job_id = excluded.job_id, "
+                    "updated_at = excluded.updated_at, data = excluded.data",
+                    (room, job_id, time.time(), json.dumps(data)),
+                )
+        except Exception:
+            self.errors += 1
+            raise
+        self.writes += 1
+        self.write_latency.add(time.perf_counter() - started)
+
+    def load(self, room: str) -> Optional[dict]:
+        """Return the room's snapshot if it is recent enough; older rows are pruned."""
+        cutoff = time.time() - self.cfg.snapshot_max_age_secs
+        with self._db() as db:
+            db.execute("DELETE FROM snapshots WHERE updated_at < ?", (cutoff,))
+            row = db.execute(
+                "SELECT job_id, updated_at, data FROM snapshots WHERE room = ?", (room,)
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, updated_at, data = row
+        return dict(json.loads(data), job_id=job_id, updated_at=updated_at)
+
+    def delete(self, room: str, job_id: str) -> None:
+        """Drop the room's snapshot, unless another job has taken the room over since."""
+        with self._db() as db:
+            db.execute("DELETE FROM snapshots WHERE room = ? AND job_id = ?", (room, job_id))
+
+    def stats(self) -> dict:
+        return {"writes": self.writes, "errors": self.errors, "write_secs": self.write_latency.summary()}
+
+
+# ---------------------------
+# Task supervision
+# ---------------------------
+class TaskSupervisor:
+    """Owns a session's background tasks.
+
+    Tasks are named for logging and metrics. A task spawned with a `key` is deduplicated
+    against the in-flight task with the same key: by default the new task supersedes
+    (cancels) the old one, with `supersede=False` the new request is dropped instead.
+    """
+
+    def __init__(self, max_live: int = 64):
+        self.max_live = max_live
+        self._tasks: set[asyncio.Task] = set()
+        self._keyed: Dict[str, asyncio.Task] = {}
+        self.counts: Dict[str, int] = {
+            "started": 0, "completed": 0, "failed": 0, "cancelled": 0,
+            "superseded": 0, "deduplicated": 0, "rejected": 0,
+        }
+        self.durations: Dict[str, List[float]] = {}  # per task name, most recent samples
+
+    @property
+    def live(self) -> int:
+        return len(self._tasks)
+
+    def live_named(self, names: Tuple[str, ...]) -> int:
+        return sum(1 for t in self._tasks if t.get_name() in names)
+
+    def cancel(self, key: str) -> bool:
+        """Cancel the in-flight task registered under `key`, if any."""
+        task = self._keyed.get(key)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    def spawn(self, coro, name: str, *, key: Optional[str] = None, supersede: bool = True) -> Optional[asyncio.Task]:
+        """Start a task; returns the task now responsible for `key` (or None if rejected)."""
+        if key is not None:
+            existing = self._keyed.get(key)
+            if existing is not None and not existing.done():
+                if not supersede:
+                    coro.close()
+                    self.counts["deduplicated"] += 1
+                    print(f"🧵 Skipping {name}: '{key}' already in flight")
+                    return existing
+                existing.cancel()
+                self.counts["superseded"] += 1
+                print(f"🧵 Superseding in-flight task '{key}'")
+
+        if len(self._tasks) >= self.max_live:
+            coro.close()
+            self.counts["rejected"] += 1
+            print(f"⚠️ Task limit reached ({self.max_live}), dropping {name}")
+            return None
+
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        if key is not None:
+            self._keyed[key] = task
+        self.counts["started"] += 1
+        started_at = time.perf_counter()
+        task.add_done_callback(lambda t: self._on_done(t, name, key, started_at))
+        return task
+
+    def _on_done(self, task: asyncio.Task, name: str, key: Optional[str], started_at: float) -> None:
+        self._tasks.discard(task)
+        if key is not None and self._keyed.get(key) is task:
+            del self._keyed[key]
+
+        samples = self.durations.setdefault(name, [])
+        samples.append(time.perf_counter() - started_at)
+        del samples[:-50]
+
+        if task.cancelled():
+            self.counts["cancelled"] += 1
+            return
+        exc = task.exception()
+        if exc is not None:
+            self.counts["failed"] += 1
+            print(f"❌ Task {name} failed: {exc!r}")
+        else:
+            self.counts["completed"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "live": self.live,
+            **self.counts,
+            "max_secs": {n: round(max(d), 3) for n, d in self.durations.items() if d},
+        }
+
+    async def aclose(self) -> None:
+        """Cancel every task (except the caller) and wait for them to finish."""
+        current = asyncio.current_task()
+        tasks = [t for t in self._tasks if t is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ---------------------------
+# Session state machine
+# ---------------------------
+class SessionState:
+    ALEXA = "alexa"          # onboarding with the Alexa voice, recording speech for cloning
+    REVEALING = "revealing"  # building the avatar: voice clone, Hedra session, greeting
+    AVATAR = "avatar"        # talking as the user's avatar
+
+    TRANSITIONS = {
+        ALEXA: {REVEALING},
+        REVEALING: {AVATAR, ALEXA},
+        AVATAR: {ALEXA},
+    }
+
+
+class ModeStateMachine:
+    """Single source of truth for the session mode.
+
+    Mode actions hold `lock` until their transition is committed (greetings play after it is
+    released), so a second trigger waits for the first and then sees the new state instead
+    of repeating its work. `claim()`
+    makes per-reveal actions (clone, greeting) idempotent.
+    """
+
+    def __init__(self):
+        self.state = SessionState.ALEXA
+        self.lock = asyncio.Lock()
+        self.epoch = 0  # incremented on every reveal
+        self.transitions: List[dict] = []  # recorded transition timings
+        self._entered_at = time.perf_counter()
+        self._claimed: set[str] = set()
+        self.on_transition: Optional[Callable[[dict], None]] = None
+
+    def transition(self, target: str, trigger: str) -> bool:
+        """Move to `target` if allowed from the current state; records the timing."""
+        if target not in SessionState.TRANSITIONS[self.state]:
+            print(f"🚦 Ignoring transition {self.state} → {target} (trigger: {trigger})")
+            return False
+        now = time.perf_counter()
+        record = {
+            "from": self.state,
+            "to": target,
+            "trigger": trigger,
+            "at": time.time(),
+            "secs_in_previous": round(now - self._entered_at, 3),
+        }
+        self.transitions.append(record)
+        if target == SessionState.REVEALING:
+            self.epoch += 1
+        print(f"🚦 {self.state} → {target} (trigger: {trigger}, {record['secs_in_previous']:.2f}s in {self.state})")
+        self.state = target
+        self._entered_at = now
+        if self.on_transition:
+            self.on_transition(record)
+        return True
+
+    def claim(self, action: str) -> bool:
+        """Return True the first time `action` is claimed in the current epoch."""
+        key = f"{self.epoch}:{action}"
+        if key in self._claimed:
+            return False
+        self._claimed.add(key)
+        return True
+
+
+# ---------------------------
+# Avatar ID resolution
+# ---------------------------
+class AvatarIdResolver:
+    """In-memory avatar ID cache for one session.
+
+    Sources are fed as events arrive (data packets, our own metadata writes, the
+    avatar-state poll), so `resolve()` is an O(1) lookup with no I/O. Earlier sources
+    in PRECEDENCE win; the configured default is the final fallback.
+    """
+
+    PRECEDENCE = ("packet", "metadata", "poll", "file")
+    # Sources that only carry an ID once an avatar was created in this session; the legacy
+    # file and metadata seeded at startup may be left over from an earlier one
+    CREATED = ("packet", "poll")
+
+    def __init__(self, default_id: str):
+        self.default_id = default_id
+        self._ids: Dict[str, str] = {}
+
+    def update(self, source: str, avatar_id: Optional[str]) -> None:
+        assert source in self.PRECEDENCE, source
+        if not avatar_id:
+            self.invalidate(source)
+            return
+        if self._ids.get(source) != avatar_id:
+            self._ids[source] = avatar_id
+            print(f"🎭 Avatar ID from {source}: {avatar_id}")
+
+    def invalidate(self, source: Optional[str] = None) -> None:
+        """Forget one source (or all of them)."""
+        if source is None:
+            self._ids.clear()
+        elif self._ids.pop(source, None):
+            print(f"🎭 Avatar ID from {source} invalidated")
+
+    def resolve(self) -> Tuple[str, str]:
+        """Return (avatar_id, source) using the precedence order."""
+        for source in self.PRECEDENCE:
+            avatar_id = self._ids.get(source)
+            if avatar_id:
+                return avatar_id, source
+        return self.default_id, "default"
+
+    def find(self, sources: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+        """Like `resolve()`, restricted to `sources`; None instead of the default."""
+        for source in self.PRECEDENCE:
+            if source in sources and self._ids.get(source):
+                return self._ids[source], source
+        return None
+
+
+# ---------------------------
+# Participant index
+# ---------------------------
+class ParticipantIndex:
+    """Remote participants classified by role, kept current from room events."""
+
+    USER = "user"
+    AVATAR = "avatar"  # hedra-avatar* participants
+    AGENT = "agent"    # other agents in the room
+
+    def __init__(self):
+        self._roles: Dict[str, str] = {}  # identity → role, in join order
+
+    @classmethod
+    def classify(cls, p: rtc.RemoteParticipant) -> str:
+        if p.identity.startswith("hedra-avatar"):
+            return cls.AVATAR
+        if p.kind == rtc.ParticipantKind.PARTICIPANT_KIND_AGENT:
+            return cls.AGENT
+        return cls.USER
+
+    def add(self, p: rtc.RemoteParticipant) -> str:
+        role = self.classify(p)
+        self._roles[p.identity] = role
+        return role
+
+    def remove(self, identity: str) -> Optional[str]:
+        return self._roles.pop(identity, None)
+
+    def seed(self, room: rtc.Room) -> None:
+        for p in room.remote_participants.values():
+            self.add(p)
+
+    def role(self, identity: str) -> Optional[str]:
+        return self._roles.get(identity)
+
+    def identities(self, role: str) -> List[str]:
+        return [i for i, r in self._roles.items() if r == role]
+
+    def primary_user(self) -> Optional[str]:
+        """The earliest-joined user still in the room (the RPC target for tools)."""
+        for identity, role in self._roles.items():
+            if role == self.USER:
+                return identity
+        return None
+
+
+# ---------------------------
+# Client UI state mirror
+# ---------------------------
+class ClientUiState:
+    """Backend mirror of the frontend UI, fed by `user_state_change` data packets.
+
+    The frontend reports `camera_started` (with its ms `timestamp`) when the user clicks the
+    camera button; an event older than the last one applied to the same field is dropped.
+    Everything else comes from our own observations (a successful RPC), which always apply.
+    A field never reported or observed is unknown (None), not False.
+    """
+
+    EVENTS = {
+        "camera_started": ("camera_active", True),
+    }
+
+    def __init__(self):
+        self._values: Dict[str, object] = {}
+        self._seqs: Dict[str, float] = {}
+
+    def apply_event(self, message: dict) -> bool:
+        """Apply a frontend event; returns False for unknown or stale events."""
+        mapping = self.EVENTS.get(message.get("action"))
+        if mapping is None:
+            return False
+        field, value = mapping
+        seq = message.get("timestamp")
+        if seq is not None:
+            if seq <= self._seqs.get(field, float("-inf")):
+                print(f"📱 Dropping stale UI event {message.get('action')} (seq {seq})")
+                return False
+            self._seqs[field] = seq
+        self._values[field] = value
+        return True
+
+    def observe(self, field: str, value: object) -> None:
+        """Record state we know from our own actions (e.g. a successful RPC)."""
+        self._values[field] = value
+
+    def get(self, field: str, default=None):
+        return self._values.get(field, default)
+
+    @property
+    def camera_active(self) -> Optional[bool]:
+        return self._values.get("camera_active")
+
+
+# ---------------------------
+# Local intent fast-path
+# ---------------------------
+class IntentMatcher:
+    """Keyword/regex matcher for UI commands on final transcripts.
+
+    A match dispatches the function tool straight away instead of waiting for the LLM
+    round trip; the LLM still answers the turn and, when it calls the same tool, gets the
+    fast-path result instead of running the tool twice.
+    """
+
+    # (tool name, pattern, only while in Alexa mode); first match wins. "describe_avatar" is
+    # not a tool: the user is about to describe an avatar, so the reply should ask for it
+    RULES = [
+        ("describe_avatar", re.compile(r"\bdescribe an image\b"), True),
+        ("take_photo", re.compile(r"\b(capture|snap)\b.{0,12}\b(photo|picture|pic|it)\b|\bcheese\b"), True),
+        ("start_camera", re.compile(r"\b(take|start)\b.{0,8}\b(photo|picture|selfie|camera)\b|\b(turn on|open)\b.{0,8}\bcamera\b"), True),
+        ("skip_photo", re.compile(r"\bskip\b.{0,12}\b(photo|picture|this|it)\b|^\W*skip\W*$"), True),
+        ("generate_avatar", re.compile(r"\b(make|create)\b.{0,8}\bnew avatar\b"), False),
+    ]
+    NEGATION = re.compile(r"\b(don't|do not|not|never)\b")  # not a bare "no": "no, take my photo" is a request
+
+    def __init__(self):
+        self.finals = 0
+        self.hits: Dict[str, int] = {}
+        self.saved = LatencyStats()  # dispatch → the LLM's own call for the same tool
+        self.llm_skipped = 0  # fast-path dispatches the LLM never followed up on
+
+    def match(self, transcript: str, alexa_mode: bool) -> Optional[str]:
+        self.finals += 1
+        text = transcript.lower().strip()
+        if not text or self.NEGATION.search(text):
+            return None
+        for tool, pattern, alexa_only in self.RULES:
+            if alexa_only and not alexa_mode:
+                continue
+            if pattern.search(text):
+                self.hits[tool] = self.hits.get(tool, 0) + 1
+                return tool
+        return None
+
+    def stats(self) -> dict:
+        hits = sum(self.hits.values())
+        return {
+            "finals": self.finals,
+            "hits": self.hits,
+            "hit_rate": round(hits / self.finals, 3) if self.finals else 0.0,
+            "latency_saved": self.saved.summary(),
+            "llm_skipped": self.llm_skipped,
+        }
+
+
+# ---------------------------
+# Speculative replies
+# ---------------------------
+class SpeculationTracker:
+    """Hit rate and lead time of preemptive (speculative) LLM replies.
+
+    With `preemptive_generation` the session starts a reply on each final STT segment
+    while the user may still be talking; at end of turn it schedules that reply if the
+    committed turn matches, else cancels it and starts a fresh one. Each turn's EOU metrics
+    name the reply actually used (`speech_id`) and when the turn was decided. Replies
+    created after the user started speaking and before that decision are the speculative
+    ones, so the turn is a hit when the chosen reply is one of them. Announcements (`say`)
+    and replies this process requests itself are not speculative and are left out.
+    """
+
+    def __init__(self):
+        self._user_turn_open = False
+        self._created: Dict[str, float] = {}  # speech_id → created_at (time.time()) in the current turn
+        self.started = 0
+        self.turns = 0
+        self.speculated_turns = 0  # turns with at least one speculative start
+        self.hits = 0
+        self.lead = LatencyStats()  # speculative start → end-of-turn decision, per hit
+
+    def on_user_state(self, new_state: str) -> None:
+        if new_state == "speaking":
+            self._user_turn_open = True
+
+    def on_speech_created(self, ev) -> None:
+        if self._user_turn_open and ev.user_initiated and ev.source == "generate_reply":
+            self._created[ev.speech_handle.id] = time.time()
+
+    def ignore(self, speech_id: str) -> None:
+        """Forget a reply requested with `generate_reply` by our own code, not by the turn."""
+        self._created.pop(speech_id, None)
+
+    def on_eou_metrics(self, m: EOUMetrics) -> None:
+        # EOU metrics are stamped after on_user_turn_completed; the turn was decided before it ran
+        decided_at = m.timestamp - m.on_user_turn_completed_delay
+        self._user_turn_open = False
+        created, self._created = self._created, {}
+        speculative = {speech_id: at for speech_id, at in created.items() if at < decided_at}
+        self.turns += 1
+        self.started += len(speculative)
+        if not speculative:
+            return
+        self.speculated_turns += 1
+        if m.speech_id in speculative:
+            self.hits += 1
+            self.lead.add(decided_at - speculative[m.speech_id])
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "turns": self.turns,
+            "speculated_turns": self.speculated_turns,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.speculated_turns, 3) if self.speculated_turns else 0.0,
+            "lead": self.lead.summary(),
+        }
+
+
+# ---------------------------
+# Prompt assembly
+# ---------------------------
+_prompt_encoding: Dict[str, Any] = {}  # "encoding" → tiktoken encoding, or None if it failed to load
+_prompt_encoding_lock = threading.Lock()
+
+
+def load_prompt_encoding() -> None:
+    """Load the tiktoken encoding used for prompt token counts. The first load may download
+    its BPE file, so this runs in prewarm or on a background thread, never on the event loop;
+    until it is ready (or if it fails) counts fall back to a character estimate."""
+    with _prompt_encoding_lock:
+        if "encoding" in _prompt_encoding or not TIKTOKEN_AVAILABLE:
+            return
+        try:
+            _prompt_encoding["encoding"] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            print(f"⚠️ tiktoken encoding unavailable, estimating prompt tokens: {e}")
+            _prompt_encoding["encoding"] = None
+
+
+class PromptAssembler:
+    """Lays out each LLM request so the provider's prompt cache keeps hitting.
+
+    The system instructions never change (`Msg.BASE_INSTRUCTIONS`) and the history after
+    them is append-only, so consecutive requests share a long prefix. The parts that change
+    (persona, current task) go in one system message after the history. History beyond
+    the token budget is folded into a rolling summary placed right after the instructions;
+    compaction happens in chunks, so the cached prefix only moves now and then.
+    """
+
+    SUMMARY_ID = "prompt.summary"
+
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.task: Optional[str] = None  # what the user was just asked for, if anything
+        self.summary: Optional[str] = None
+        self.compactions = 0
+        self.summarized_items = 0
+        self.trimmed_requests = 0
+        self.history_tokens = 0  # estimate for the last request
+        self.ttft = LatencyStats()
+        self.turns: deque[dict] = deque(maxlen=20)
+        if TIKTOKEN_AVAILABLE and "encoding" not in _prompt_encoding:
+            threading.Thread(target=load_prompt_encoding, name="prompt-encoding", daemon=True).start()
+        self._summarizer: Optional[openai.LLM] = None
+
+    def count_tokens(self, text: str) -> int:
+        encoding = _prompt_encoding.get("encoding")
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return len(text) // 4 + 1
+
+    def item_tokens(self, item) -> int:
+        if item.type == "message":
+            return self.count_tokens(item.text_content or "") + 4
+        if item.type == "function_call":
+            return self.count_tokens(item.name + item.arguments) + 4
+        if item.type == "function_call_output":
+            return self.count_tokens(item.output) + 4
+        return 0
+
+    @staticmethod
+    def _history(chat_ctx: ChatContext) -> list:
+        return [i for i in chat_ctx.items if not (i.type == "message" and i.role == "system")]
+
+    def _cut(self, history: list, keep_tokens: int) -> int:
+        """Index of the first item to keep: the tail fits `keep_tokens`, widened back to a user turn.
+
+        Starting on a user turn keeps the latest exchange whole and never leaves a tool result
+        whose call was cut off.
+        """
+        total, cut = 0, len(history)
+        while cut > 0 and total + self.item_tokens(history[cut - 1]) <= keep_tokens:
+            cut -= 1
+            total += self.item_tokens(history[cut])
+        cut = min(cut, len(history) - 1)
+        while cut > 0 and not (history[cut].type == "message" and history[cut].role == "user"):
+            cut -= 1
+        return max(cut, 0)
+
+    def over_budget(self, chat_ctx: ChatContext) -> bool:
+        return sum(self.item_tokens(i) for i in self._history(chat_ctx)) > self.cfg.prompt_history_budget_tokens
+
+    def assemble(self, chat_ctx: ChatContext, persona: str) -> ChatContext:
+        """The context for one request: history within the hard cap, then persona and task."""
+        ctx = chat_ctx.copy()
+        history = self._history(ctx)
+        self.history_tokens = sum(self.item_tokens(i) for i in history)
+        if self.history_tokens > self.cfg.prompt_history_max_tokens:
+            dropped = {i.id for i in history[: self._cut(history, self.cfg.prompt_history_max_tokens)]}
+            ctx.items[:] = [i for i in ctx.items if i.id not in dropped]
+            self.trimmed_requests += 1
+        sections = [f"Persona:\n{persona}"]
+        if self.task:
+            sections.append(f"Current task:\n{self.task}")
+        ctx.add_message(role="system", content="\n\n".join(sections))
+        return ctx
+
+    def summary_message(self) -> ChatMessage:
+        return ChatMessage(
+            id=self.SUMMARY_ID, role="system", content=[f"Summary of the conversation so far:\n{self.summary}"]
         )
-    except Exception as e:
-        print(f"⚠️ RPC call failed for method '{method}': {e}")
-        # Don't re-raise to prevent blocking the agent
+
+    def insert_summary(self, ctx: ChatContext) -> None:
+        """Put the summary message right after the leading system instructions."""
+        ctx.items[:] = [i for i in ctx.items if i.id != self.SUMMARY_ID]
+        if not self.summary:
+            return
+        pos = 0
+        while pos < len(ctx.items) and ctx.items[pos].type == "message" and ctx.items[pos].role == "system":
+            pos += 1
+        ctx.items.insert(pos, self.summary_message())
+
+    async def compact(self, agent: Agent) -> None:
+        """Fold the oldest history into the rolling summary and drop it from the agent's context."""
+        history = self._history(agent.chat_ctx)
+        old = history[: self._cut(history, self.cfg.prompt_history_keep_tokens)]
+        transcript = "\n".join(
+            f"{i.role}: {i.text_content}" for i in old
+            if i.type == "message" and i.role in ("user", "assistant") and i.text_content
+        )
+        if not old or not transcript:
+            return
+        started = time.perf_counter()
+        self.summary = await self._summarize(transcript)
+        # Items added while the summary was being written stay; only the summarized ones go
+        dropped = {i.id for i in old}
+        ctx = agent.chat_ctx.copy()
+        ctx.items[:] = [i for i in ctx.items if i.id not in dropped]
+        self.insert_summary(ctx)
+        await agent.update_chat_ctx(ctx)
+        self.compactions += 1
+        self.summarized_items += len(old)
+        print(f"🧮 Folded {len(old)} history items into the summary in {time.perf_counter() - started:.1f}s")
+
+    async def _summarize(self, transcript: str) -> str:
+        if self._summarizer is None:
+            self._summarizer = openai.LLM(model=self.cfg.summary_llm_model, temperature=0.3)
+        ctx = ChatContext.empty()
+        ctx.add_message(
+            role="system",
+            content=(
+                f"Summarize this conversation between a user and their voice assistant in at most "
+                f"{self.cfg.prompt_summary_words} words of plain prose. Keep names, facts about the user, "
+                "their preferences, and anything the assistant promised."
+            ),
+        )
+        if self.summary:
+            ctx.add_message(role="user", content=f"Summary of what came before:\n{self.summary}")
+        ctx.add_message(role="user", content=transcript)
+        parts: List[str] = []
+        async with self._summarizer.chat(chat_ctx=ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    parts.append(chunk.delta.content)
+        return "".join(parts).strip()
+
+    def on_llm_metrics(self, m: LLMMetrics) -> None:
+        self.ttft.add(max(0.0, m.ttft))
+        self.turns.append({
+            "speech_id": m.speech_id,
+            "prompt_tokens": m.prompt_tokens,
+            "cached_tokens": m.prompt_cached_tokens,
+            "ttft_ms": round(m.ttft * 1000),
+            "history_tokens_est": self.history_tokens,
+        })
+        print(f"🧮 LLM turn: {m.prompt_tokens} prompt tokens ({m.prompt_cached_tokens} cached), TTFT {m.ttft * 1000:.0f} ms")
+
+    def stats(self) -> dict:
+        prompt = sum(t["prompt_tokens"] for t in self.turns)
+        cached = sum(t["cached_tokens"] for t in self.turns)
+        return {
+            "turns": list(self.turns)[-5:],
+            "ttft": self.ttft.summary(),
+            "cache_hit_ratio": round(cached / prompt, 3) if prompt else None,
+            "history_tokens_est": self.history_tokens,
+            "compactions": self.compactions,
+            "summarized_items": self.summarized_items,
+            "trimmed_requests": self.trimmed_requests,
+        }
+
+
+# ---------------------------
+# Speech scheduling
+# ---------------------------
+class SpeechPriority:
+    LOW = 0     # chatter that is fine to lose
+    NORMAL = 1  # confirmations
+    HIGH = 2    # prompts the user is waiting on: greetings, errors, recoveries
+    URGENT = 3  # plays at once, cutting off interruptible speech (capacity and drain notices)
+
+
+class SpeechScheduler:
+    """The one way announcements reach `session.say`.
+
+    Announcements wait here, highest priority first and FIFO within a priority, and are
+    released one at a time only while the agent and the user are both quiet, so they never
+    sit in the session's queue ahead of an LLM reply. An identical pending text is queued
+    once, a new entry with the same `key` replaces the pending one, entries older than
+    their max age are dropped unplayed, and a full queue sheds its least important entry.
+    URGENT entries bypass the queue.
+    """
+
+    MAX_AGE_SECS = {SpeechPriority.LOW: 10.0, SpeechPriority.NORMAL: 30.0, SpeechPriority.HIGH: 60.0}
+
+    def __init__(self, session: AgentSession, max_queue: int):
+        self.session = session
+        self.max_queue = max_queue
+        self.pending: List[dict] = []
+        self.playing: Optional[dict] = None
+        self.queue_wait = LatencyStats()
+        self.counts: Dict[str, int] = {
+            "played": 0, "urgent": 0, "deduplicated": 0, "superseded": 0, "stale": 0, "overflow": 0,
+        }
+        self._changed = asyncio.Event()
+
+    def submit(
+        self, text: str, *, priority: int = SpeechPriority.NORMAL, key: Optional[str] = None,
+        max_age: Optional[float] = None, **say_kwargs,
+    ) -> asyncio.Future:
+        """Queue `text`; the future resolves to its SpeechHandle once released (None if dropped)."""
+        future = asyncio.get_running_loop().create_future()
+        now = time.monotonic()
+        entry = {"text": text, "priority": priority, "key": key, "queued_at": now, "future": future, "kwargs": say_kwargs}
+        if priority >= SpeechPriority.URGENT:
+            self.counts["urgent"] += 1
+            current = self.session.current_speech
+            if current is not None and current.allow_interruptions and not current.interrupted:
+                current.interrupt()
+            future.set_result(self._say(entry))
+            return future
+
+        self._expire()
+        playing = self.playing
+        if playing and playing["text"] == text and playing["handle"] and not playing["handle"].done():
+            self.counts["deduplicated"] += 1
+            future.set_result(playing["handle"])
+            return future
+        for other in self.pending:
+            if other["text"] == text:
+                self.counts["deduplicated"] += 1
+                return other["future"]
+        if key is not None:
+            for other in [e for e in self.pending if e["key"] == key]:
+                self._drop(other, "superseded")
+        if len(self.pending) >= self.max_queue:
+            victim = min(self.pending, key=lambda e: (e["priority"], e["queued_at"]))
+            if victim["priority"] > priority:
+                victim = entry
+            self._drop(victim, "overflow")
+            if victim is entry:
+                return future
+
+        age = self.MAX_AGE_SECS.get(priority) if max_age is None else max_age
+        entry["expires_at"] = now + age if age is not None else None
+        self.pending.append(entry)
+        self._changed.set()
+        return future
+
+    async def say(self, text: str, **kwargs) -> Optional[SpeechHandle]:
+        """Queue `text` and wait until it has played out; None if it was dropped."""
+        handle = await self.submit(text, **kwargs)
+        if handle is not None:
+            await handle
+        return handle
+
+    def on_state_changed(self) -> None:
+        self._changed.set()
+
+    def on_user_turn(self) -> None:
+        """The conversation moved on; chatter queued before it is no longer worth saying."""
+        for entry in [e for e in self.pending if e["priority"] <= SpeechPriority.LOW]:
+            self._drop(entry, "stale")
+
+    def _idle(self) -> bool:
+        s = self.session
+        return s.current_speech is None and s.agent_state == "listening" and s.user_state != "speaking"
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for entry in list(self.pending):
+            if entry["future"].done():  # the caller gave up (cancelled)
+                self.pending.remove(entry)
+            elif entry["expires_at"] is not None and now > entry["expires_at"]:
+                self._drop(entry, "stale")
+
+    def _drop(self, entry: dict, reason: str) -> None:
+        if entry in self.pending:
+            self.pending.remove(entry)
+        self.counts[reason] += 1
+        if not entry["future"].done():
+            entry["future"].set_result(None)
+        print(f"🔇 Dropping announcement ({reason}): {entry['text'][:60]!r}")
+
+    def _say(self, entry: dict) -> Optional[SpeechHandle]:
+        try:
+            handle = self.session.say(entry["text"], **entry["kwargs"])
+        except Exception as e:
+            print(f"⚠️ Announcement failed: {e}")
+            return None
+        self.playing = {"text": entry["text"], "handle": handle}
+        self.counts["played"] += 1
+        self.queue_wait.add(time.monotonic() - entry["queued_at"])
+        return handle
+
+    async def run(self) -> None:
+        """Release queued announcements whenever the conversation is quiet."""
+        try:
+            while True:
+                self._expire()
+                if not (self.pending and self._idle()):
+                    self._changed.clear()
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._changed.wait(), timeout=1.0)
+                    continue
+                entry = max(self.pending, key=lambda e: (e["priority"], -e["queued_at"]))
+                self.pending.remove(entry)
+                handle = self._say(entry)
+                entry["future"].set_result(handle)
+                if handle is not None:
+                    with contextlib.suppress(Exception):
+                        await handle.wait_for_playout()
+        finally:
+            for entry in self.pending:
+                if not entry["future"].done():
+                    entry["future"].set_result(None)
+            self.pending.clear()
+
+    def stats(self) -> dict:
+        return {"pending": len(self.pending), **self.counts, "queue_wait_secs": self.queue_wait.summary()}
+
+
+# ---------------------------
+# Adaptive endpointing
+# ---------------------------
+class AdaptiveEndpointing:
+    """Per-session end-of-turn tuning.
+
+    Nudges the VAD silence threshold from this speaker's own pauses: down a little after
+    every clean turn, back up when they resume mid-pause or right after the turn ended.
+    It doubles as the session's turn detector: transcripts that read unfinished ("so I
+    wanted to…", "um") get the longer endpointing hold instead of the short one.
+    """
+
+    TRAILING = {
+        "and", "but", "so", "because", "or", "um", "uh", "like", "the", "a", "an", "to",
+        "with", "my", "of", "then", "if", "that", "i", "is", "for", "in",
+    }
+
+    def __init__(self, cfg: "Config", vad):
+        self.cfg = cfg
+        self.vad = vad
+        self.silence = cfg.endpoint_silence_start_secs
+        self.pauses = LatencyStats()  # mid-turn pauses that outlasted the threshold
+        self.turns = 0
+        self.cutoffs = 0  # user resumed right after we ended their turn
+        self.held = 0  # turns the transcript check kept open
+        self._in_turn = False
+        self._silence_started: Optional[float] = None
+        self._committed_at: Optional[float] = None
+
+    # ---- pause statistics ----
+    def on_user_state(self, old_state: str, new_state: str) -> None:
+        now = time.perf_counter()
+        if old_state == "speaking" and new_state == "listening":
+            self._silence_started = now
+        elif new_state == "speaking":
+            if self._committed_at is not None and now - self._committed_at <= self.cfg.endpoint_cutoff_window_secs:
+                self.cutoffs += 1
+                self._set_silence(self.silence + self.cfg.endpoint_step_up_secs, "resumed right after end of turn")
+            elif self._in_turn and self._silence_started is not None:
+                self.pauses.add(now - self._silence_started + self.silence)
+            self._committed_at = None
+            self._in_turn = True
+
+    def on_agent_state(self, new_state: str) -> None:
+        if new_state == "speaking":
+            self._committed_at = None  # speaking after our reply started is a new turn, not a cutoff
+
+    def on_user_turn_committed(self) -> None:
+        self.turns += 1
+        self._in_turn = False
+        self._committed_at = time.perf_counter()
+        # Stay above most of the pauses this speaker has resumed from
+        floor = max(self.cfg.endpoint_silence_min_secs, self.pauses.percentile(75) or 0.0)
+        self._set_silence(max(floor, self.silence - self.cfg.endpoint_step_down_secs))
+
+    def _set_silence(self, secs: float, reason: str = "") -> None:
+        secs = round(min(self.cfg.endpoint_silence_max_secs, max(self.cfg.endpoint_silence_min_secs, secs)), 3)
+        if secs == self.silence:
+            return
+        if reason:
+            print(f"⏱️ Endpoint silence {self.silence:.2f}s → {secs:.2f}s ({reason})")
+        self.silence = secs
+        self.vad.update_options(min_silence_duration=secs)
+
+    # ---- turn detector protocol (semantic end-of-turn signal) ----
+    async def supports_language(self, language: Optional[str]) -> bool:
+        return True
+
+    async def unlikely_threshold(self, language: Optional[str]) -> Optional[float]:
+        return 0.5
+
+    async def predict_end_of_turn(self, chat_ctx) -> float:
+        text = ""
+        for item in reversed(chat_ctx.items):
+            if getattr(item, "role", None) == "user":
+                text = (item.text_content or "").strip().lower()
+                break
+        probability = self.end_of_turn_probability(text)
+        if probability < 0.5:
+            self.held += 1
+        return probability
+
+    @classmethod
+    def end_of_turn_probability(cls, text: str) -> float:
+        if not text:
+            return 1.0
+        if text[-1] in "?!.":
+            return 0.9
+        words = re.findall(r"[a-z']+", text)
+        if words and words[-1] in cls.TRAILING:
+            return 0.1
+        return 0.7
+
+    def stats(self) -> dict:
+        return {
+            "silence_secs": self.silence,
+            "turns": self.turns,
+            "cutoffs": self.cutoffs,
+            "held": self.held,
+            "pauses": self.pauses.summary(),
+        }
+
+
+# ---------------------------
+# Shared VAD inference
+# ---------------------------
+class BatchedVadModel:
+    """Per-stream stand-in for silero's OnnxModel; inference goes through the shared batcher."""
+
+    def __init__(self, batcher: "SharedVadBatcher"):
+        self._batcher = batcher
+        self.sample_rate = batcher.sample_rate
+        self.window_size_samples = 512 if batcher.sample_rate == 16000 else 256
+        self.context_size = 64 if batcher.sample_rate == 16000 else 32
+        self._context = np.zeros(self.context_size, dtype=np.float32)
+        self._state = np.zeros((2, 128), dtype=np.float32)
+
+    def __call__(self, x: np.ndarray) -> float:
+        # Runs on the stream's own executor thread; blocks until the next batch tick
+        return self._batcher.submit(self, x).result()
+
+
+class SharedVadBatcher:
+    """One Silero ONNX session per process that batches pending windows from every session.
+
+    Each VAD stream has at most one window in flight, so a batch holds one window per
+    stream and streams are served in arrival order. A tick runs as soon as every live
+    stream has submitted, the batch is full, or the oldest window has waited `max_wait_secs`.
+
+    Each stream keeps its own audio context and RNN state between windows, so a window gets
+    the same probability batched as it would running alone.
+    """
+
+    def __init__(self, sample_rate: int, max_batch: int, max_wait_secs: float):
+        self.sample_rate = sample_rate
+        self.max_batch = max_batch
+        self.max_wait_secs = max_wait_secs
+        self.session = silero_onnx.new_inference_session(force_cpu=True)
+        self._sr = np.array(sample_rate, dtype=np.int64)
+        self._pending: "queue.Queue[Tuple[float, BatchedVadModel, np.ndarray, concurrent.futures.Future]]" = queue.Queue()
+        self._models: "weakref.WeakSet[BatchedVadModel]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.windows = 0
+        self.wait = LatencyStats()  # submit → result, per window
+        threading.Thread(target=self._run, name=f"shared-vad-{sample_rate}", daemon=True).start()
+
+    def model(self) -> BatchedVadModel:
+        model = BatchedVadModel(self)
+        with self._lock:
+            self._models.add(model)
+        return model
+
+    def submit(self, model: BatchedVadModel, x: np.ndarray) -> concurrent.futures.Future:
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        self._pending.put((time.perf_counter(), model, x, fut))
+        return fut
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._pending.get()]
+            with self._lock:
+                live = len(self._models)
+            deadline = batch[0][0] + self.max_wait_secs
+            while len(batch) < min(self.max_batch, live):
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._infer(batch)
+
+    def _infer(self, batch) -> None:
+        n = len(batch)
+        ctx, win = batch[0][1].context_size, batch[0][1].window_size_samples
+        inputs = np.empty((n, ctx + win), dtype=np.float32)
+        state = np.empty((2, n, 128), dtype=np.float32)
+        for i, (_, model, x, _) in enumerate(batch):
+            inputs[i, :ctx] = model._context
+            inputs[i, ctx:] = x
+            state[:, i] = model._state
+        try:
+            out, new_state = self.session.run(None, {"input": inputs, "state": state, "sr": self._sr})
+        except Exception as e:
+            for *_, fut in batch:
+                fut.set_exception(e)
+            return
+        now = time.perf_counter()
+        self.batches += 1
+        self.windows += n
+        for i, (submitted_at, model, _, fut) in enumerate(batch):
+            model._context = inputs[i, -ctx:].copy()
+            model._state = new_state[:, i].copy()
+            self.wait.add(now - submitted_at)
+            fut.set_result(float(out[i, 0]))
+
+    def stats(self) -> dict:
+        return {
+            "streams": len(self._models),
+            "batches": self.batches,
+            "mean_batch": round(self.windows / self.batches, 2) if self.batches else 0.0,
+            "wait": self.wait.summary(),
+        }
+
+
+_shared_vad: Dict[int, SharedVadBatcher] = {}
+_shared_vad_lock = threading.Lock()
+# The batcher stands in for silero's OnnxModel and VADStream internals; versions it was checked against
+SILERO_BATCHING_VERSIONS = ("1.2.5",)
+
+
+def vad_batching_supported() -> bool:
+    """The installed silero plugin is one the batcher was written against."""
+    return silero_onnx is not None and SILERO_VERSION in SILERO_BATCHING_VERSIONS
+
+
+def load_vad(cfg: "Config", **opts) -> silero.VAD:
+    """The session VAD: the shared batcher when enabled and supported, else silero's own."""
+    if cfg.vad_batching:
+        if vad_batching_supported():
+            return BatchedSileroVAD.load_shared(cfg, **opts)
+        print(
+            f"⚠️ VAD_BATCHING=1 ignored: livekit-plugins-silero {SILERO_VERSION} is not one of "
+            f"{SILERO_BATCHING_VERSIONS}; using the per-session VAD"
+        )
+    return silero.VAD.load(**opts)
+
+
+def shared_vad_batcher(cfg: "Config", sample_rate: int = 16000) -> SharedVadBatcher:
+    """The process-wide batcher for `sample_rate`, created on first use."""
+    with _shared_vad_lock:
+        if sample_rate not in _shared_vad:
+            _shared_vad[sample_rate] = SharedVadBatcher(sample_rate, cfg.vad_batch_max, cfg.vad_batch_max_wait_ms / 1000)
+        return _shared_vad[sample_rate]
+
+
+class BatchedSileroVAD(silero.VAD):
+    """silero.VAD whose streams run inference through the process-wide batcher."""
+
+    @classmethod
+    def load_shared(
+        cls, cfg: "Config", *, min_silence_duration: float, min_speech_duration: float, sample_rate: int = 16000
+    ) -> "BatchedSileroVAD":
+        batcher = shared_vad_batcher(cfg, sample_rate)
+        opts = SileroVADOptions(
+            min_speech_duration=min_speech_duration,
+            min_silence_duration=min_silence_duration,
+            prefix_padding_duration=0.5,
+            max_buffered_speech=60.0,
+            activation_threshold=0.5,
+            sample_rate=sample_rate,
+        )
+        vad = cls(session=batcher.session, opts=opts)
+        vad._batcher = batcher
+        return vad
+
+    def stream(self) -> silero.VADStream:
+        stream = silero.VADStream(self, self._opts, self._batcher.model())
+        self._streams.add(stream)
+        return stream
+
+
+# ---------------------------
+# Avatar health
+# ---------------------------
+class AvatarHealthMonitor:
+    """Watches the media each hedra-avatar* participant publishes.
+
+    One reader task per subscribed track records video frame arrivals (rate, gaps) and
+    audio sample counts, and reports when the avatar starts and stops talking. A/V drift is how far the video media clock has moved ahead of
+    the audio one since both started, in ms; it grows when either side stalls or slips.
+    """
+
+    QUIET_SECS = 0.3  # silence this long separates utterances
+
+    def __init__(self, cfg: Config, tasks: TaskSupervisor):
+        self.cfg = cfg
+        self.tasks = tasks
+        self.avatars: Dict[str, dict] = {}  # identity → running stats
+        self.on_audio_onset: Optional[Callable[[str, float], None]] = None  # (identity, perf_counter)
+        self.on_audio_silence: Optional[Callable[[str, float], None]] = None  # (identity, silence start)
+
+    def _entry(self, identity: str) -> dict:
+        return self.avatars.setdefault(identity, {
+            "watched_at": time.perf_counter(),
+            "frames": deque(maxlen=120),  # recent frame arrival times
+            "gaps": LatencyStats(),
+            "first_video": None,  # (arrival, timestamp_us)
+            "last_video": None,
+            "first_audio": None,  # arrival of the first audio frame
+            "audio_secs": 0.0,
+            "silent_secs": 0.0,  # current run of silence in the published audio
+            "silent_since": None,  # arrival of the first frame of that run
+            "video_seen": asyncio.Event(),
+        })
+
+    def watch(self, track: rtc.Track, identity: str) -> None:
+        self._entry(identity)
+        if track.kind == rtc.TrackKind.KIND_VIDEO:
+            self.tasks.spawn(self._read_video(track, identity), "avatar_video_health", key=f"avatar_video:{identity}")
+        elif track.kind == rtc.TrackKind.KIND_AUDIO:
+            self.tasks.spawn(self._read_audio(track, identity), "avatar_audio_health", key=f"avatar_audio:{identity}")
+
+    def forget(self, identity: str) -> None:
+        self.avatars.pop(identity, None)
+        self.tasks.cancel(f"avatar_video:{identity}")
+        self.tasks.cancel(f"avatar_audio:{identity}")
+
+    async def _read_video(self, track: rtc.Track, identity: str) -> None:
+        stream = rtc.VideoStream(track, capacity=1)
+        try:
+            async for ev in stream:
+                entry = self._entry(identity)
+                now = time.perf_counter()
+                if entry["frames"]:
+                    entry["gaps"].add(now - entry["frames"][-1])
+                entry["frames"].append(now)
+                entry["last_video"] = (now, ev.timestamp_us)
+                if entry["first_video"] is None:
+                    entry["first_video"] = (now, ev.timestamp_us)
+                    entry["video_seen"].set()
+        finally:
+            await stream.aclose()
+
+    async def _read_audio(self, track: rtc.Track, identity: str) -> None:
+        stream = rtc.AudioStream(track, sample_rate=16000, num_channels=1)
+        try:
+            async for ev in stream:
+                entry = self._entry(identity)
+                now = time.perf_counter()
+                if entry["first_audio"] is None:
+                    entry["first_audio"] = now
+                entry["audio_secs"] += ev.frame.duration
+                if _frame_rms(ev.frame) < LipSyncProbe.VOICED_RMS:
+                    silent_before = entry["silent_secs"]
+                    if not silent_before:
+                        entry["silent_since"] = now
+                    entry["silent_secs"] += ev.frame.duration
+                    if silent_before < self.QUIET_SECS <= entry["silent_secs"] and self.on_audio_silence:
+                        self.on_audio_silence(identity, entry["silent_since"])
+                    continue
+                if entry["silent_secs"] >= self.QUIET_SECS and self.on_audio_onset:
+                    self.on_audio_onset(identity, now)
+                entry["silent_secs"] = 0.0
+        finally:
+            await stream.aclose()
+
+    async def wait_for_video(self, identity: str, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._entry(identity)["video_seen"].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def speaking(self, identity: str) -> bool:
+        """The avatar's published audio is currently voiced (or only briefly paused)."""
+        entry = self.avatars.get(identity)
+        return bool(entry and entry["first_audio"] is not None and entry["silent_secs"] < self.QUIET_SECS)
+
+    def stalled(self, identity: str) -> bool:
+        """No video from `identity` for `avatar_stall_secs` (after the startup grace period)."""
+        entry = self.avatars.get(identity)
+        if entry is None:
+            return False
+        now = time.perf_counter()
+        last = entry["frames"][-1] if entry["frames"] else entry["watched_at"] + self.cfg.avatar_start_grace_secs
+        return now - last > self.cfg.avatar_stall_secs
+
+    def snapshot(self, identity: str) -> dict:
+        entry = self.avatars.get(identity)
+        if entry is None:
+            return {}
+        now = time.perf_counter()
+        recent = [t for t in entry["frames"] if now - t <= 2.0]
+        drift_ms = None
+        if entry["first_video"] and entry["last_video"] and entry["first_audio"] is not None:
+            video_secs = (entry["last_video"][1] - entry["first_video"][1]) / 1e6
+            audio_secs = entry["audio_secs"] - (entry["first_video"][0] - entry["first_audio"])
+            drift_ms = round((video_secs - audio_secs) * 1000, 1)
+        return {
+            "fps": round(len(recent) / 2.0, 1),
+            "last_frame_age_secs": round(now - entry["frames"][-1], 2) if entry["frames"] else None,
+            "gaps": entry["gaps"].summary(),
+            "av_drift_ms": drift_ms,
+        }
+
+    def stats(self) -> dict:
+        return {identity: self.snapshot(identity) for identity in self.avatars}
+
+
+# ---------------------------
+# Lip-sync latency
+# ---------------------------
+def _frame_rms(frame: rtc.AudioFrame) -> float:
+    samples = np.frombuffer(frame.data, dtype=np.int16)
+    return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if samples.size else 0.0
+
+
+class LipSyncMeter:
+    """Latency the avatar adds between our TTS audio and its published audio.
+
+    LipSyncProbe reports when each spoken segment's first voiced frame was actually handed
+    to the avatar (wall clock at capture; TTS pushes faster than real time, so the audio
+    duration pushed before it says nothing about when it arrived). The avatar's
+    published audio reports speech onsets (see AvatarHealthMonitor). Each onset is paired
+    with the oldest pending expectation; the difference is the avatar-added latency. The
+    A/V drift at that moment is recorded alongside, per session and per avatar ID.
+    """
+
+    MATCH_WINDOW_SECS = 5.0
+
+    def __init__(self, health: "AvatarHealthMonitor"):
+        self.health = health
+        self.avatar_id: Optional[str] = None
+        self.identity: Optional[str] = None
+        self.pending: deque[float] = deque(maxlen=32)  # expected onsets (perf_counter)
+        self.latency = LatencyStats()
+        self.offset = LatencyStats()  # |A/V drift| at each matched onset
+        self.by_avatar: Dict[str, Dict[str, LatencyStats]] = {}
+        self.unmatched = 0
+
+    def attach(self, session: AgentSession, avatar_id: str, identity: str) -> None:
+        """Wrap the avatar's audio output (set by AvatarSession.start) with a probe."""
+        self.avatar_id, self.identity = avatar_id, identity
+        self.pending.clear()
+        output = session.output.audio
+        if output is not None and not isinstance(output, LipSyncProbe):
+            session.output.audio = LipSyncProbe(self, output)
+
+    def expect_onset(self, at: float) -> None:
+        self.pending.append(at)
+
+    def cancel(self) -> None:
+        self.pending.clear()
+
+    def on_avatar_onset(self, identity: str, at: float) -> None:
+        if identity != self.identity:
+            return
+        while self.pending and at - self.pending[0] > self.MATCH_WINDOW_SECS:
+            self.pending.popleft()
+            self.unmatched += 1
+        if not self.pending or at < self.pending[0]:
+            return  # the avatar spoke before anything we sent could have reached it
+        latency = at - self.pending.popleft()
+        drift_ms = self.health.snapshot(identity).get("av_drift_ms")
+        per_avatar = self.by_avatar.setdefault(self.avatar_id or "unknown", {"latency": LatencyStats(), "offset": LatencyStats()})
+        for stats, value in ((self.latency, latency), (per_avatar["latency"], latency)):
+            stats.add(value)
+        if drift_ms is not None:
+            for stats in (self.offset, per_avatar["offset"]):
+                stats.add(abs(drift_ms) / 1000)
+
+    def stats(self) -> dict:
+        return {
+            "latency": self.latency.summary(),
+            "av_offset": self.offset.summary(),
+            "unmatched": self.unmatched,
+            "by_avatar": {
+                avatar_id: {name: s.summary() for name, s in stats.items()}
+                for avatar_id, stats in self.by_avatar.items()
+            },
+        }
+
+
+class LipSyncProbe(AudioOutput):
+    """Pass-through audio output that notes when each segment's first voiced frame is captured."""
+
+    VOICED_RMS = 500.0
+
+    def __init__(self, meter: LipSyncMeter, next_in_chain: AudioOutput):
+        super().__init__(label="LipSyncProbe", next_in_chain=next_in_chain, sample_rate=next_in_chain.sample_rate)
+        self._meter = meter
+        self._voiced = False  # the current segment's onset has been reported
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        captured_at = time.perf_counter()
+        await super().capture_frame(frame)
+        if not self._voiced and _frame_rms(frame) >= self.VOICED_RMS:
+            self._voiced = True
+            self._meter.expect_onset(captured_at)
+        await self.next_in_chain.capture_frame(frame)
+
+    def flush(self) -> None:
+        super().flush()
+        self._voiced = False
+        self.next_in_chain.flush()
+
+    def clear_buffer(self) -> None:
+        self._voiced = False
+        self._meter.cancel()
+        self.next_in_chain.clear_buffer()
+
+
+# ---------------------------
+# Barge-in latency
+# ---------------------------
+class BargeInMeter:
+    """Time from the user starting to talk over the avatar until the avatar goes quiet.
+
+    Measured from the VAD speech start to two end points: `to_silence` is when the avatar's
+    published audio fell silent (AvatarHealthMonitor), `to_ack` is when the session saw
+    playout stop (the avatar's playback-finished RPC after the buffer was cleared).
+    """
+
+    TIMEOUT_SECS = 3.0
+
+    def __init__(self, cfg: Config, health: AvatarHealthMonitor):
+        self.target_secs = cfg.barge_in_target_ms / 1000
+        self.health = health
+        self.pending: Optional[Tuple[str, float]] = None  # (avatar identity, speech start)
+        self.awaiting_ack: Optional[float] = None
+        self.to_silence = LatencyStats()
+        self.to_ack = LatencyStats()
+        self.barge_ins = 0
+        self.fast_cancels = 0
+        self.over_target = 0
+        self.timeouts = 0
+
+    def start(self, identity: Optional[str], at: float) -> None:
+        self._expire(at)
+        self.barge_ins += 1
+        self.awaiting_ack = at
+        if identity and self.health.speaking(identity):
+            self.pending = (identity, at)
+
+    def _expire(self, now: float) -> None:
+        if self.pending and now - self.pending[1] > self.TIMEOUT_SECS:
+            self.pending = None
+            self.timeouts += 1
+
+    def on_avatar_silence(self, identity: str, at: float) -> None:
+        if not self.pending or self.pending[0] != identity:
+            return
+        latency = max(0.0, at - self.pending[1])  # the avatar may have paused just before the user spoke
+        self.pending = None
+        self.to_silence.add(latency)
+        if latency > self.target_secs:
+            self.over_target += 1
+        print(f"✋ Barge-in: avatar silent {latency * 1000:.0f} ms after the user started speaking")
+
+    def on_agent_state(self, new_state: str, at: float) -> None:
+        if self.awaiting_ack is not None and new_state != "speaking":
+            self.to_ack.add(at - self.awaiting_ack)
+            self.awaiting_ack = None
+
+    def stats(self) -> dict:
+        self._expire(time.perf_counter())
+        return {
+            "barge_ins": self.barge_ins,
+            "fast_cancels": self.fast_cancels,
+            "to_silence": self.to_silence.summary(),
+            "to_ack": self.to_ack.summary(),
+            "target_ms": round(self.target_secs * 1000),
+            "over_target": self.over_target,
+            "timeouts": self.timeouts,
+        }
+
+
+# ---------------------------
+# Memory accounting
+# ---------------------------
+class MemoryMonitor:
+    """Periodic memory snapshots for one Orchestrator.
+
+    Always reports allocation counters for the buffers the session owns (accumulated
+    voice audio, frames being recorded, chat history) plus process RSS. With
+    MEMORY_TRACEMALLOC=1 it also takes tracemalloc snapshots to find the top growth
+    sites. RSS and tracemalloc are process-wide: with JOB_EXECUTOR=thread every session in
+    the process reports the same figures, so they are marked shared and counted once per pid.
+    """
+
+    def __init__(self, cfg: Config, orchestrator: "Orchestrator"):
+        self.cfg = cfg
+        self.orchestrator = orchestrator
+        self.shared_process = cfg.job_executor == "thread"
+        self.started_at = time.time()
+        self.baseline_rss_mb: float = 0.0
+        self.peak_rss_mb: float = 0.0
+        self.last_sample: dict = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        if self.cfg.memory_tracemalloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.cfg.memory_trace_frames)
+            self._baseline = self._take_snapshot()
+            self._previous = self._baseline
+        self.baseline_rss_mb = self._rss_mb()
+        print(f"🧠 Memory monitor started (baseline RSS {self.baseline_rss_mb:.1f} MB, tracemalloc={self.cfg.memory_tracemalloc})")
+
+    @staticmethod
+    def _rss_mb() -> float:
+        if not PSUTIL_AVAILABLE:
+            return 0.0
+        try:
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def _session_counters(self) -> dict:
+        """Sizes of the buffers this session holds on to."""
+        orch = self.orchestrator
+        counters = {
+            "voice_segments": 0,
+            "voice_bytes": 0,
+            "recording_frames": 0,
+            "recording_bytes": 0,
+            "chat_items": 0,
+        }
+        if orch.cloner:
+            counters["voice_segments"] = len(orch.cloner.voice_accumulator)
+            counters["voice_bytes"] = sum(len(seg.raw_data) for seg in orch.cloner.voice_accumulator)
+        if orch.agent:
+            frames = orch.agent.recording_frames
+            counters["recording_frames"] = len(frames)
+            counters["recording_bytes"] = sum(len(f.data) * 2 for f in frames)  # int16 samples
+        if orch.session:
+            try:
+                counters["chat_items"] = len(orch.session.history.items)
+            except Exception:
+                pass
+        return counters
+
+    @staticmethod
+    def _format_stat(stat: tracemalloc.StatisticDiff) -> str:
+        frame = stat.traceback[0]
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} {stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks)"
+
+    def sample(self) -> dict:
+        """Take one snapshot and return the stats published to the session registry."""
+        rss = self._rss_mb()
+        self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        stats = {
+            "rss_mb": round(rss, 1),
+            "rss_growth_mb": round(rss - self.baseline_rss_mb, 1),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rss_shared": self.shared_process,
+            **self._session_counters(),
+        }
+        if self._previous is not None:
+            snapshot = self._take_snapshot()
+            top = snapshot.compare_to(self._previous, "lineno")[: self.cfg.memory_top_n]
+            stats["traced_mb"] = round(sum(s.size for s in snapshot.statistics("filename")) / (1024 * 1024), 1)
+            stats["top_growth"] = [self._format_stat(s) for s in top if s.size_diff > 0]
+            self._previous = snapshot
+        self.last_sample = stats
+        return stats
+
+    def leak_report(self) -> List[str]:
+        """Summarize growth since the session started; called when the room closes."""
+        stats = self.sample()
+        scope = "process " if self.shared_process else ""  # growth includes the other sessions
+        lines = [
+            f"{scope}RSS {self.baseline_rss_mb:.1f} → {stats['rss_mb']:.1f} MB (peak {stats['peak_rss_mb']:.1f} MB) over {time.time() - self.started_at:.0f}s",
+            f"voice buffer {stats['voice_segments']} segments / {stats['voice_bytes'] / 1024:.0f} KiB, "
+            f"recording {stats['recording_frames']} frames, chat {stats['chat_items']} items",
+        ]
+        if self._baseline is not None:
+            diff = self._take_snapshot().compare_to(self._baseline, "lineno")
+            lines += [scope + self._format_stat(s) for s in diff[: self.cfg.memory_top_n] if s.size_diff > 0]
+        return lines
+
+
+class WorkerLoadEstimator:
+    """Worker load reported to LiveKit.
+
+    Combines CPU with what every session in this worker publishes to the registry: memory,
+    event-loop lag, session count, live avatar sessions and in-flight media jobs. Each
+    signal is scaled against its capacity and the highest one is reported, so the
+    dispatcher backs off as soon as any of them nears its limit.
+    """
+
+    CPU_SAMPLES = 5  # load callbacks averaged into the CPU signal
+
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.registry = SessionRegistry(cfg)
+        self.signals: Dict[str, float] = {}
+        self._cpu_samples: deque = deque(maxlen=self.CPU_SAMPLES)
+        if PSUTIL_AVAILABLE:
+            psutil.cpu_percent(interval=None)  # the first reading only sets the reference point
+        self._over = False
+        self.drain_started: Optional[float] = None
+        self._drain_logged = 0.0
+
+    @staticmethod
+    def _ratio(value: float, capacity: float) -> float:
+        return value / capacity if capacity > 0 else 0.0
+
+    def _cpu_load(self) -> float:
+        """Host CPU use averaged over the last few load callbacks."""
+        if not PSUTIL_AVAILABLE:
+            return 0.0
+        self._cpu_samples.append(psutil.cpu_percent(interval=None) / 100)  # since the previous call
+        return sum(self._cpu_samples) / len(self._cpu_samples)
+
+    def __call__(self, worker: agents.Worker) -> float:
+        if getattr(worker, "_draining", False):
+            return self._drain_tick(worker)
+        cfg = self.cfg
+        entries = self.registry.entries(worker_pid=cfg.worker_pid)
+        self.signals = {
+            "cpu": self._cpu_load(),
+            # RSS is per process, and in thread mode several sessions share one: count each pid once
+            "memory": self._ratio(sum({e.get("pid"): e.get("rss_mb", 0.0) for e in entries}.values()), cfg.worker_memory_budget_mb),
+            "loop_lag": self._ratio(max((e.get("loop_lag_ms", 0.0) for e in entries), default=0.0), cfg.load_max_loop_lag_ms),
+            "sessions": self._ratio(len(entries), cfg.load_max_sessions),
+            "avatars": self._ratio(sum(1 for e in entries if e.get("avatar_active")), cfg.load_max_avatar_sessions),
+            "media": self._ratio(sum(e.get("media_jobs", 0) for e in entries), cfg.load_max_media_jobs),
+        }
+        load = min(1.0, max(self.signals.values()))
+        over = load >= cfg.load_threshold
+        if over != self._over:
+            self._over = over
+            top = max(self.signals, key=self.signals.get)
+            print(f"📈 Worker load {load:.2f} {'over' if over else 'back under'} threshold {cfg.load_threshold} (top signal: {top})")
+        return load
+
+
+    @property
+    def draining(self) -> bool:
+        return self.drain_started is not None
+
+    def _drain_tick(self, worker: agents.Worker) -> float:
+        """While draining: hand each running job its deadline, log progress, report full load."""
+        now = time.time()
+        jobs = [info.job.id for info in worker.active_jobs]
+        if self.drain_started is None:
+            self.drain_started = now
+            deadline = now + self.cfg.drain_timeout_secs
+            notices = DrainNotices(self.cfg)
+            for job_id in jobs:
+                notices.post(job_id, deadline)
+            print(f"🚰 Draining worker: {len(jobs)} sessions to finish within {self.cfg.drain_timeout_secs:.0f}s")
+        elif now - self._drain_logged >= self.cfg.drain_log_interval_secs:
+            self._drain_logged = now
+            elapsed = now - self.drain_started
+            print(
+                f"🚰 Drain progress: {len(jobs)} sessions left after {elapsed:.0f}s "
+                f"({max(0.0, self.cfg.drain_timeout_secs - elapsed):.0f}s to deadline)"
+            )
+        return 1.0
+
+
+worker_load = WorkerLoadEstimator(Config())
 
 
 # ---------------------------
 # Voice cloning
 # ---------------------------
 class VoiceCloner:
+    FINAL_LABEL = "Final User Voice Clone"  # name prefix of session clones; the voice GC keys off it
+
     def __init__(self, cfg: Config, room: rtc.Room, orchestrator=None):
         self.cfg = cfg
         self.room = room
@@ -312,7 +2413,7 @@ class VoiceCloner:
     async def _create_clone_async(self) -> str:
         """Async helper to create the voice clone."""
         try:
-            voice_id = await self._create_clone(trim_to_target=False, label_prefix="Final User Voice Clone")
+            voice_id = await self._create_clone(trim_to_target=False, label_prefix=self.FINAL_LABEL)
             if voice_id and voice_id != self.cfg.avatar_voice_id:
                 # Store in participant metadata for frontend access
                 try:
@@ -346,14 +2447,15 @@ class VoiceCloner:
             from io import BytesIO
 
             buf = BytesIO()
-            combined.export(buf, format="mp3", bitrate="192k")
+            # Encoding and the ElevenLabs upload are blocking; keep them off the event loop
+            await asyncio.to_thread(combined.export, buf, format="mp3", bitrate="192k")
             buf.seek(0)
 
             ts = datetime.now().strftime("%Y%m%d_%H%M%S")
             name = f"{label_prefix} ({ts})"
             print(f"🚀 ElevenLabs creating voice: {name} from {len(combined)/1000:.1f}s audio")
 
-            voice = self.client.voices.ivc.create(name=name, files=[buf])
+            voice = await asyncio.to_thread(self.client.voices.ivc.create, name=name, files=[buf])
             vid = voice.voice_id
             self.created_voice_ids.append(vid)  # Track for cleanup
             print(f"🎉 Voice clone created successfully: {vid}")
@@ -390,21 +2492,147 @@ class VoiceCloner:
             print("⚠️ ELEVEN_API_KEY not set. Voice cloning disabled.")
 
 
-    async def cleanup_voices(self) -> None:
-        """Delete all created voice clones from ElevenLabs"""
-        if not (self.client and self.created_voice_ids):
-            return
-        
-        print(f"🧹 Cleaning up {len(self.created_voice_ids)} voice clones...")
-        for voice_id in self.created_voice_ids:
+    async def cleanup_voices(self) -> None:
+        """Delete all created voice clones from ElevenLabs"""
+        if not (self.client and self.created_voice_ids):
+            return
+        
+        print(f"🧹 Cleaning up {len(self.created_voice_ids)} voice clones...")
+
+        async def _delete(voice_id: str) -> None:
+            try:
+                await asyncio.to_thread(self.client.voices.delete, voice_id=voice_id)
+                print(f"🗑️ Deleted voice clone: {voice_id}")
+            except Exception as e:
+                print(f"⚠️ Failed to delete voice {voice_id}: {e}")
+
+        await asyncio.gather(*(_delete(voice_id) for voice_id in self.created_voice_ids))
+        self.created_voice_ids.clear()
+        print("✅ Voice cleanup completed")
+
+    def release(self) -> None:
+        """Drop accumulated audio so the session's buffers can be reclaimed."""
+        self.voice_accumulator.clear()
+        self.accumulated_secs = 0.0
+        self.clone_creation_future = None
+
+
+# ---------------------------
+# Orphaned voice GC
+# ---------------------------
+class VoiceGarbageCollector:
+    """Deletes voice clones leaked by sessions that died without cleaning up (SIGKILL, OOM).
+
+    Runs on a daemon thread in the worker process. A clone is an orphan when its name has
+    the cloner's label prefix, it is older than `voice_gc_min_age_secs`, and no live session
+    in the registry lists it. The registry only holds sessions sharing this `state_dir`; a
+    session on another host looks orphaned once it outlives the age floor, so deletion
+    (VOICE_GC_DRY_RUN=0) is only safe when every host shares the state_dir or there is one
+    host. By default a pass only reports what it would delete. Only one pass runs per host at
+    a time.
+    """
+
+    PREFIX = f"{VoiceCloner.FINAL_LABEL} ("
+
+    def __init__(self, cfg: Config):
+        self.cfg = cfg
+        self.registry = SessionRegistry(cfg)
+        self.lock_path = os.path.join(cfg.state_dir, "voice_gc.lock")
+        self.client = None
+        self.metrics: Dict[str, int] = {
+            "runs": 0, "scanned": 0, "orphans": 0, "deleted": 0, "failed": 0, "live": 0, "too_young": 0,
+        }
+        self._started = False
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        """Start the GC thread once; a no-op when disabled or ElevenLabs isn't configured."""
+        with self._lock:
+            if self._started or not self.cfg.voice_gc_enabled:
+                return
+            self._started = True
+            api_key = os.getenv("ELEVEN_API_KEY")
+            if not (ELEVENLABS_AVAILABLE and api_key):
+                return
+            self.client = ElevenLabs(api_key=api_key)
+            threading.Thread(target=self._run, name="voice-gc", daemon=True).start()
+            mode = "dry run" if self.cfg.voice_gc_dry_run else "deleting"
+            print(f"🧹 Voice GC started ({mode}, every {self.cfg.voice_gc_interval_secs:.0f}s)")
+
+    def _run(self) -> None:
+        while True:
             try:
-                self.client.voices.delete(voice_id=voice_id)
-                print(f"🗑️ Deleted voice clone: {voice_id}")
+                self.run_once()
             except Exception as e:
-                print(f"⚠️ Failed to delete voice {voice_id}: {e}")
-        
-        self.created_voice_ids.clear()
-        print("✅ Voice cleanup completed")
+                print(f"⚠️ Voice GC pass failed: {e}")
+            time.sleep(self.cfg.voice_gc_interval_secs)
+
+    def _live_voice_ids(self) -> set:
+        return {vid for entry in self.registry.entries() for vid in entry.get("voice_ids", [])}
+
+    def _list_clones(self) -> List[Any]:
+        voices, token = [], None
+        while True:
+            page = self.client.voices.search(
+                search=VoiceCloner.FINAL_LABEL, voice_type="personal", page_size=100, next_page_token=token
+            )
+            voices += [v for v in page.voices if (v.name or "").startswith(self.PREFIX)]
+            if not page.has_more or not page.next_page_token:
+                return voices
+            token = page.next_page_token
+
+    def run_once(self) -> dict:
+        """One GC pass; returns this pass's counts (also folded into `metrics`)."""
+        os.makedirs(self.cfg.state_dir, exist_ok=True)
+        with open(self.lock_path, "w") as lock:
+            if FCNTL_AVAILABLE:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return {}  # another worker on this host is already collecting
+            started = time.perf_counter()
+            run = dict.fromkeys(self.metrics, 0)
+            run["runs"] = 1
+            now = time.time()
+            live = self._live_voice_ids()
+            orphans = []
+            for voice in self._list_clones():
+                run["scanned"] += 1
+                if voice.voice_id in live:
+                    run["live"] += 1
+                elif voice.created_at_unix is None or now - voice.created_at_unix < self.cfg.voice_gc_min_age_secs:
+                    run["too_young"] += 1
+                else:
+                    orphans.append(voice)
+            orphans = orphans[: self.cfg.voice_gc_max_per_run]
+            run["orphans"] = len(orphans)
+
+            for i in range(0, len(orphans), self.cfg.voice_gc_batch_size):
+                if i:
+                    time.sleep(self.cfg.voice_gc_batch_pause_secs)
+                live = self._live_voice_ids()  # a session may have claimed one since the listing
+                for voice in orphans[i : i + self.cfg.voice_gc_batch_size]:
+                    if voice.voice_id in live:
+                        run["live"] += 1
+                        continue
+                    if self.cfg.voice_gc_dry_run:
+                        print(f"🧹 [dry run] Would delete orphaned voice {voice.voice_id} ({voice.name})")
+                        continue
+                    try:
+                        self.client.voices.delete(voice_id=voice.voice_id)
+                        run["deleted"] += 1
+                        print(f"🗑️ Deleted orphaned voice {voice.voice_id} ({voice.name})")
+                    except Exception as e:
+                        run["failed"] += 1
+                        print(f"⚠️ Failed to delete orphaned voice {voice.voice_id}: {e}")
+
+            for key, n in run.items():
+                self.metrics[key] += n
+            print(f"🧹 Voice GC pass in {time.perf_counter() - started:.1f}s: {run}")
+            return run
+
+
+voice_gc = VoiceGarbageCollector(Config())
 
 
 # ---------------------------
@@ -418,14 +2646,26 @@ class Assistant(Agent):
         self.cloner = cloner
         self.orchestrator = orchestrator  # reference to orchestrator for state access
         self.current_personality = "Core"  # default personality
-        super().__init__(instructions=Msg.ALEXA_INSTRUCTIONS if is_alexa else Msg.AVATAR_INSTRUCTIONS)
+        self.recording_frames: List[rtc.AudioFrame] = []  # frames of the utterance being recorded for cloning
+        self.intents = IntentMatcher()
+        self.prompt = PromptAssembler(cfg)
+        self._fast_path: Dict[str, Tuple[float, asyncio.Task]] = {}  # tool → (dispatched_at, task)
+        # Persona and task are added per request (see llm_node), so the instructions never change
+        super().__init__(instructions=Msg.BASE_INSTRUCTIONS)
+
+    def persona(self) -> str:
+        """The persona for the next reply: a chosen personality, else the one for the current mode."""
+        if self.current_personality in Msg.PERSONALITY_INSTRUCTIONS:
+            return Msg.PERSONALITY_INSTRUCTIONS[self.current_personality]
+        if self.orchestrator is None or self.orchestrator.current_mode_is_alexa:
+            return Msg.ALEXA_INSTRUCTIONS
+        return Msg.AVATAR_INSTRUCTIONS
 
     async def update_personality(self, personality_name: str) -> None:
         """Update the agent's personality by changing instructions dynamically."""
         if personality_name in Msg.PERSONALITY_INSTRUCTIONS:
-            self.current_personality = personality_name
-            new_instructions = Msg.PERSONALITY_INSTRUCTIONS[personality_name]
-            await self.update_instructions(new_instructions)
+            self.current_personality = personality_name  # picked up by the next request (see persona())
+            self.orchestrator._schedule_snapshot()
             print(f"🎭 Updated personality to: {personality_name}")
             
             # Generate personality-specific confirmation message
@@ -441,7 +2681,7 @@ class Assistant(Agent):
             }
             
             confirmation_message = personality_descriptions.get(personality_name, f"I've changed my personality to {personality_name}.")
-            await self.session.say(confirmation_message)
+            await self.orchestrator.speech.say(confirmation_message, key="personality_confirmation")
         else:
             print(f"⚠️ Unknown personality: {personality_name}")
 
@@ -453,13 +2693,16 @@ class Assistant(Agent):
         Args:
             prompt (str, optional): Custom prompt for avatar generation. Defaults to "".
         """
+        if not prompt and (fast := await self._take_fast_path_result("generate_avatar")):
+            return fast
+        self.prompt.task = None
         try:
-            pid = await _get_first_remote_participant(self.room)
+            pid = self.orchestrator.participants.primary_user()
             if not pid:
                 return "I don't see you connected yet."
             
             # Call the frontend generateAvatar RPC method with the prompt
-            await _rpc_frontend(self.room, pid, method="generateAvatar", payload=f'{{"prompt": "{prompt}"}}')
+            await self._frontend_action("generateAvatar", {"prompt": prompt}, destination=pid, description="start generating the avatar")
             prompt_message = f" with your custom request: '{prompt}'" if prompt else ""
             return f"Perfect! I'm generating your avatar now{prompt_message}. This might take a moment..."
             
@@ -476,12 +2719,12 @@ class Assistant(Agent):
         try:
             # Check if avatar exists by checking avatar ID from multiple sources
 
-            pid = await _get_first_remote_participant(self.room)
+            pid = self.orchestrator.participants.primary_user()
             if not pid:
                 return "I don't see you connected yet."
             
             # Call the frontend modifyAvatar RPC method with the filter prompt
-            await _rpc_frontend(self.room, pid, method="modifyAvatar", payload=f'{{"prompt": "{filter_prompt}"}}')
+            await self._frontend_action("modifyAvatar", {"prompt": filter_prompt}, destination=pid, description="apply the avatar modification")
             prompt_message = f" with filter: '{filter_prompt}'" if filter_prompt else ""
             return f"Applying modifications to your avatar{prompt_message}..."
             
@@ -492,16 +2735,18 @@ class Assistant(Agent):
     @function_tool()
     async def start_camera(self, context: RunContext) -> str:
         """Activate the user's camera for photo capture (triggered by 'take photo' or 'take my photo' or 'take a photo' or something similar)."""
+        if fast := await self._take_fast_path_result("start_camera"):
+            return fast
         try:
             # Check if camera is already started
-            if self.orchestrator.camera_started:
+            if self.orchestrator.ui.camera_active:
                 return "I can see your camera is already active! You look great. Say 'capture photo' when you're ready to capture."
             
-            pid = await _get_first_remote_participant(self.room)
+            pid = self.orchestrator.participants.primary_user()
             if not pid:
                 return "I don't see you connected yet."
-            await _rpc_frontend(self.room, pid, method="startCamera")
-            self.orchestrator.camera_started = True
+            await self.orchestrator.rpc.call("startCamera", destination=pid)
+            self.orchestrator.ui.observe("camera_active", True)
             return "Great! Say 'capture photo' whenever you're ready to capture."
         except Exception as e:
             return f"I couldn't start the camera: {e}"
@@ -509,24 +2754,32 @@ class Assistant(Agent):
     @function_tool()
     async def take_photo(self, context: RunContext) -> str:
         """Capture a photo for the user's avatar (triggered by 'capture photo')."""
+        if fast := await self._take_fast_path_result("take_photo"):
+            return fast
         try:
-            # Check if camera is started first - be more permissive and check multiple sources
-            camera_ready = (
-                self.orchestrator.camera_started or  # Backend tracked state
-                await self._is_camera_active_via_frontend()  # Check frontend directly
-            )
-            
-            if not camera_ready:
-                await self.start_camera(context)
-                return "Let's start your camera first! Then say 'capture photo'."
-            
-            pid = await _get_first_remote_participant(self.room)
+            pid = self.orchestrator.participants.primary_user()
             if not pid:
                 return "You're not connected yet. Join the room and try 'take photo' again."
-            await _rpc_frontend(self.room, pid, method="capturePhoto")
+
+            # The UI mirror usually knows whether the camera is on; ask the frontend only when it doesn't
+            camera_active = self.orchestrator.ui.camera_active
+            if camera_active is None:
+                camera_active = await self._probe_camera(pid)
+            if not camera_active:
+                await self.start_camera(context)
+                return "Let's start your camera first! Then say 'capture photo'."
+
+            # The frontend stops the camera once the photo is taken
+            await self._frontend_action(
+                "capturePhoto", destination=pid, description="capture the photo",
+                on_success=lambda: self.orchestrator.ui.observe("camera_active", False),
+            )
             
             # Start monitoring for avatar creation completion to trigger mode switch
-            asyncio.create_task(self.orchestrator._monitor_avatar_creation())
+            self.orchestrator.tasks.spawn(
+                self.orchestrator._monitor_avatar_creation(), "monitor_avatar_creation",
+                key="monitor_avatar_creation", supersede=False,
+            )
             
             return (
                 "Perfect! I've captured your photo. I'll start creating your avatar now."
@@ -534,32 +2787,99 @@ class Assistant(Agent):
         except Exception as e:
             return f"I couldn't take the photo: {e}"
     
-    async def _is_camera_active_via_frontend(self) -> bool:
-        """Check if camera is active by querying frontend directly"""
+    # ---- Local intent fast-path ----
+    def handle_final_transcript(self, transcript: str) -> None:
+        """Dispatch a matching UI tool right away; the LLM keeps generating the spoken reply."""
+        tool = self.intents.match(transcript, self.orchestrator.current_mode_is_alexa)
+        if tool == "describe_avatar":
+            # Generating now would start without a description; set up the turn that collects it
+            print(f"⚡ Local intent 'describe_avatar' from transcript: {transcript!r}")
+            self.prompt.task = Msg.AVATAR_DESCRIPTION_TASK
+            return
+        if not tool or tool in self._fast_path:
+            return
+        print(f"⚡ Local intent '{tool}' from transcript: {transcript!r}")
+        task = self.orchestrator.tasks.spawn(getattr(self, tool)(None), f"fast_path:{tool}", key=f"fast_path:{tool}", supersede=False)
+        if task is None:
+            return
+        self._fast_path[tool] = (time.perf_counter(), task)
+        self.orchestrator.tasks.spawn(self._expire_fast_path(tool, task), f"fast_path_expiry:{tool}")
+
+    def reset_fast_path(self) -> None:
+        """Drop fast-path dispatches still pending (e.g. for a client that went away)."""
+        for tool in list(self._fast_path):
+            self.orchestrator.tasks.cancel(f"fast_path:{tool}")
+        self._fast_path.clear()
+
+    async def _take_fast_path_result(self, tool: str) -> Optional[str]:
+        """If the fast path already ran `tool`, hand its result to the LLM's call instead of re-running."""
+        entry = self._fast_path.pop(tool, None)
+        if entry is None or asyncio.current_task() is entry[1]:
+            if entry is not None:
+                self._fast_path[tool] = entry  # the fast-path dispatch itself
+            return None
+        dispatched_at, task = entry
+        self.intents.saved.add(time.perf_counter() - dispatched_at)
         try:
-            pid = await _get_first_remote_participant(self.room)
-            if not pid:
-                return False
-            
-            # Send RPC to check camera state
-            result = await _rpc_frontend(self.room, pid, method="isCameraActive")
-            return result == "true"
+            return await asyncio.shield(task)
         except Exception:
-            return False  # Assume not active if we can't check
+            return None
+
+    async def _expire_fast_path(self, tool: str, task: asyncio.Task) -> None:
+        await asyncio.sleep(self.cfg.fast_path_ttl_secs)
+        entry = self._fast_path.get(tool)
+        if entry is not None and entry[1] is task:
+            del self._fast_path[tool]
+            self.intents.llm_skipped += 1
+
+    async def _frontend_action(
+        self, method: str, payload: Optional[dict] = None, *, destination: str, description: str,
+        on_success: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Run a tool's frontend RPC. In deferred mode the tool returns right away and the
+        outcome is fed back into the conversation when the RPC completes."""
+        if not self.cfg.deferred_tool_rpcs:
+            await self.orchestrator.rpc.call(method, payload, destination=destination)
+            if on_success:
+                on_success()
+            return
+        self.orchestrator.tasks.spawn(
+            self.orchestrator._run_deferred_rpc(method, payload, destination, description, on_success),
+            f"deferred_rpc:{method}",
+        )
+
+    async def _probe_camera(self, destination: str) -> bool:
+        """Ask the frontend whether its camera is on and remember the answer."""
+        try:
+            active = await self.orchestrator.rpc.call("isCameraActive", destination=destination) in (True, "true")
+        except FrontendRpcError as e:
+            print(f"⚠️ Camera probe failed: {e}")
+            return False  # not remembered: the next call asks again
+        self.orchestrator.ui.observe("camera_active", active)
+        return active
 
     @function_tool()
     async def skip_photo(self, context: RunContext) -> str:
         """Skip the photo capture and continue with a default avatar."""
+        if fast := await self._take_fast_path_result("skip_photo"):
+            return fast
         try:
-            pid = await _get_first_remote_participant(self.room)
+            pid = self.orchestrator.participants.primary_user()
             if not pid:
                 return "Okay, we'll skip the photo once you're connected."
-            await _rpc_frontend(self.room, pid, method="skipPhoto")
+            await self.orchestrator.rpc.call("skipPhoto", destination=pid)
             return "No problem — we'll use a default avatar for now."
         except Exception as e:
             return f"I couldn't skip the photo: {e}"
 
     # ---- Custom STT node (records user speech for cloning) ----
+    async def llm_node(self, chat_ctx: ChatContext, tools: list, model_settings: ModelSettings):
+        if self.prompt.over_budget(chat_ctx):
+            self.orchestrator.tasks.spawn(self.prompt.compact(self), "compact_history", key="compact_history", supersede=False)
+        chat_ctx = self.prompt.assemble(chat_ctx, self.persona())
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
+
     async def stt_node(
         self, audio: AsyncIterable[rtc.AudioFrame], model_settings: ModelSettings
     ) -> Optional[AsyncIterable[stt.SpeechEvent]]:
@@ -568,15 +2888,15 @@ class Assistant(Agent):
                 yield ev
             return
 
-        current_frames: List[rtc.AudioFrame] = []
         speech_started = False
         speech_id: Optional[str] = None
+        self.recording_frames = []
 
         async def _tap_and_forward():
-            nonlocal current_frames, speech_started
+            nonlocal speech_started
             async for f in audio:
                 if speech_started:
-                    current_frames.append(f)
+                    self.recording_frames.append(f)
                 yield f
 
         async for ev in Agent.default.stt_node(self, _tap_and_forward(), model_settings):
@@ -585,13 +2905,13 @@ class Assistant(Agent):
                 if self.orchestrator.current_mode_is_alexa and not self.cloner.clone_creation_attempted:
                     speech_started = True
                     speech_id = datetime.now().strftime("%H%M%S")
-                    current_frames = []
+                    self.recording_frames = []
                     print(f"🎙️ Recording speech {speech_id} for voice cloning…")
             elif ev.type == stt.SpeechEventType.END_OF_SPEECH:
-                if speech_started and current_frames and self.orchestrator.current_mode_is_alexa and not self.cloner.clone_creation_attempted:
-                    await self.cloner.save_frames(current_frames, speech_id)
+                if speech_started and self.recording_frames and self.orchestrator.current_mode_is_alexa and not self.cloner.clone_creation_attempted:
+                    await self.cloner.save_frames(self.recording_frames, speech_id)
                 speech_started = False
-                current_frames = []
+                self.recording_frames = []
                 speech_id = None
             yield ev
 
@@ -606,33 +2926,84 @@ class Orchestrator:
         self.session: Optional[AgentSession] = None
         self.avatar: Optional[hedra.AvatarSession] = None
         self.cloner: Optional[VoiceCloner] = None
-        self.current_mode_is_alexa = True  # start in Alexa mode
-        self.camera_started = False  # track camera state
-        self._cleanup_registered = False  # track if cleanup is registered
+        self.state = ModeStateMachine()  # starts in Alexa mode
+        self.ui = ClientUiState()  # mirror of the frontend UI (camera)
         self.voice_cloning_enabled = False  # store voice cloning preference
         self.agent: Optional[Assistant] = None
         self.room_service: Optional[api.RoomService] = None
-        self._has_greeted = False  # prevent duplicate greetings
+        self.session_id = ctx.job.id
+        self.registry = SessionRegistry(cfg)
+        self.memory = MemoryMonitor(cfg, self)
+        self.loop_lag_ms = 0.0  # measured by _monitor_load
+        self.admission = AdmissionController(cfg)
+        self.admitted = asyncio.Event()
+        self.parked: Optional[dict] = None  # state kept while the user is away (see _park_session)
+        self.resumes = 0
+        self.drain = DrainNotices(cfg)
+        self.drain_deadline: Optional[float] = None
+        self.avatar_identity: Optional[str] = None  # the avatar participant currently receiving our audio
+        self._avatar_generation = 0
+        self._avatar_restarts: List[float] = []  # consecutive health restarts (reset once healthy)
+        self._avatar_healthy_since: Optional[float] = None
+        self.lkapi: Optional[api.LiveKitAPI] = None
+        self.tasks = TaskSupervisor(max_live=cfg.max_session_tasks)  # tasks owned by this session
+        self.avatar_health = AvatarHealthMonitor(cfg, self.tasks)
+        self.lipsync = LipSyncMeter(self.avatar_health)
+        if cfg.lipsync_probe:
+            self.avatar_health.on_audio_onset = self.lipsync.on_avatar_onset
+        self.barge_in = BargeInMeter(cfg, self.avatar_health)
+        self.avatar_health.on_audio_silence = self.barge_in.on_avatar_silence
+        self._avatar_identities: set[str] = set()  # Hedra participants started by this session
+        self._avatar_lock = asyncio.Lock()  # one filter / restart / replacement swaps the avatar at a time
+        self._retired_tts: List[elevenlabs.TTS] = []  # TTS instances replaced by voice switches
+        self._close_task: Optional[asyncio.Task] = None
+        self._closed = asyncio.Event()
+        self.reveal_timings: Dict[str, float] = {}  # per-stage timings of the last avatar reveal
+        self.avatar_ids = AvatarIdResolver(cfg.default_avatar_id)
+        self.participants = ParticipantIndex()
+        self.speculation = SpeculationTracker()
+        self.speech: Optional[SpeechScheduler] = None
+        self.endpointing: Optional[AdaptiveEndpointing] = None
+        self.snapshots = SessionSnapshotStore(cfg)
+        self.restored_from: Optional[str] = None  # job whose snapshot this session resumed
+        self._snapshot_dirty = False
+        self._snapshot_writing = False
+        self.state.on_transition = self._on_mode_transition
+        self.rpc = FrontendRpcClient(
+            ctx.room, self.participants.primary_user, cfg.rpc_default_timeout_secs
+        )
 
     # ---- Session setup ----
     async def start(self) -> None:
         print("🚀 Starting orchestrator…")
+        self.lkapi = api.LiveKitAPI()
+        self.room_service = self.lkapi.room
+        vad_opts = dict(
+            # Starting point only; AdaptiveEndpointing retunes it from this speaker's pauses
+            min_silence_duration=self.cfg.endpoint_silence_start_secs,
+            min_speech_duration=0.1,  # Minimum speech duration to trigger (100ms)
+        )
+        # Reserve upstream capacity before anything can run: no STT, LLM or tools until admitted
+        if not await self._admit():
+            return
+
+        vad = load_vad(self.cfg, **vad_opts)
+        self.endpointing = AdaptiveEndpointing(self.cfg, vad)
         llm = openai.LLM(model=self.cfg.llm_model, temperature=0.7)
-        lkapi = api.LiveKitAPI()
-        room_service = lkapi.room
-        self.room_service = room_service
         # Build session
         self.session = AgentSession(
             stt=deepgram.STT(model=self.cfg.deepgram_model, language="multi"),
             llm=llm,
             tts=elevenlabs.TTS(voice_id=self.cfg.alexa_voice_id, model=self.cfg.eleven_tts_model),
-            vad=silero.VAD.load(
-                # More lenient VAD settings to prevent cutting off user speech
-                min_silence_duration=1.5,  # Wait 1.5s of silence before ending speech (was ~0.5s default)
-                min_speech_duration=0.1,  # Minimum speech duration to trigger (100ms)
-            ),
+            vad=vad,
+            turn_detection=self.endpointing,
+            min_endpointing_delay=self.cfg.endpoint_delay_secs,
+            max_endpointing_delay=self.cfg.endpoint_hold_secs,
+            preemptive_generation=self.cfg.preemptive_generation,
         )
 
+        self.speech = SpeechScheduler(self.session, self.cfg.speech_queue_max)
+
         # Voice cloner bound to the room
         self.cloner = VoiceCloner(self.cfg, self.ctx.room, self)
 
@@ -643,63 +3014,427 @@ class Orchestrator:
             room=self.ctx.room,
             agent=self.agent,
             room_output_options=RoomOutputOptions(audio_enabled=True),
-            room_input_options=RoomInputOptions(noise_cancellation=noise_cancellation.BVC()),
+            room_input_options=RoomInputOptions(
+                noise_cancellation=noise_cancellation.BVC(),
+                # The grace window decides when a disconnect ends the session, not the session itself
+                close_on_disconnect=self.cfg.resume_grace_secs <= 0,
+            ),
         )
 
+        # Seed the avatar ID cache from what is already known; later updates arrive as events
+        self.avatar_ids.update("metadata", self._get_avatar_id_from_room())
+        self.avatar_ids.update("file", await asyncio.to_thread(self._read_avatar_id_file))
+
         # Event hooks
+        self.participants.seed(self.ctx.room)
         self._wire_events()
+        self.tasks.spawn(self.speech.run(), "speech_scheduler", key="speech_scheduler")
 
         # No need for delayed setup - voice cloning preference is checked when needed
 
+        # A replacement for a job that died in this room picks its conversation back up
+        snapshot = await self._load_snapshot()
+        if snapshot:
+            self.tasks.spawn(self._restore_snapshot(snapshot), "restore_snapshot", key="switch_mode:avatar", supersede=False)
+
         # Greet if participant is already here
-        if self.ctx.room.remote_participants:
-            asyncio.create_task(self._alexa_greeting())
+        if self.participants.primary_user() and not snapshot:
+            self.tasks.spawn(self._alexa_greeting(), "alexa_greeting", key="greeting", supersede=False)
 
         # Start polling avatar-state (if requests available)
-        asyncio.create_task(self._poll_avatar_state())
+        self.tasks.spawn(self._poll_avatar_state(), "poll_avatar_state", key="poll_avatar_state")
         
         # Start monitoring for avatar restart requests
-        asyncio.create_task(self.monitor_avatar_restart())
+        self.tasks.spawn(self.monitor_avatar_restart(), "monitor_avatar_restart", key="monitor_avatar_restart")
         
-        # Register cleanup handler
-        self._register_cleanup()
+        # Per-session memory accounting (also feeds the worker's load reporting)
+        self.memory.start()
+        self.tasks.spawn(self._monitor_memory(), "monitor_memory", key="monitor_memory")
+        self.tasks.spawn(self._monitor_load(), "monitor_load", key="monitor_load")
+        if self.cfg.avatar_health_enabled:
+            self.tasks.spawn(self._monitor_avatar_health(), "monitor_avatar_health", key="monitor_avatar_health")
     
+    def _session_stats(self) -> dict:
+        """Stats published to the session registry for worker-level reporting."""
+        return {
+            "room": self.ctx.room.name,
+            "mode": self.state.state,
+            "transitions": self.state.transitions[-5:],
+            "reveal_timings": self.reveal_timings,
+            "rpc": self.rpc.stats(),
+            "intents": self.agent.intents.stats() if self.agent else {},
+            "prompt": self.agent.prompt.stats() if self.agent else {},
+            "speculation": self.speculation.stats(),
+            "speech": self.speech.stats() if self.speech else {},
+            "endpointing": self.endpointing.stats() if self.endpointing else {},
+            "vad": {rate: b.stats() for rate, b in _shared_vad.items()},
+            "tasks_live": self.tasks.live,
+            "parked": self.parked is not None,
+            "draining": self.drain_deadline is not None,
+            "voice_ids": list(self.cloner.created_voice_ids) if self.cloner else [],
+            "avatar_health": self.avatar_health.stats(),
+            "avatar_restarts": len(self._avatar_restarts),
+            "lipsync": self.lipsync.stats(),
+            "barge_in": self.barge_in.stats(),
+            "resumes": self.resumes,
+            "snapshot": {**self.snapshots.stats(), "restored_from": self.restored_from},
+            **self._load_stats(),
+            **self.memory.last_sample,
+        }
+
+    # Long-running media work that competes for CPU and upstream quota
+    MEDIA_TASKS = ("apply_filter", "avatar_session", "switch_mode", "poll_switch_voice", "store_and_switch_mode")
+
+    def _load_stats(self) -> dict:
+        """This session's share of the worker load (see WorkerLoadEstimator)."""
+        cloning = bool(self.cloner and self.cloner.clone_creation_in_progress)
+        return {
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "avatar_active": bool(self._avatar_identities) or self.state.state != SessionState.ALEXA,
+            "media_jobs": self.tasks.live_named(self.MEDIA_TASKS) + int(cloning),
+        }
+
+    async def _monitor_load(self) -> None:
+        """Measure event-loop lag and publish load stats often enough for the dispatcher."""
+        interval = self.cfg.load_publish_interval_secs
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag_ms = max(0.0, (time.perf_counter() - started - interval) * 1000)
+            try:
+                await asyncio.to_thread(self.registry.publish, self.session_id, self._session_stats())
+                if self.admitted.is_set():
+                    await asyncio.to_thread(self.admission.heartbeat, self.session_id)
+                if self.drain_deadline is None:
+                    deadline = await asyncio.to_thread(self.drain.deadline, self.session_id)
+                    if deadline is not None:
+                        self._begin_drain(deadline)
+            except Exception as e:
+                print(f"⚠️ Load stats publish failed: {e}")
+
+    async def _monitor_memory(self) -> None:
+        """Periodically snapshot memory and publish it to the session registry."""
+        while True:
+            try:
+                stats = await asyncio.to_thread(self.memory.sample)
+                await asyncio.to_thread(self.registry.publish, self.session_id, self._session_stats())
+                if stats.get("top_growth"):
+                    print(f"🧠 Memory RSS {stats['rss_mb']} MB, top growth: {stats['top_growth']}")
+            except Exception as e:
+                print(f"⚠️ Memory snapshot failed: {e}")
+            await asyncio.sleep(self.cfg.memory_snapshot_interval_secs)
+
+    async def _report_memory_leaks(self) -> None:
+        """Print a leak report for this session when the room closes."""
+        try:
+            report = await asyncio.to_thread(self.memory.leak_report)
+            print(f"🧠 Memory report for room {self.ctx.room.name}:")
+            for line in report:
+                print(f"   • {line}")
+        except Exception as e:
+            print(f"⚠️ Memory report failed: {e}")
+        finally:
+            self.registry.remove(self.session_id)
+
     def _get_voice_cloning_preference(self) -> bool:
         """Get voice cloning preference from stored RPC value."""
         print(f"🎤 Voice cloning preference: {self.voice_cloning_enabled}")
         return self.voice_cloning_enabled
     
-    def _register_cleanup(self) -> None:
-        """Register cleanup handler for when agent shuts down"""
-        if self._cleanup_registered:
+    @property
+    def current_mode_is_alexa(self) -> bool:
+        return self.state.state == SessionState.ALEXA
+
+    # ---- Lifecycle ----
+    async def wait_closed(self) -> None:
+        await self._closed.wait()
+
+    def _request_close(self, reason: str) -> asyncio.Task:
+        """Start closing from sync code; the task is kept in `_close_task`, so repeats are no-ops."""
+        if self._close_task is None:
+            self._close_task = asyncio.create_task(self._aclose_impl(reason), name="orchestrator_close")
+        return self._close_task
+
+    async def aclose(self, reason: str = "") -> None:
+        """Tear down the session and release everything it holds. Safe to call more than once."""
+        await asyncio.shield(self._request_close(reason))
+
+    async def _aclose_impl(self, reason: str) -> None:
+        print(f"🛑 Closing session for room {self.ctx.room.name} (reason: {reason or 'unknown'})")
+
+        # Cancel every task this session started
+        await self.tasks.aclose()
+        print(f"🧵 Task stats: {self.tasks.stats()}")
+        print(f"📡 RPC stats: {self.rpc.stats()}")
+
+        # Release external resources: voice clones and avatar participants (concurrently), agent session, TTS
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            self.cloner.cleanup_voices() if self.cloner else asyncio.sleep(0),
+            self._remove_avatar_participants(),
+            return_exceptions=True,
+        )
+        for label, result in zip(("Voice cleanup", "Avatar removal"), results):
+            if isinstance(result, Exception):
+                print(f"⚠️ {label} failed: {result}")
+        print(f"🧹 External cleanup took {time.perf_counter() - started:.1f}s")
+        self.avatar = None
+
+        if self.session:
+            try:
+                await self.session.aclose()
+            except Exception as e:
+                print(f"⚠️ Failed to close agent session: {e}")
+        for tts in self._retired_tts:
+            try:
+                await tts.aclose()
+            except Exception:
+                pass
+        self._retired_tts.clear()
+
+        if self.lkapi:
+            try:
+                await self.lkapi.aclose()
+            except Exception:
+                pass
+            self.lkapi = None
+            self.room_service = None
+
+        try:
+            await asyncio.to_thread(self.admission.release, self.session_id)
+            self.drain.clear(self.session_id)
+        except Exception as e:
+            print(f"⚠️ Admission release failed: {e}")
+        try:
+            # The conversation ended on purpose; only a crashed job leaves its snapshot behind
+            await asyncio.to_thread(self.snapshots.delete, self.ctx.room.name, self.session_id)
+        except Exception as e:
+            print(f"⚠️ Snapshot removal failed: {e}")
+
+        # Drop buffers, then report whatever is still retained
+        if self.cloner:
+            self.cloner.release()
+        if self.agent:
+            self.agent.recording_frames = []
+        await self._report_memory_leaks()
+
+        self._closed.set()
+        print("✅ Session closed and resources released")
+        self.ctx.shutdown(reason=reason)
+
+    # ---- Drain ----
+    def _begin_drain(self, deadline: float) -> None:
+        """The worker is shutting down: let this conversation run until shortly before `deadline`."""
+        self.drain_deadline = deadline
+        if self.parked or not self.admitted.is_set():
+            print("🚰 Worker draining; nobody is mid-conversation here, closing now")
+            self._request_close("worker_draining")
             return
-        
-        import signal
-        import atexit
-        
-        def cleanup_handler():
-            print("🧹 Agent shutting down, cleaning up voices...")
-            if self.cloner:
-                # Run cleanup synchronously since we're in shutdown
-                import asyncio
+        print(f"🚰 Worker draining; session may continue for {deadline - time.time():.0f}s")
+        self.tasks.spawn(self._drain_session(deadline), "drain_session", key="drain")
+
+    async def _drain_session(self, deadline: float) -> None:
+        await asyncio.sleep(max(0.0, deadline - self.cfg.drain_cleanup_margin_secs - time.time()))
+        print("🚰 Drain deadline reached, ending the conversation")
+        if self.session and self.participants.primary_user():
+            try:
+                await asyncio.wait_for(
+                    self.speech.say(Msg.DRAIN_NOTICE, priority=SpeechPriority.URGENT, allow_interruptions=False, add_to_chat_ctx=False),
+                    timeout=self.cfg.drain_cleanup_margin_secs / 2,
+                )
+            except Exception as e:
+                print(f"⚠️ Drain notice failed: {e}")
+        self._request_close("worker_draining")
+
+    # ---- Reconnect grace window ----
+    def _park_session(self, identity: str) -> None:
+        """Keep this session's state for `resume_grace_secs` in case the same user reconnects."""
+        if self.drain_deadline is not None:
+            print(f"🚰 User {identity} left while draining, closing session...")
+            self._request_close("participant_disconnected")
+            return
+        self.parked = {
+            "identity": identity,
+            "parked_at": time.time(),
+            "mode": self.state.state,
+            "avatar_id": self.avatar_ids.resolve()[0],
+            "voice_id": self.cloner.final_voice_id if self.cloner else None,
+            "personality": self.agent.current_personality if self.agent else None,
+            "audio_secs": round(self.cloner.accumulated_secs, 1) if self.cloner else 0.0,
+        }
+        print(f"🅿️ User {identity} disconnected; parking session for {self.cfg.resume_grace_secs:.0f}s: {self.parked}")
+        if self.session:
+            try:
+                self.session.interrupt()
+            except Exception:
+                pass
+        self.tasks.spawn(self._expire_parked_session(), "expire_parked_session", key="resume_grace")
+
+    def _resume_session(self, identity: str) -> bool:
+        """Pick the parked session back up if `identity` is the user who left."""
+        if identity != self.parked["identity"]:
+            print(f"🅿️ {identity} joined while the session is parked for {self.parked['identity']}; not resuming")
+            return False
+        away = time.time() - self.parked["parked_at"]
+        print(f"▶️ User {identity} rejoined after {away:.1f}s; resuming in {self.parked['mode']} mode")
+        self.parked = None
+        self.resumes += 1
+        self.tasks.cancel("resume_grace")
+        # A rejoin is a fresh page: nothing about its UI is known and no earlier UI command still applies
+        self.ui = ClientUiState()
+        if self.agent:
+            self.agent.reset_fast_path()
+        return True
+
+    async def _expire_parked_session(self) -> None:
+        await asyncio.sleep(self.cfg.resume_grace_secs)
+        if self.parked:
+            print(f"🅿️ Grace window expired for {self.parked['identity']}, closing session...")
+            self._request_close("resume_grace_expired")
+
+    def _on_mode_transition(self, record: dict) -> None:
+        if self.agent:
+            self.agent.prompt.task = None  # a pending task prompt belongs to the mode it was given in
+        self._schedule_snapshot()
+
+    # ---- Snapshots ----
+    def _snapshot_state(self) -> dict:
+        chat: dict = {}
+        if self.agent:
+            # Only the dialogue; instructions are constant and the summary is stored on its own
+            turns = [i for i in self.agent.chat_ctx.items if i.type == "message" and i.role in ("user", "assistant")]
+            chat = ChatContext(turns[-self.cfg.snapshot_max_chat_items:]).to_dict()
+        return {
+            "mode": self.state.state,
+            # Never the legacy file: a leftover one would resurrect an old avatar on restore
+            "avatar_id": (self.avatar_ids.find(("packet", "metadata", "poll")) or (None,))[0],
+            "voice_id": self.cloner.final_voice_id if self.cloner else None,
+            "voice_ids": list(self.cloner.created_voice_ids) if self.cloner else [],
+            "personality": self.agent.current_personality if self.agent else None,
+            "voice_cloning_enabled": self.voice_cloning_enabled,
+            "chat": chat,
+            "summary": self.agent.prompt.summary if self.agent else None,
+        }
+
+    def _schedule_snapshot(self) -> None:
+        """Mark the snapshot dirty; one writer task runs at a time and picks up every change."""
+        if not self.cfg.snapshots_enabled or self._close_task is not None:
+            return
+        self._snapshot_dirty = True
+        if not self._snapshot_writing:
+            self._snapshot_writing = True
+            if self.tasks.spawn(self._write_snapshot(), "write_snapshot", key="snapshot") is None:
+                self._snapshot_writing = False
+
+    async def _write_snapshot(self) -> None:
+        try:
+            while self._snapshot_dirty:
+                self._snapshot_dirty = False
                 try:
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        # Create a task if loop is running
-                        asyncio.create_task(self.cloner.cleanup_voices())
-                    else:
-                        # Run directly if loop is not running
-                        loop.run_until_complete(self.cloner.cleanup_voices())
+                    await asyncio.to_thread(self.snapshots.save, self.ctx.room.name, self.session_id, self._snapshot_state())
                 except Exception as e:
-                    print(f"⚠️ Cleanup error: {e}")
-        
-        # Register for both normal exit and signal termination
-        atexit.register(cleanup_handler)
-        signal.signal(signal.SIGTERM, lambda s, f: cleanup_handler())
-        signal.signal(signal.SIGINT, lambda s, f: cleanup_handler())
-        
-        self._cleanup_registered = True
-        print("🧹 Voice cleanup handler registered")
+                    print(f"⚠️ Snapshot write failed: {e}")
+        finally:
+            self._snapshot_writing = False
+
+    async def _load_snapshot(self) -> Optional[dict]:
+        if not self.cfg.snapshots_enabled:
+            return None
+        try:
+            snapshot = await asyncio.to_thread(self.snapshots.load, self.ctx.room.name)
+        except Exception as e:
+            print(f"⚠️ Snapshot load failed: {e}")
+            return None
+        if not snapshot or snapshot["job_id"] == self.session_id:
+            return None
+        age = time.time() - snapshot["updated_at"]
+        print(f"💾 Found snapshot of job {snapshot['job_id']} for this room ({age:.0f}s old, mode {snapshot['mode']})")
+        return snapshot
+
+    async def _restore_snapshot(self, snapshot: dict) -> None:
+        """Resume a crashed job's conversation: chat, personality, voice, and avatar mode."""
+        started = time.perf_counter()
+        self.restored_from = snapshot["job_id"]
+        self.state.claim("alexa_greeting")  # the user already had the onboarding greeting
+        self.voice_cloning_enabled = snapshot.get("voice_cloning_enabled", False)
+        # The voices now belong to this session (and are deleted when it ends)
+        self.cloner.created_voice_ids = list(snapshot.get("voice_ids") or [])
+        if self.cloner.created_voice_ids and not self.cloner.client:
+            self.cloner._init_elevenlabs_client()
+        if snapshot.get("chat"):
+            try:
+                chat_ctx = self.agent.chat_ctx.copy()
+                chat_ctx.items.extend(ChatContext.from_dict(snapshot["chat"]).items)
+                self.agent.prompt.summary = snapshot.get("summary")
+                self.agent.prompt.insert_summary(chat_ctx)
+                await self.agent.update_chat_ctx(chat_ctx)
+            except Exception as e:
+                print(f"⚠️ Failed to restore chat context: {e}")
+
+        voice_id = snapshot.get("voice_id")
+        if snapshot["mode"] == SessionState.ALEXA or not voice_id:
+            self._schedule_snapshot()
+            print(f"💾 Restored Alexa-mode session in {time.perf_counter() - started:.1f}s")
+            await self.speech.say(Msg.SESSION_RESTORED, priority=SpeechPriority.HIGH)
+            return
+
+        async with self.state.lock:
+            if not self.state.transition(SessionState.REVEALING, "restore"):
+                return
+            # Nothing is re-cloned or re-greeted; a later mode switch sees this reveal as done
+            for action in ("voice_clone", "avatar_session", "avatar_greeting"):
+                self.state.claim(action)
+            self.cloner.clone_creation_attempted = True
+            self.cloner.final_voice_id = voice_id
+            self._set_tts(voice_id)
+            if snapshot.get("personality"):
+                self.agent.current_personality = snapshot["personality"]
+            if snapshot.get("avatar_id"):
+                await self._store_avatar_id_in_room(snapshot["avatar_id"])
+            try:
+                # The dead job's avatar may still be in the room; bring ours up before removing it
+                await self._replace_avatar_session("restore")
+            except Exception as e:
+                print(f"⚠️ Avatar restore failed: {e}")
+            finally:
+                self.state.transition(SessionState.AVATAR, "restore")
+        print(f"💾 Restored avatar-mode session (voice {voice_id}) in {time.perf_counter() - started:.1f}s")
+        await self.speech.say(Msg.SESSION_RESTORED, priority=SpeechPriority.HIGH)
+
+    async def _start_avatar_session(self, avatar_id: str, identity: str) -> None:
+        """Start a Hedra avatar session and remember its participant identity for teardown."""
+        self.avatar = hedra.AvatarSession(avatar_id=avatar_id, avatar_participant_identity=identity)
+        self._avatar_identities.add(identity)
+        self.avatar_identity = identity
+        await self.avatar.start(self.session, room=self.ctx.room)
+        if self.cfg.lipsync_probe:
+            self.lipsync.attach(self.session, avatar_id, identity)
+
+    async def _remove_avatar_participants(self, identities: Optional[set] = None) -> None:
+        """Remove Hedra avatar participants from the room (AvatarSession has no stop())."""
+        if not self.room_service:
+            return
+        if identities is None:
+            # The room may already be disconnected at teardown, so include the identities we started
+            identities = self._avatar_identities | set(self.participants.identities(ParticipantIndex.AVATAR))
+        for identity in identities:
+            self.avatar_health.forget(identity)
+            try:
+                await self.room_service.remove_participant(
+                    api.RoomParticipantIdentity(room=self.ctx.room.name, identity=identity)
+                )
+                print(f"🗑️ Removed avatar participant: {identity}")
+            except Exception as e:
+                print(f"⚠️ Failed to remove avatar participant {identity}: {e}")
+        self._avatar_identities -= identities
+        if self.avatar_identity in identities:
+            self.avatar_identity = None
+
+    def _set_tts(self, voice_id: str) -> None:
+        """Swap the session TTS to a new voice, keeping the old instance for closing at teardown."""
+        if self.session._tts is not None:
+            self._retired_tts.append(self.session._tts)
+        self.session._tts = elevenlabs.TTS(voice_id=voice_id, model=self.cfg.eleven_tts_model)
 
     # ---- Event wiring ----
     def _wire_events(self) -> None:
@@ -722,27 +3457,79 @@ class Orchestrator:
         def _on_user_stop():
             print("🎤 USER stopped speaking")
 
+        @s.on("user_state_changed")
+        def _on_user_state(ev):
+            if ev.new_state == "speaking":
+                self._on_barge_in()
+            self.speech.on_state_changed()
+            self.speculation.on_user_state(ev.new_state)
+            if self.endpointing:
+                self.endpointing.on_user_state(ev.old_state, ev.new_state)
+
+        @s.on("agent_state_changed")
+        def _on_agent_state(ev):
+            self.barge_in.on_agent_state(ev.new_state, time.perf_counter())
+            self.speech.on_state_changed()
+            if self.endpointing:
+                self.endpointing.on_agent_state(ev.new_state)
+
+        @s.on("speech_created")
+        def _on_speech_created(ev):
+            self.speculation.on_speech_created(ev)
+
+        @s.on("conversation_item_added")
+        def _on_item_added(ev):
+            self._schedule_snapshot()
+            if getattr(ev.item, "role", None) == "user":
+                self.speech.on_user_turn()
+                if self.endpointing:
+                    self.endpointing.on_user_turn_committed()
+
+        @s.on("metrics_collected")
+        def _on_metrics(ev):
+            if isinstance(ev.metrics, LLMMetrics) and self.agent:
+                self.agent.prompt.on_llm_metrics(ev.metrics)
+            elif isinstance(ev.metrics, EOUMetrics):
+                self.speculation.on_eou_metrics(ev.metrics)
+
+        @s.on("user_input_transcribed")
+        def _on_transcribed(ev):
+            if ev.is_final and self.cfg.local_intents and self.agent:
+                self.agent.handle_final_transcript(ev.transcript)
+
         @self.ctx.room.on("participant_connected")
         def _on_participant(p: rtc.RemoteParticipant):
-            print(f"🔗 participant_connected: {p.identity}")
-            if self.current_mode_is_alexa:
-                asyncio.create_task(self._alexa_greeting())
+            role = self.participants.add(p)
+            print(f"🔗 participant_connected: {p.identity} ({role})")
+            if role == ParticipantIndex.USER and self.parked and self._resume_session(p.identity):
+                return
+            if role == ParticipantIndex.USER and self.current_mode_is_alexa:
+                self.tasks.spawn(self._alexa_greeting(), "alexa_greeting", key="greeting", supersede=False)
+
+        @self.ctx.room.on("track_subscribed")
+        def _on_track_subscribed(track: rtc.Track, publication: rtc.RemoteTrackPublication, p: rtc.RemoteParticipant):
+            watching = self.cfg.avatar_health_enabled or self.cfg.lipsync_probe or self.cfg.barge_in_fast_cancel
+            if watching and self.participants.role(p.identity) == ParticipantIndex.AVATAR:
+                self.avatar_health.watch(track, p.identity)
 
         @self.ctx.room.on("participant_disconnected")
         def _on_participant_disconnected(p: rtc.RemoteParticipant):
-            print(f"🔗 participant_disconnected: {p.identity}")
-            if (p.identity.startswith("hedra-avatar") == False):
-                print("User disconnected, cleaning up voices...")
-                if (self.cloner):
-                    asyncio.create_task(self.cloner.cleanup_voices())
-            
-        
+            role = self.participants.remove(p.identity)
+            print(f"🔗 participant_disconnected: {p.identity} ({role})")
+            if role == ParticipantIndex.USER and not self.participants.primary_user():
+                if self.cfg.resume_grace_secs > 0:
+                    self._park_session(p.identity)
+                else:
+                    print("User disconnected, closing session...")
+                    self._request_close("participant_disconnected")
+
         @self.ctx.room.on("data_received")
         def _on_data(pkt: rtc.DataPacket):
             try:
                 if pkt.topic == "voice_cloning_preference":
                     message = json.loads(pkt.data.decode("utf-8"))
                     self.voice_cloning_enabled = message.get("voiceCloningEnabled", False)
+                    self._schedule_snapshot()
                     print(f"🎤 Received voice cloning preference via room data: {self.voice_cloning_enabled}")
             
 
@@ -754,17 +3541,17 @@ class Orchestrator:
                     
                     if agent_message and self.session:
                         print(f"🗣️ Agent speaking immediate message: {agent_message}")
-                        asyncio.create_task(self._speak_agent_message(agent_message))
+                        self.tasks.spawn(self._speak_agent_message(agent_message), "speak_agent_message")
                         
                         # If this is a prompt for avatar description, update agent instructions
                         if action == "prompt_for_avatar_description" and self.agent:
                             print("🎨 Setting agent to listen for avatar description")
-                            asyncio.create_task(self._prepare_for_avatar_description())
+                            self.tasks.spawn(self._prepare_for_avatar_description(), "prepare_for_avatar_description", key="instructions")
                 elif pkt.topic == "filter_selection":
                     message = json.loads(pkt.data.decode("utf-8"))
                     filter_id = message.get("filterID")
                     print(f"🎨 Received filter selection via room data: {filter_id}")
-                    asyncio.create_task(self._apply_filter(filter_id))
+                    self.tasks.spawn(self._apply_filter(filter_id), "apply_filter", key="avatar_session")
                     
                 elif pkt.topic == "personality_selection":
                     message = json.loads(pkt.data.decode("utf-8"))
@@ -772,90 +3559,122 @@ class Orchestrator:
                     
                     if personality_name and self.agent:
                         print(f"🎭 Calling update_personality for: {personality_name}")
-                        asyncio.create_task(self.agent.update_personality(personality_name))
+                        self.tasks.spawn(self.agent.update_personality(personality_name), "update_personality", key="instructions")
                 elif pkt.topic == "mode_switch":
                     message = json.loads(pkt.data.decode("utf-8"))
                     if message.get("action") == "switch_mode":
                         # Store avatar ID from the message if provided and wait for it
                         avatar_id = message.get("avatarId")
+                        mode = message.get("mode", "alexa")
+                        # One in-flight switch per target mode; repeated packets are dropped
                         if avatar_id:
                             print(f"🎭 Received avatar ID via room data: {avatar_id}")
+                            self.avatar_ids.update("packet", avatar_id)
                             # Store immediately and wait for completion before mode switch
-                            asyncio.create_task(self._store_and_switch_mode(avatar_id, message.get("mode", "alexa")))
+                            self.tasks.spawn(self._store_and_switch_mode(avatar_id, mode), "store_and_switch_mode", key=f"switch_mode:{mode}", supersede=False)
                         else:
-                            asyncio.create_task(self._switch_mode(message.get("mode", "alexa")))
+                            self.tasks.spawn(self._switch_mode(mode), "switch_mode", key=f"switch_mode:{mode}", supersede=False)
                 elif pkt.topic == "avatar_data":
                     message = json.loads(pkt.data.decode("utf-8"))
                     avatar_id = message.get("assetId")
                     if avatar_id:
                         print(f"🎭 Received avatar ID via avatar_data: {avatar_id}")
+                        self.avatar_ids.update("packet", avatar_id)
                         # Store immediately without waiting for mode switch
-                        asyncio.create_task(self._store_avatar_id_in_room(avatar_id))
+                        self.tasks.spawn(self._store_avatar_id_in_room(avatar_id), "store_avatar_id_in_room", key="store_avatar_id")
                 elif pkt.topic == "filter_error":
                     message = json.loads(pkt.data.decode("utf-8"))
                     error_type = message.get("errorType")
                     error_details = message.get("errorDetails", "")
                     print(f"🚨 Received filter error via room data: {error_type}")
-                    asyncio.create_task(self._handle_filter_error(error_type, error_details))                        
+                    self.tasks.spawn(self._handle_filter_error(error_type, error_details), "handle_filter_error", key="filter_error")
                 elif pkt.topic == "user_state_change":
                     message = json.loads(pkt.data.decode("utf-8"))
                     action = message.get("action")
                     timestamp = message.get("timestamp")
                     print(f"📱 User state change: {action} at {timestamp}")
                     
-                    if action == "camera_started":
+                    # Track UI state; stale or duplicate events are dropped by the mirror
+                    if self.ui.apply_event(message) and action == "camera_started":
                         print("📷 Backend received: User started camera via button")
-                        # Track camera state
-                        self.camera_started = True
                         # Agent now knows user has progressed to camera state
-                        asyncio.create_task(self._handle_camera_started())
+                        self.tasks.spawn(self._handle_camera_started(), "handle_camera_started", key="camera_started", supersede=False)
             except Exception as e:
                 print(f"❌ data_received error: {e}")
 
+    # ---- Barge-in ----
+    def _on_barge_in(self) -> None:
+        """The user started talking: if the avatar is speaking, stop it now.
+
+        The session would interrupt on its own only after `min_interruption_duration` of
+        speech and then clear the avatar's buffer once the speech task unwinds; this runs at
+        the VAD speech start instead.
+        """
+        if self.state.state != SessionState.AVATAR or self.session.agent_state != "speaking":
+            return
+        self.barge_in.start(self.avatar_identity, time.perf_counter())
+        if self.cfg.barge_in_fast_cancel and self._fast_cancel():
+            self.barge_in.fast_cancels += 1
+
+    def _fast_cancel(self) -> bool:
+        speech = self.session.current_speech
+        if speech is None or speech.interrupted or not speech.allow_interruptions:
+            return False
+        speech.interrupt()  # stops LLM and TTS generation for this reply
+        if self.session.output.audio is not None:
+            self.session.output.audio.clear_buffer()  # lk.clear_buffer RPC to the avatar
+        return True
+
     # ---- Helper methods ----
+    async def _run_deferred_rpc(
+        self, method: str, payload: Optional[dict], destination: str, description: str,
+        on_success: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Background half of a deferred tool call. The tool output already told the user it is
+        under way, so success stays silent; a failure is announced like any other notice."""
+        started = time.perf_counter()
+        try:
+            await self.rpc.call(method, payload, destination=destination)
+        except FrontendRpcError as e:
+            print(f"⚠️ Deferred RPC failed: {e}")
+            reason = "the screen didn't respond in time" if e.timed_out else "something went wrong on the screen"
+            await self.speech.say(
+                Msg.DEFERRED_ACTION_FAILED.format(description=description, reason=reason),
+                priority=SpeechPriority.HIGH, key=f"deferred_rpc:{method}",
+            )
+            return
+        print(f"✅ Deferred RPC {method} completed in {time.perf_counter() - started:.2f}s")
+        if on_success:
+            on_success()
+
     async def _speak_agent_message(self, message: str) -> None:
         """Speak an agent message properly handling the SpeechHandle."""
         try:
-            speech_handle = self.session.say(message)
-            await speech_handle.wait_for_completion()
+            # Frontend prompts (e.g. asking for an avatar description) are what the user waits on
+            await self.speech.say(message, priority=SpeechPriority.HIGH)
         except Exception as e:
             print(f"⚠️ Failed to speak agent message: {e}")
 
     async def _handle_filter_error(self, error_type: str, error_details: str) -> None:
         """Handle filter generation errors and provide appropriate responses"""
         if "safety system" in error_details.lower() or "rejected by the safety system" in error_details.lower():
-            await self.session.say("For content safety reasons, your requested filter could not be generated. Please try again.")
+            message = "For content safety reasons, your requested filter could not be generated. Please try again."
         elif "400" in error_details or "BadRequestError" in error_type:
-            await self.session.say("I wasn't able to generate that filter. Let's try a different one!")
+            message = "I wasn't able to generate that filter. Let's try a different one!"
         else:
-            await self.session.say("Something went wrong while applying your filter. Please try again.")
+            message = "Something went wrong while applying your filter. Please try again."
+        # Only the latest filter error is worth hearing
+        await self.speech.say(message, priority=SpeechPriority.HIGH, key="filter_result")
 
     async def _apply_filter(self, filter_id: str) -> None:
         """Apply a filter effect by replacing the avatar with a placeholder"""
         try:
-            response = await self.ctx.api.room.list_participants(
-                api.ListParticipantsRequest(room=self.ctx.room.name)
-            )
-            participants = response.participants
-            for participant in participants:
-                print(f"🔍 Participant: {participant}")
-                if (participant.identity.startswith("hedra-avatar")):
-                    print(f"🔍 Found Hedra avatar: {participant.identity}")
-                    await self.room_service.remove_participant(
-                        api.RoomParticipantIdentity(
-                            room=self.ctx.room.name,
-                            identity=participant.identity
-                        )
-                    )
-                    # self.ctx.room.remove_participant(participant.identity)
-
-            # Create new avatar session with filter (Hedra handles session replacement automatically)
-
-            self.avatar = hedra.AvatarSession(
-                avatar_id=filter_id,
-                avatar_participant_identity="hedra-avatar"+filter_id,
-            )
-            await self.avatar.start(self.session, room=self.ctx.room)
+            async with self._avatar_lock:
+                # Remove the current avatar participants, looked up from the participant index
+                await self._remove_avatar_participants()
+
+                # Create new avatar session with filter (Hedra handles session replacement automatically)
+                await self._start_avatar_session(filter_id, "hedra-avatar" + filter_id)
             
             # Wait a moment for the avatar session to fully initialize
             await asyncio.sleep(1.0)
@@ -863,12 +3682,8 @@ class Orchestrator:
             # Speak the confirmation message with proper error handling
             try:
                 print(f"🔍 TTS Debug - session._tts: {self.session._tts}")
-                speech_handle = self.session.say(f"I've applied the filter!")
-                print(f"🔍 session.say() returned speech_handle: {speech_handle}")
-                
-                print(f"🔍 About to await speech_handle...")
-                await speech_handle
-                print(f"🔍 speech_handle await completed successfully")
+                await self.speech.say("I've applied the filter!", key="filter_result", max_age=10)
+                print(f"🔍 Filter confirmation played")
             except Exception as speech_error:
                 print(f"⚠️ Failed to speak filter confirmation: {speech_error}")
                 # Continue anyway - the filter was applied successfully
@@ -884,34 +3699,80 @@ class Orchestrator:
         try:
             print("🔄 Attempting to restart avatar session...")
             
-            # Get the current avatar ID from file or use default
-            current_avatar_id = None
-            try:
-                with open("current_asset_id.txt", "r") as f:
-                    current_avatar_id = f.read().strip()
-            except FileNotFoundError:
-                current_avatar_id = "0396e7f6-252a-4bd8-8f41-e8d1ecd6367e"  # Default Martha avatar
-            
-            if self.avatar:
-                print("🛑 Stopping current avatar session...")
-                await self.avatar.stop()
-                
-            print(f"🚀 Starting new avatar session with ID: {current_avatar_id}")
-            self.avatar = hedra.AvatarSession(
-                avatar_id=current_avatar_id,
-                avatar_participant_identity="hedra-avatar" + current_avatar_id,
-            )
-            await self.avatar.start(self.session, room=self.ctx.room)
+            async with self._avatar_lock:
+                current_avatar_id, source = self.avatar_ids.resolve()
+
+                if self.avatar:
+                    print("🛑 Stopping current avatar session...")
+                    await self._remove_avatar_participants()
+
+                print(f"🚀 Starting new avatar session with ID: {current_avatar_id} (from {source})")
+                await self._start_avatar_session(current_avatar_id, "hedra-avatar" + current_avatar_id)
             
             # Announce the restart
-            speech_handle = self.session.say("I'm back! Sorry about that, I had a little technical hiccup.")
-            await speech_handle
+            await self.speech.say("I'm back! Sorry about that, I had a little technical hiccup.", priority=SpeechPriority.HIGH)
             
             print("✅ Avatar session restarted successfully")
             
         except Exception as e:
             print(f"❌ Failed to restart avatar session: {e}")
 
+    async def _replace_avatar_session(self, reason: str) -> bool:
+        """Make-before-break restart: bring up a fresh avatar participant, then drop the old ones.
+
+        Audio moves to the new avatar as soon as it starts; the old participants are removed
+        once the new one publishes video (or the handover times out). Holds the avatar lock
+        throughout, so a filter or restart can't start an avatar that the removal misses.
+        """
+        async with self._avatar_lock:
+            avatar_id, source = self.avatar_ids.resolve()
+            self._avatar_generation += 1
+            identity = f"hedra-avatar{avatar_id}-r{self._avatar_generation}"
+            print(f"🩺 Replacing avatar ({reason}) with {identity} (avatar {avatar_id} from {source})")
+            try:
+                await self._start_avatar_session(avatar_id, identity)
+            except Exception as e:
+                print(f"❌ Replacement avatar failed to start: {e}")
+                return False
+            handed_over = await self.avatar_health.wait_for_video(identity, self.cfg.avatar_handover_timeout_secs)
+            if not handed_over:
+                print(f"⚠️ {identity} published no video within {self.cfg.avatar_handover_timeout_secs:.0f}s; removing the old avatar anyway")
+            old = set(self._avatar_identities) | set(self.participants.identities(ParticipantIndex.AVATAR))
+            await self._remove_avatar_participants(old - {identity})
+            return handed_over
+
+    async def _monitor_avatar_health(self) -> None:
+        """Restart the avatar when its video stalls, backing off between consecutive restarts."""
+        while True:
+            await asyncio.sleep(1)
+            identity = self.avatar_identity
+            if identity is None or self.state.state != SessionState.AVATAR or self.parked:
+                self._avatar_healthy_since = None
+                continue
+            now = time.time()
+            if not self.avatar_health.stalled(identity):
+                self._avatar_healthy_since = self._avatar_healthy_since or now
+                if self._avatar_restarts and now - self._avatar_healthy_since >= self.cfg.avatar_healthy_reset_secs:
+                    print(f"🩺 Avatar healthy for {self.cfg.avatar_healthy_reset_secs:.0f}s, resetting restart backoff")
+                    self._avatar_restarts.clear()
+                continue
+            self._avatar_healthy_since = None
+            if len(self._avatar_restarts) >= self.cfg.avatar_restart_max:
+                continue  # gave up; the manual restart path still works
+            if self._avatar_restarts:
+                backoff = min(
+                    self.cfg.avatar_restart_backoff_max_secs,
+                    self.cfg.avatar_restart_backoff_secs * 2 ** (len(self._avatar_restarts) - 1),
+                )
+                if now - self._avatar_restarts[-1] < backoff:
+                    continue
+            self._avatar_restarts.append(now)
+            print(f"🩺 Avatar {identity} stalled: {self.avatar_health.snapshot(identity)} (restart {len(self._avatar_restarts)}/{self.cfg.avatar_restart_max})")
+            try:
+                await self._replace_avatar_session("video stalled")
+            except Exception as e:
+                print(f"❌ Avatar replacement failed: {e}")  # counted as a restart; the next one backs off
+
     async def monitor_avatar_restart(self) -> None:
         """Monitor for avatar restart requests from the frontend."""
         restart_file = "restart_avatar.txt"
@@ -943,6 +3804,8 @@ class Orchestrator:
             
             current_metadata["avatar_id"] = avatar_id
             await self.ctx.room.local_participant.set_metadata(json.dumps(current_metadata))
+            self.avatar_ids.update("metadata", avatar_id)
+            self._schedule_snapshot()
             print(f"🔖 Stored avatar_id in local participant metadata: {avatar_id}")
         except Exception as e:
             print(f"⚠️ Failed to store avatar_id in local participant metadata: {e}")
@@ -981,19 +3844,14 @@ class Orchestrator:
                 await asyncio.sleep(1)
                 attempt += 1
                 
-                # Check if avatar ID is available from polling state
-                avatar_id = self._get_avatar_id_from_polling_state()
-                if avatar_id:
-                    print(f"✅ Avatar creation detected! Avatar ID: {avatar_id}")
+                # Refresh the polling source (off the event loop), then check every source
+                await self._refresh_avatar_state()
+                found = self.avatar_ids.find(AvatarIdResolver.CREATED)
+                if found:
+                    avatar_id, source = found
+                    print(f"✅ Avatar creation detected via {source}! Avatar ID: {avatar_id}")
                     # Always trigger mode switch to ensure voice cloning happens
-                    await self._switch_mode("avatar")
-                    return
-                
-                # Also check room metadata
-                avatar_id = self._get_avatar_id_from_room()
-                if avatar_id:
-                    print(f"✅ Avatar creation detected in room metadata! Avatar ID: {avatar_id}")
-                    await self._switch_mode("avatar")
+                    await self._switch_mode("avatar", trigger="avatar_creation_monitor")
                     return
             
             print("⚠️ Avatar creation monitoring timed out after 30 seconds")
@@ -1001,16 +3859,43 @@ class Orchestrator:
             print(f"❌ _monitor_avatar_creation error: {e}")
 
     # ---- Greetings ----
+    async def _admit(self) -> bool:
+        """Wait for capacity before the agent session exists; sheds the job on timeout."""
+        started = time.perf_counter()
+        if await self.admission.acquire(self.session_id, self._announce_queue_position):
+            print(f"🎟️ Session admitted after {time.perf_counter() - started:.1f}s")
+            self.admitted.set()
+            await self._publish_queue_status(None)
+            return True
+        print(f"🎟️ Admission timed out after {self.cfg.admission_max_wait_secs:.0f}s, shedding session")
+        await self._publish_queue_status(Msg.QUEUE_TIMEOUT)
+        self._request_close("admission_timeout")
+        return False
+
+    async def _announce_queue_position(self, position: int) -> None:
+        print(f"⏳ Waiting for capacity: position {position} in line")
+        await self._publish_queue_status(Msg.QUEUE_POSITION.format(position=position), position)
+
+    async def _publish_queue_status(self, message: Optional[str], position: int = 0) -> None:
+        """Show the wait on the frontend; there is no agent session to speak through yet."""
+        try:
+            await self.ctx.connect()
+            await self.ctx.room.local_participant.publish_data(
+                payload=json.dumps({"action": "queue_status", "position": position, "message": message}),
+                topic="frontend_control",
+            )
+        except Exception as e:
+            print(f"⚠️ Queue status update failed: {e}")
+
     async def _alexa_greeting(self) -> None:
         try:
             # Prevent duplicate greetings that cause interruptions
-            if self._has_greeted:
+            if not self.state.claim("alexa_greeting"):
                 print("🔇 Skipping duplicate greeting")
                 return
             
-            self._has_greeted = True
             await asyncio.sleep(1)
-            await self.session.say(Msg.ALEXA_GREETING)
+            await self.speech.say(Msg.ALEXA_GREETING, priority=SpeechPriority.HIGH)
             print("👋 Initial greeting completed")
             
             # Add extra delay after greeting to let VAD settle before listening
@@ -1032,112 +3917,148 @@ class Orchestrator:
             print(f"🎤 Using default avatar voice: {final_voice_id}")
         
         # Apply the voice to current session
-        self.session._tts = elevenlabs.TTS(
-            voice_id=final_voice_id, model=self.cfg.eleven_tts_model
-        )
+        self._set_tts(final_voice_id)
+        self._schedule_snapshot()
         
         return final_voice_id
 
-    async def _switch_mode(self, new_mode: str) -> None:
+    async def _switch_mode(self, new_mode: str, trigger: str = "mode_switch") -> None:
         try:
             if new_mode == "avatar":
-                was_already_avatar_mode = not self.current_mode_is_alexa
-                
-                if was_already_avatar_mode:
-                    print("🎭 Avatar mode already active, but creating voice clone...")
-                    # Still create voice clone even if already in avatar mode
-                    await self._create_and_apply_voice_clone()
-                    # Don't return early - we still need to create avatar session if it doesn't exist
-                    
-                print("🎭 Switching → Avatar mode")
-                self.current_mode_is_alexa = False
-                
-                # Create voice clone from all accumulated audio
-                await self._create_and_apply_voice_clone()
-
-                if not self.avatar:
-                    # Try to get avatar ID from multiple sources with detailed logging
-                    polling_id = self._get_avatar_id_from_polling_state()
-                    room_id = self._get_avatar_id_from_room()
-                    
-                    print(f"🔍 Avatar ID sources - Polling: {polling_id}, Room: {room_id}, Default: {self.cfg.default_avatar_id}")
-                    
-                    avatar_id = polling_id or room_id or self.cfg.default_avatar_id
-                    print(f"🎭 Creating avatar session with ID: {avatar_id}")
-                    
-                    if avatar_id != self.cfg.default_avatar_id:
-                        print(f"✅ Using custom avatar ID: {avatar_id}")
-                    else:
-                        print(f"⚠️ Falling back to default avatar ID: {avatar_id}")
-                    
-                    self.avatar = hedra.AvatarSession(
-                        avatar_id=avatar_id,
-                        avatar_participant_identity="hedra-avatar",
-                    )
-                    await self.avatar.start(self.session, room=self.ctx.room)
-                    print(f"🎭 Avatar session started successfully")
-                
-                # Generate greeting and ensure transcriptions continue to flow
-                if not was_already_avatar_mode:
-                    # Use session.say() to ensure transcriptions are captured
-                    greeting_text = "Hello! I'm your personalized avatar, created from your photo. Thank you for creating me. How can I help you today?"
-                    await self.session.say(greeting_text)
-                    print(f"🎤 Avatar greeting sent via session.say() for transcription capture")
+                await self._reveal_avatar(trigger)
             else:
-                print("🔊 Switching → Alexa mode")
-                self.current_mode_is_alexa = True
-                self.session._tts = elevenlabs.TTS(
-                    voice_id=self.cfg.alexa_voice_id, model=self.cfg.eleven_tts_model
-                )
-                await self.session.generate_reply(
-                    instructions="Greet the user as Alexa and ask how you can help today."
-                )
+                await self._return_to_alexa(trigger)
         except Exception as e:
             print(f"❌ switch_mode error: {e}")
 
-    async def _prepare_for_avatar_description(self) -> None:
-        """Prepare the agent to listen for avatar description and trigger generate_avatar tool call"""
-        if not self.agent:
+    async def _reveal_avatar(self, trigger: str) -> None:
+        """Alexa → Avatar: exactly one clone, one Hedra session and one greeting per reveal.
+
+        Hedra startup and voice finalization (clone + greeting pre-synthesis) run concurrently
+        and join at a readiness barrier, so reveal latency is the slowest stage, not the sum.
+        """
+        async with self.state.lock:
+            if not self.state.transition(SessionState.REVEALING, trigger):
+                return
+            started = time.perf_counter()
+            timings: Dict[str, float] = {}
+            print("🎭 Switching → Avatar mode")
+            try:
+                greeting_audio, avatar_result = await asyncio.gather(
+                    self._timed_stage(timings, "voice", self._prepare_avatar_voice(timings)),
+                    self._timed_stage(timings, "avatar", self._prepare_avatar_session(timings)),
+                    return_exceptions=True,
+                )
+                if isinstance(avatar_result, BaseException):
+                    print(f"⚠️ Avatar session stage failed: {avatar_result}")
+                if isinstance(greeting_audio, BaseException):
+                    print(f"⚠️ Voice stage failed: {greeting_audio}")
+                    greeting_audio = None
+                timings["ready"] = round(time.perf_counter() - started, 3)
+            finally:
+                # A partial reveal (e.g. Hedra failure) still leaves us talking with the avatar voice
+                self.state.transition(SessionState.AVATAR, trigger)
+            greet = self.state.claim("avatar_greeting")
+
+        # The greeting can wait for the conversation to go quiet; other mode triggers need not
+        if greet:
+            # Use session.say() to ensure transcriptions are captured; reuse pre-synthesized audio
+            audio = _replay_frames(greeting_audio) if greeting_audio else NOT_GIVEN
+            await self.speech.say(Msg.AVATAR_GREETING, priority=SpeechPriority.HIGH, audio=audio)
+            print(f"🎤 Avatar greeting sent via session.say() for transcription capture")
+        timings["total"] = round(time.perf_counter() - started, 3)
+        self.reveal_timings = timings
+        print(f"⏱️ Avatar reveal stages (trigger: {trigger}): {timings}")
+
+    async def _timed_stage(self, timings: Dict[str, float], stage: str, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            timings[stage] = round(time.perf_counter() - started, 3)
+
+    async def _prepare_avatar_voice(self, timings: Dict[str, float]) -> Optional[List[rtc.AudioFrame]]:
+        """Finalize the voice clone, then pre-synthesize the greeting with it."""
+        if self.state.claim("voice_clone"):
+            # Create voice clone from all accumulated audio
+            await self._timed_stage(timings, "voice_clone", self._create_and_apply_voice_clone())
+        return await self._timed_stage(timings, "greeting_tts", self._presynthesize(Msg.AVATAR_GREETING))
+
+    async def _prepare_avatar_session(self, timings: Dict[str, float]) -> None:
+        """Resolve the avatar ID and start the Hedra session."""
+        if self.avatar or not self.state.claim("avatar_session"):
             return
+        avatar_id, source = self.avatar_ids.resolve()
+        print(f"🎭 Creating avatar session with ID: {avatar_id} (from {source})")
         
-        # Update agent instructions to be ready for avatar description
-        enhanced_instructions = (
-            "You are Alexa, Amazon's voice assistant. The user has just clicked 'Describe an image' and you've prompted them for an avatar description. "
-            "Listen carefully for their response describing what kind of avatar they want. "
-            "When they provide a description (like 'professional businesswoman with short brown hair' or 'friendly teacher with glasses'), "
-            "immediately call the generate_avatar function with their description as the prompt parameter. "
-            "Be encouraging and let them know you're creating their custom avatar."
-        )
+        if avatar_id != self.cfg.default_avatar_id:
+            print(f"✅ Using custom avatar ID: {avatar_id}")
+        else:
+            print(f"⚠️ Falling back to default avatar ID: {avatar_id}")
         
+        await self._timed_stage(timings, "hedra_start", self._start_avatar_session(avatar_id, "hedra-avatar"))
+        print(f"🎭 Avatar session started successfully")
+
+    async def _presynthesize(self, text: str) -> Optional[List[rtc.AudioFrame]]:
+        """Synthesize `text` with the current TTS ahead of time; None if synthesis fails."""
         try:
-            await self.agent.update_instructions(enhanced_instructions)
-            print("🎨 Updated agent instructions to listen for avatar description")
+            frames: List[rtc.AudioFrame] = []
+            async with self.session.tts.synthesize(text) as stream:
+                async for ev in stream:
+                    frames.append(ev.frame)
+            return frames or None
         except Exception as e:
-            print(f"⚠️ Failed to update agent instructions: {e}")
+            print(f"⚠️ Greeting pre-synthesis failed, will synthesize on demand: {e}")
+            return None
+
+    async def _return_to_alexa(self, trigger: str) -> None:
+        """Avatar → Alexa: restore the Alexa voice and greet."""
+        async with self.state.lock:
+            if not self.state.transition(SessionState.ALEXA, trigger):
+                return
+            print("🔊 Switching → Alexa mode")
+            self._set_tts(self.cfg.alexa_voice_id)
+        handle = self.session.generate_reply(
+            instructions="Greet the user as Alexa and ask how you can help today."
+        )
+        self.speculation.ignore(handle.id)
+        await handle
+
+    async def _prepare_for_avatar_description(self) -> None:
+        """Prepare the agent to listen for avatar description and trigger generate_avatar tool call"""
+        if not self.agent:
+            return
+        # A task section after the history, so the instructions (and the cached prefix) stay put
+        self.agent.prompt.task = Msg.AVATAR_DESCRIPTION_TASK
+        print("🎨 Agent is listening for an avatar description")
+
+    def _fetch_avatar_state(self) -> Optional[dict]:
+        """GET the avatar-state API (blocking; call via asyncio.to_thread)."""
+        if not REQUESTS_AVAILABLE:
+            return None
+        resp = requests.get(self.cfg.poll_api_url, timeout=2)
+        if resp.status_code != 200:
+            return None
+        return resp.json() or {}
 
-    def _get_avatar_id_from_polling_state(self) -> Optional[str]:
-        """Get avatar ID from the polling state (set by frontend via /api/set-avatar-id)"""
+    async def _refresh_avatar_state(self) -> Optional[dict]:
+        """Fetch the avatar state off the event loop and feed the avatar ID cache."""
         try:
-            if REQUESTS_AVAILABLE:
-                print(f"🔍 Polling avatar state from: {self.cfg.poll_api_url}")
-                resp = requests.get(self.cfg.poll_api_url, timeout=2)
-                print(f"🔍 Polling response status: {resp.status_code}")
-                if resp.status_code == 200:
-                    state = resp.json() or {}
-                    print(f"🔍 Polling state data: {state}")
-                    avatar_id = state.get("assetId")
-                    if avatar_id:
-                        print(f"🎭 Found avatar ID from polling state: {avatar_id}")
-                        return avatar_id
-                    else:
-                        print("🔍 No assetId found in polling state")
-                else:
-                    print(f"🔍 Polling failed with status: {resp.status_code}")
-            else:
-                print("🔍 Requests not available for polling")
-        except Exception as e:
-            print(f"⚠️ Failed to get avatar ID from polling state: {e}")
-        return None
+            state = await asyncio.to_thread(self._fetch_avatar_state)
+        except Exception:
+            return None  # API may not be up; ignore quietly
+        if state is not None:
+            self.avatar_ids.update("poll", state.get("assetId"))
+        return state
+
+    @staticmethod
+    def _read_avatar_id_file() -> Optional[str]:
+        """Legacy avatar ID hand-off file written next to the worker."""
+        try:
+            with open("current_asset_id.txt", "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
 
     def _get_avatar_id_from_room(self) -> Optional[str]:
         """Get avatar ID from local participant metadata where we stored it"""
@@ -1164,26 +4085,18 @@ class Orchestrator:
         last_state: Optional[dict] = None
         while True:
             try:
-                resp = requests.get(self.cfg.poll_api_url, timeout=2)
-                if resp.status_code == 200:
-                    state = resp.json() or {}
+                state = await self._refresh_avatar_state()
+                if state is not None:
                     if state != last_state:
                         last_state = state
-                        if state.get("switchVoice"):
-                            # Always trigger voice cloning when switchVoice is detected
-                            print(f"🎭 Detected switchVoice signal, creating voice clone...")
-                            if self.current_mode_is_alexa:
-                                # Switch from Alexa to Avatar mode with voice cloning
-                                self.current_mode_is_alexa = False
-                                await self._create_and_apply_voice_clone()
-                                # Use session.say() to ensure transcriptions are captured
-                                greeting_text = "Hello! I'm your personalized avatar, created from your photo. Thank you for creating me. How can I help you today?"
-                                await self.session.say(greeting_text)
-                                print(f"🎤 Avatar greeting sent via session.say() for transcription capture")
-                            else:
-                                # Already in avatar mode, just update voice
-                                await self._create_and_apply_voice_clone()
-                # else: non-200 → ignore
+                        if state.get("switchVoice") and self.current_mode_is_alexa:
+                            # Same reveal as a mode_switch packet; the state machine keeps it to one
+                            print(f"🎭 Detected switchVoice signal, revealing avatar...")
+                            self.tasks.spawn(
+                                self._switch_mode("avatar", trigger="poll_switch_voice"),
+                                "switch_mode", key="switch_mode:avatar", supersede=False,
+                            )
+                # else: API down or non-200 → ignore
             except Exception:
                 pass  # API may not be up; ignore quietly
             await asyncio.sleep(self.cfg.poll_interval_secs)
@@ -1222,22 +4135,48 @@ async def show_photo_capture_ui(ctx: JobContext) -> str:
 # ---------------------------
 # Entrypoint
 # ---------------------------
+async def request_fnc(req: agents.JobRequest) -> None:
+    """Shed new jobs up front while the host's admission queue is already full."""
+    cfg = worker_load.cfg
+    if worker_load.draining:
+        print(f"🚫 Rejecting job {req.id}: worker is draining")
+        await req.reject()
+        return
+    waiting = await asyncio.to_thread(AdmissionController(cfg).queue_length)
+    if waiting >= cfg.admission_max_queue:
+        print(f"🚫 Rejecting job {req.id}: {waiting} sessions already waiting for capacity")
+        await req.reject()
+        return
+    await req.accept()
+
+
+def prewarm(proc: agents.JobProcess) -> None:
+    # Load the shared VAD model and the token encoding before the first job lands in this process
+    cfg = Config()
+    if cfg.vad_batching and vad_batching_supported():
+        shared_vad_batcher(cfg)
+    load_prompt_encoding()
+
+
 async def entrypoint(ctx: JobContext):
-    
     orch = Orchestrator(ctx, Config())
+    ctx.add_shutdown_callback(orch.aclose)
     await orch.start()
-    # async def async_shutdown_callback(participant: rtc.Participant):
-    #     print("Shutting down...")
-        # if orch.cloner:
-        #     await orch.cloner.cleanup_voices()
-    
-    # def shutdown_callback(participant: rtc.Participant):
-    #     asyncio.create_task(async_shutdown_callback(participant))
-    
-    # ctx.room.on("participant_disconnected", shutdown_callback)
-    while True:
-        await asyncio.sleep(3600)
+    await orch.wait_closed()
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    os.environ["AGENT_WORKER_PID"] = str(os.getpid())  # job processes tag their registry entries with it
+    voice_gc.ensure_started()
+    executor = agents.JobExecutorType.THREAD if Config().job_executor == "thread" else agents.JobExecutorType.PROCESS
+    agents.cli.run_app(
+        agents.WorkerOptions(
+            entrypoint_fnc=entrypoint,
+            prewarm_fnc=prewarm,
+            request_fnc=request_fnc,
+            load_fnc=worker_load,
+            load_threshold=worker_load.cfg.load_threshold,
+            drain_timeout=int(worker_load.cfg.drain_timeout_secs),
+            job_executor_type=executor,
+        )
+    )
@@ -0,0 +1,55 @@
+import asyncio
+import dataclasses
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+# agent.py reads its Config from the environment at import time; keep its shared state out of the real state_dir
+os.environ.setdefault("AGENT_STATE_DIR", tempfile.mkdtemp(prefix="agent-state-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeSpeech:
+    """Stands in for SpeechScheduler: records what would have been said."""
+
+    def __init__(self):
+        self.said = []
+
+    def submit(self, text, **kwargs):
+        self.said.append(text)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(None)
+        return future
+
+    async def say(self, text, **kwargs):
+        self.said.append(text)
+
+
+class FakeRoomService:
+    def __init__(self):
+        self.removed = []
+
+    async def remove_participant(self, request):
+        self.removed.append(request.identity)
+
+
+@pytest.fixture
+def make_orchestrator(tmp_path):
+    """Build an Orchestrator around a fake job context, with no agent session or network."""
+    import agent
+
+    def make(**overrides):
+        cfg = dataclasses.replace(agent.Config(), state_dir=str(tmp_path), **overrides)
+        ctx = types.SimpleNamespace(
+            job=types.SimpleNamespace(id="job-test"),
+            room=types.SimpleNamespace(name="room-test", remote_participants={}),
+        )
+        orch = agent.Orchestrator(ctx, cfg)
+        orch.speech = FakeSpeech()
+        orch.room_service = FakeRoomService()
+        return orch
+
+    return make
@@ -0,0 +1,63 @@
+import dataclasses
+
+from agent import AdaptiveEndpointing, Config
+
+
+class FakeVad:
+    def __init__(self):
+        self.updates = []
+
+    def update_options(self, *, min_silence_duration: float) -> None:
+        self.updates.append(min_silence_duration)
+
+
+def _endpointing(**overrides) -> AdaptiveEndpointing:
+    cfg = dataclasses.replace(
+        Config(),
+        endpoint_silence_start_secs=1.0,
+        endpoint_silence_min_secs=0.4,
+        endpoint_silence_max_secs=1.5,
+        endpoint_step_down_secs=0.1,
+        endpoint_step_up_secs=0.25,
+        endpoint_cutoff_window_secs=60.0,
+        **overrides,
+    )
+    return AdaptiveEndpointing(cfg, FakeVad())
+
+
+def test_clean_turns_step_down_to_the_minimum():
+    ep = _endpointing()
+    for _ in range(20):
+        ep.on_user_state("listening", "speaking")
+        ep.on_user_turn_committed()
+        ep.on_agent_state("speaking")  # our reply started, so the next speech is a new turn
+    assert ep.silence == 0.4
+    assert ep.vad.updates[-1] == 0.4
+    assert ep.cutoffs == 0
+
+
+def test_cutoffs_step_up_to_the_maximum():
+    ep = _endpointing()
+    for _ in range(10):
+        ep.on_user_turn_committed()
+        ep.on_user_state("listening", "speaking")  # resumed before we replied
+    assert ep.cutoffs == 10
+    assert ep.silence == 1.5
+    assert max(ep.vad.updates) == 1.5
+
+
+def test_step_down_stays_above_observed_pauses():
+    ep = _endpointing()
+    for pause in (0.8, 0.9, 0.85, 0.95):
+        ep.pauses.add(pause)
+    for _ in range(10):
+        ep.on_user_turn_committed()
+        ep.on_agent_state("speaking")
+    assert 0.8 <= ep.silence < 1.0
+
+
+def test_end_of_turn_probability_from_transcript():
+    assert AdaptiveEndpointing.end_of_turn_probability("what is my name?") == 0.9
+    assert AdaptiveEndpointing.end_of_turn_probability("so i wanted to") == 0.1
+    assert AdaptiveEndpointing.end_of_turn_probability("make it blue") == 0.7
+    assert AdaptiveEndpointing.end_of_turn_probability("") == 1.0
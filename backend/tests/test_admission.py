@@ -0,0 +1,72 @@
+import asyncio
+import dataclasses
+
+from agent import AdmissionController, Config
+
+
+def _controller(tmp_path, **overrides) -> AdmissionController:
+    cfg = dataclasses.replace(
+        Config(),
+        state_dir=str(tmp_path),
+        admission_max_hedra=1,
+        admission_max_clones=10,
+        admission_max_tts=10,
+        admission_poll_secs=0.01,
+        **overrides,
+    )
+    return AdmissionController(cfg)
+
+
+def test_queue_is_fifo_once_capacity_is_used(tmp_path):
+    admission = _controller(tmp_path)
+    assert admission.try_admit("a") == 0
+    assert admission.try_admit("b") == 1
+    assert admission.try_admit("c") == 2
+    assert admission.queue_length() == 2
+
+    # Capacity frees up, but only the head of the queue may take it
+    admission.release("a")
+    assert admission.try_admit("c") == 2
+    assert admission.try_admit("b") == 0
+    assert admission.try_admit("c") == 1
+
+
+def test_admitted_session_stays_admitted(tmp_path):
+    admission = _controller(tmp_path)
+    assert admission.try_admit("a") == 0
+    assert admission.try_admit("a") == 0
+
+
+def test_controllers_share_state_through_the_file(tmp_path):
+    first, second = _controller(tmp_path), _controller(tmp_path)
+    assert first.try_admit("a") == 0
+    assert second.try_admit("b") == 1
+
+
+def test_acquire_reports_positions_and_gets_admitted(tmp_path):
+    admission = _controller(tmp_path)
+    admission.try_admit("a")
+    positions = []
+
+    async def on_position(position: int) -> None:
+        positions.append(position)
+
+    async def main() -> bool:
+        waiter = asyncio.create_task(admission.acquire("b", on_position))
+        await asyncio.sleep(0.05)
+        admission.release("a")
+        return await waiter
+
+    assert asyncio.run(main())
+    assert positions == [1]
+
+
+def test_acquire_gives_up_and_leaves_the_queue(tmp_path):
+    admission = _controller(tmp_path, admission_max_wait_secs=0.05)
+    admission.try_admit("a")
+
+    async def on_position(position: int) -> None:
+        pass
+
+    assert not asyncio.run(admission.acquire("b", on_position))
+    assert admission.queue_length() == 0
@@ -0,0 +1,59 @@
+import asyncio
+
+from agent import SessionState
+
+
+def test_replacement_and_restart_leave_one_avatar(make_orchestrator):
+    orch = make_orchestrator(avatar_handover_timeout_secs=1.0)
+    orch.state.state = SessionState.AVATAR
+    started = []
+
+    async def start_avatar_session(avatar_id, identity):
+        await asyncio.sleep(0.01)
+        orch.avatar = object()
+        orch._avatar_identities.add(identity)
+        orch.avatar_identity = identity
+        started.append(identity)
+
+    async def wait_for_video(identity, timeout):
+        await asyncio.sleep(0.05)
+        return True
+
+    orch._start_avatar_session = start_avatar_session
+    orch.avatar_health.wait_for_video = wait_for_video
+
+    async def replace_soon():
+        await asyncio.sleep(0.005)  # while the restart is still starting its avatar
+        await orch._replace_avatar_session("video stalled")
+
+    async def main():
+        await start_avatar_session("a1", "hedra-avatar-a1")
+        await asyncio.gather(orch._restart_avatar_session(), replace_soon())
+
+    asyncio.run(main())
+    assert len(started) == 3
+    assert orch._avatar_identities == {started[-1]}
+    assert set(orch.room_service.removed) == set(started[:-1])
+
+
+def test_monitor_survives_a_failed_replacement(make_orchestrator):
+    orch = make_orchestrator(avatar_restart_backoff_secs=0.0)
+    orch.state.state = SessionState.AVATAR
+    orch.avatar_identity = "hedra-avatar-a1"
+    orch.avatar_health.stalled = lambda identity: True
+    calls = []
+
+    async def replace(reason):
+        calls.append(reason)
+        raise RuntimeError("room service unavailable")
+
+    orch._replace_avatar_session = replace
+
+    async def main():
+        monitor = asyncio.create_task(orch._monitor_avatar_health())
+        await asyncio.sleep(2.5)
+        assert not monitor.done()
+        monitor.cancel()
+
+    asyncio.run(main())
+    assert len(calls) >= 2
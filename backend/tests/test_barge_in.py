@@ -0,0 +1,59 @@
+import types
+
+import pytest
+
+from agent import BargeInMeter, Config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("agent.time.perf_counter", clock)
+    return clock
+
+
+def _barge_in(speaking=True):
+    health = types.SimpleNamespace(speaking=lambda identity: speaking)
+    return BargeInMeter(Config(barge_in_target_ms=200), health)
+
+
+def test_barge_in_measures_silence_and_ack(clock):
+    meter = _barge_in()
+    meter.start("hedra-avatar", 5.0)
+    meter.on_avatar_silence("other-avatar", 5.05)
+    meter.on_avatar_silence("hedra-avatar", 5.15)
+    meter.on_agent_state("listening", 5.3)
+    assert list(meter.to_silence.samples) == [pytest.approx(0.15)]
+    assert list(meter.to_ack.samples) == [pytest.approx(0.3)]
+    assert meter.over_target == 0
+
+
+def test_barge_in_over_target_and_early_pause(clock):
+    meter = _barge_in()
+    meter.start("hedra-avatar", 5.0)
+    meter.on_avatar_silence("hedra-avatar", 5.5)
+    meter.start("hedra-avatar", 6.0)
+    meter.on_avatar_silence("hedra-avatar", 5.9)  # paused just before the user spoke
+    assert list(meter.to_silence.samples) == [pytest.approx(0.5), 0.0]
+    assert meter.over_target == 1
+
+
+def test_barge_in_times_out_and_ignores_a_quiet_avatar(clock):
+    meter = _barge_in()
+    meter.start("hedra-avatar", 1.0)
+    clock.now = 4.5
+    stats = meter.stats()
+    assert (stats["barge_ins"], stats["timeouts"]) == (1, 1)
+
+    quiet = _barge_in(speaking=False)
+    quiet.start("hedra-avatar", 1.0)
+    quiet.on_avatar_silence("hedra-avatar", 1.1)
+    assert quiet.to_silence.count == 0
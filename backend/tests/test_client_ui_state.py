@@ -0,0 +1,79 @@
+import asyncio
+
+from agent import Assistant, ClientUiState
+
+
+def test_camera_is_unknown_until_reported_or_observed():
+    ui = ClientUiState()
+    assert ui.camera_active is None
+    ui.observe("camera_active", False)
+    assert ui.camera_active is False
+
+
+def test_stale_events_are_dropped_by_timestamp():
+    ui = ClientUiState()
+    assert ui.apply_event({"action": "camera_started", "timestamp": 1700000000500})
+    assert not ui.apply_event({"action": "camera_started", "timestamp": 1700000000100})
+    assert ui.camera_active is True
+
+
+def test_unknown_events_are_ignored():
+    ui = ClientUiState()
+    assert not ui.apply_event({"action": "camera_stopped", "timestamp": 1})
+    assert ui.camera_active is None
+
+
+def test_own_observations_always_apply():
+    ui = ClientUiState()
+    ui.apply_event({"action": "camera_started", "timestamp": 7})
+    ui.observe("camera_active", False)
+    assert ui.camera_active is False
+
+
+def _assistant(orch, camera_on_screen: bool):
+    orch.agent = Assistant(cfg=orch.cfg, is_alexa=True, room=None, cloner=None, orchestrator=orch)
+    orch.participants.primary_user = lambda: "user-1"
+    calls = []
+
+    async def rpc_call(method, payload=None, *, destination=None, timeout=None):
+        calls.append(method)
+        if method == "isCameraActive":
+            return "true" if camera_on_screen else "false"
+
+    async def no_monitor():
+        pass
+
+    orch.rpc.call = rpc_call
+    orch._monitor_avatar_creation = no_monitor
+    return calls
+
+
+def test_take_photo_probes_once_when_camera_state_is_unknown(make_orchestrator):
+    orch = make_orchestrator(deferred_tool_rpcs=False)
+    calls = _assistant(orch, camera_on_screen=True)
+
+    async def main():
+        reply = await orch.agent.take_photo(None)
+        await orch.tasks.aclose()
+        return reply
+
+    assert asyncio.run(main()).startswith("Perfect!")
+    assert calls == ["isCameraActive", "capturePhoto"]
+
+
+def test_second_capture_restarts_the_camera_the_first_one_stopped(make_orchestrator):
+    orch = make_orchestrator(deferred_tool_rpcs=True)
+    calls = _assistant(orch, camera_on_screen=False)
+    orch.ui.observe("camera_active", True)
+
+    async def main():
+        first = await orch.agent.take_photo(None)
+        await asyncio.sleep(0.01)  # the deferred capture completes
+        second = await orch.agent.take_photo(None)
+        await orch.tasks.aclose()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.startswith("Perfect!")
+    assert second.startswith("Let's start your camera first!")
+    assert calls == ["capturePhoto", "startCamera"]
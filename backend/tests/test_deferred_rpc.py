@@ -0,0 +1,60 @@
+import asyncio
+
+from agent import Assistant, FrontendRpcError, Msg
+
+
+def _wire(orch, rpc_call):
+    orch.agent = Assistant(cfg=orch.cfg, is_alexa=True, room=None, cloner=None, orchestrator=orch)
+    orch.participants.primary_user = lambda: "user-1"
+    orch.ui.observe("camera_active", True)
+    orch.rpc.call = rpc_call
+
+    async def no_monitor():
+        pass
+
+    orch._monitor_avatar_creation = no_monitor
+
+
+def test_acknowledge_then_fail_is_announced(make_orchestrator):
+    orch = make_orchestrator(deferred_tool_rpcs=True)
+
+    async def rpc_call(method, payload=None, *, destination=None, timeout=None):
+        await asyncio.sleep(0.01)
+        raise FrontendRpcError(method, "no response", timed_out=True)
+
+    _wire(orch, rpc_call)
+
+    async def main():
+        items_before = len(orch.agent.chat_ctx.items)
+        reply = await orch.agent.take_photo(None)
+        assert reply.startswith("Perfect!")  # acknowledged before the RPC finished
+        assert orch.speech.said == []
+        await asyncio.sleep(0.05)
+        assert len(orch.agent.chat_ctx.items) == items_before
+        await orch.tasks.aclose()
+
+    asyncio.run(main())
+    assert orch.speech.said == [
+        Msg.DEFERRED_ACTION_FAILED.format(description="capture the photo", reason="the screen didn't respond in time")
+    ]
+
+
+def test_success_stays_silent_and_leaves_the_context_alone(make_orchestrator):
+    orch = make_orchestrator(deferred_tool_rpcs=True)
+    calls = []
+
+    async def rpc_call(method, payload=None, *, destination=None, timeout=None):
+        calls.append((method, destination))
+
+    _wire(orch, rpc_call)
+
+    async def main():
+        items_before = len(orch.agent.chat_ctx.items)
+        await orch.agent.take_photo(None)
+        await asyncio.sleep(0.05)
+        assert len(orch.agent.chat_ctx.items) == items_before
+        await orch.tasks.aclose()
+
+    asyncio.run(main())
+    assert calls == [("capturePhoto", "user-1")]
+    assert orch.speech.said == []
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from agent import Assistant, IntentMatcher
+
+
+@pytest.mark.parametrize("transcript, alexa_mode, tool", [
+    ("Take my photo", True, "start_camera"),
+    ("ok, turn on the camera", True, "start_camera"),
+    ("Capture the photo now", True, "take_photo"),
+    ("cheese!", True, "take_photo"),
+    ("skip", True, "skip_photo"),
+    ("I want to describe an image", True, "describe_avatar"),
+    ("make me a new avatar", False, "generate_avatar"),
+    ("take my photo", False, None),
+    ("what's the weather like", True, None),
+    ("", True, None),
+])
+def test_match(transcript, alexa_mode, tool):
+    assert IntentMatcher().match(transcript, alexa_mode) == tool
+
+
+@pytest.mark.parametrize("transcript, tool", [
+    ("no, take my photo", "start_camera"),
+    ("No no, capture it", "take_photo"),
+    ("don't take my photo", None),
+    ("do not turn on the camera", None),
+    ("never capture a photo", None),
+    ("not yet, skip it later", None),
+])
+def test_negation(transcript, tool):
+    assert IntentMatcher().match(transcript, True) == tool
+
+
+def test_match_counts_finals_and_hits():
+    matcher = IntentMatcher()
+    matcher.match("take my photo", True)
+    matcher.match("hello", True)
+    stats = matcher.stats()
+    assert stats["finals"] == 2
+    assert stats["hits"] == {"start_camera": 1}
+    assert stats["hit_rate"] == 0.5
+
+
+def test_llm_call_takes_the_fast_path_result(make_orchestrator):
+    orch = make_orchestrator(deferred_tool_rpcs=False)
+    orch.agent = Assistant(cfg=orch.cfg, is_alexa=True, room=None, cloner=None, orchestrator=orch)
+    orch.participants.primary_user = lambda: "user-1"
+    calls = []
+
+    async def rpc_call(method, payload=None, *, destination=None, timeout=None):
+        await asyncio.sleep(0.01)
+        calls.append(method)
+
+    orch.rpc.call = rpc_call
+
+    async def main():
+        orch.agent.handle_final_transcript("no, take my photo")
+        reply = await orch.agent.start_camera(None)  # the LLM's own call for the same tool
+        await orch.tasks.aclose()
+        return reply
+
+    reply = asyncio.run(main())
+    assert reply.startswith("Great!")
+    assert calls == ["startCamera"]
+    assert orch.agent.intents.saved.count == 1
+    assert orch.agent._fast_path == {}
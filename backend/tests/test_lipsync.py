@@ -0,0 +1,133 @@
+import asyncio
+import types
+
+import numpy as np
+import pytest
+from livekit import rtc
+from livekit.agents.voice.io import AudioOutput
+
+from agent import LipSyncMeter, LipSyncProbe
+
+SAMPLE_RATE = 24000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAvatarOutput(AudioOutput):
+    def __init__(self):
+        super().__init__(label="FakeAvatar", sample_rate=SAMPLE_RATE)
+        self.frames = []
+
+    async def capture_frame(self, frame):
+        await super().capture_frame(frame)
+        self.frames.append(frame)
+
+    def flush(self):
+        super().flush()
+
+    def clear_buffer(self):
+        pass
+
+
+def _frame(amplitude: int, secs: float = 0.1) -> rtc.AudioFrame:
+    samples = int(SAMPLE_RATE * secs)
+    data = np.full(samples, amplitude, dtype=np.int16)
+    return rtc.AudioFrame(data=data.tobytes(), sample_rate=SAMPLE_RATE, num_channels=1, samples_per_channel=samples)
+
+
+def _health(drift_ms=None):
+    return types.SimpleNamespace(snapshot=lambda identity: {"av_drift_ms": drift_ms})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("agent.time.perf_counter", clock)
+    return clock
+
+
+def _meter(drift_ms=None):
+    meter = LipSyncMeter(_health(drift_ms))
+    meter.avatar_id, meter.identity = "avatar-1", "hedra-avatar"
+    return meter
+
+
+def test_probe_expects_onset_when_the_voiced_frame_is_captured(clock):
+    meter = _meter()
+    avatar = FakeAvatarOutput()
+    probe = LipSyncProbe(meter, avatar)
+
+    async def main():
+        # TTS pushes a second of leading silence almost at once, then the voiced audio
+        for i in range(10):
+            clock.now = 10.0 + i * 0.001
+            await probe.capture_frame(_frame(0))
+        clock.now = 10.02
+        await probe.capture_frame(_frame(2000))
+        clock.now = 10.03
+        await probe.capture_frame(_frame(2000))
+        probe.flush()
+
+    asyncio.run(main())
+    assert len(avatar.frames) == 12
+    assert list(meter.pending) == [10.02]
+
+
+def test_probe_reports_one_onset_per_segment(clock):
+    meter = _meter()
+    probe = LipSyncProbe(meter, FakeAvatarOutput())
+
+    async def main():
+        for at in (1.0, 2.0):
+            clock.now = at
+            await probe.capture_frame(_frame(2000))
+            clock.now = at + 0.1
+            await probe.capture_frame(_frame(2000))
+            probe.flush()
+
+    asyncio.run(main())
+    assert list(meter.pending) == [1.0, 2.0]
+
+
+def test_probe_clear_buffer_drops_pending_onsets(clock):
+    meter = _meter()
+    probe = LipSyncProbe(meter, FakeAvatarOutput())
+
+    async def main():
+        clock.now = 1.0
+        await probe.capture_frame(_frame(2000))
+        probe.clear_buffer()
+        clock.now = 1.5
+        await probe.capture_frame(_frame(2000))
+
+    asyncio.run(main())
+    assert list(meter.pending) == [1.5]
+
+
+def test_meter_pairs_onsets_in_order_and_records_drift():
+    meter = _meter(drift_ms=-40.0)
+    meter.expect_onset(1.0)
+    meter.expect_onset(2.0)
+    meter.on_avatar_onset("other-avatar", 1.1)  # not ours
+    meter.on_avatar_onset("hedra-avatar", 1.25)
+    meter.on_avatar_onset("hedra-avatar", 2.5)
+    assert list(meter.latency.samples) == [0.25, 0.5]
+    assert list(meter.offset.samples) == [0.04, 0.04]
+    assert meter.stats()["by_avatar"]["avatar-1"]["latency"]["count"] == 2
+
+
+def test_meter_skips_stale_expectations_and_early_onsets():
+    meter = _meter()
+    meter.expect_onset(1.0)
+    meter.on_avatar_onset("hedra-avatar", 0.5)  # before anything we sent could play
+    assert meter.latency.count == 0
+    meter.expect_onset(8.0)
+    meter.on_avatar_onset("hedra-avatar", 8.3)  # 1.0 is past the match window
+    assert meter.unmatched == 1
+    assert list(meter.latency.samples) == [pytest.approx(0.3)]
@@ -0,0 +1,96 @@
+import asyncio
+import types
+
+from agent import ModeStateMachine, Msg, SessionState
+
+
+def test_only_allowed_transitions_apply():
+    machine = ModeStateMachine()
+    assert not machine.transition(SessionState.AVATAR, "skip_reveal")
+    assert machine.state == SessionState.ALEXA
+
+    assert machine.transition(SessionState.REVEALING, "avatar_created")
+    assert machine.transition(SessionState.AVATAR, "avatar_ready")
+    assert not machine.transition(SessionState.REVEALING, "avatar_created")
+    assert machine.transition(SessionState.ALEXA, "user_request")
+    assert [(t["from"], t["to"]) for t in machine.transitions] == [
+        (SessionState.ALEXA, SessionState.REVEALING),
+        (SessionState.REVEALING, SessionState.AVATAR),
+        (SessionState.AVATAR, SessionState.ALEXA),
+    ]
+
+
+def test_on_transition_sees_each_committed_record():
+    machine = ModeStateMachine()
+    seen = []
+    machine.on_transition = seen.append
+    machine.transition(SessionState.AVATAR, "skip_reveal")
+    machine.transition(SessionState.REVEALING, "avatar_created")
+    assert [r["trigger"] for r in seen] == ["avatar_created"]
+
+
+def test_claims_are_once_per_reveal():
+    machine = ModeStateMachine()
+    machine.transition(SessionState.REVEALING, "avatar_created")
+    assert machine.claim("avatar_greeting")
+    assert not machine.claim("avatar_greeting")
+
+    machine.transition(SessionState.ALEXA, "reveal_failed")
+    machine.transition(SessionState.REVEALING, "avatar_created")
+    assert machine.epoch == 2
+    assert machine.claim("avatar_greeting")
+
+
+def test_second_trigger_waits_and_sees_new_state():
+    machine = ModeStateMachine()
+    revealed = []
+
+    async def reveal(trigger: str) -> None:
+        async with machine.lock:
+            if machine.state != SessionState.ALEXA:
+                return
+            machine.transition(SessionState.REVEALING, trigger)
+            await asyncio.sleep(0.01)  # slow reveal work while holding the lock
+            machine.transition(SessionState.AVATAR, trigger)
+            revealed.append(trigger)
+
+    async def main() -> None:
+        await asyncio.gather(reveal("packet"), reveal("poll"))
+
+    asyncio.run(main())
+    assert revealed == ["packet"]
+    assert machine.state == SessionState.AVATAR
+    assert machine.epoch == 1
+
+
+def test_concurrent_reveals_clone_and_start_once(make_orchestrator):
+    orch = make_orchestrator(snapshots_enabled=False)
+    clones, sessions, voices = [], [], []
+
+    async def create_final_voice_clone():
+        await asyncio.sleep(0.01)
+        clones.append("clone-1")
+        return "clone-1"
+
+    async def start_avatar_session(avatar_id, identity):
+        await asyncio.sleep(0.01)
+        sessions.append(avatar_id)
+
+    async def presynthesize(text):
+        return None
+
+    orch.cloner = types.SimpleNamespace(create_final_voice_clone=create_final_voice_clone)
+    orch._start_avatar_session = start_avatar_session
+    orch._presynthesize = presynthesize
+    orch._set_tts = voices.append
+
+    async def main():
+        await asyncio.gather(orch._switch_mode("avatar", "packet"), orch._switch_mode("avatar", "poll"))
+
+    asyncio.run(main())
+    assert clones == ["clone-1"]
+    assert len(sessions) == 1
+    assert voices == ["clone-1"]
+    assert orch.speech.said == [Msg.AVATAR_GREETING]
+    assert orch.state.state == SessionState.AVATAR
+    assert orch.state.epoch == 1
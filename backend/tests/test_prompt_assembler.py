@@ -0,0 +1,89 @@
+import asyncio
+import dataclasses
+
+import pytest
+from livekit.agents.llm import ChatContext, FunctionCall, FunctionCallOutput
+
+import agent
+from agent import Config, PromptAssembler
+
+WORDS = "word " * 79  # 396 chars: 100 tokens with the character estimate, 104 per message
+
+
+@pytest.fixture
+def assembler(monkeypatch) -> PromptAssembler:
+    monkeypatch.setitem(agent._prompt_encoding, "encoding", None)  # deterministic character estimate
+    cfg = dataclasses.replace(Config(), prompt_history_max_tokens=500, prompt_history_keep_tokens=300)
+    return PromptAssembler(cfg)
+
+
+def _chat(turns: int) -> ChatContext:
+    ctx = ChatContext.empty()
+    ctx.add_message(role="system", content="instructions")
+    for n in range(turns):
+        ctx.add_message(role="user", content=f"user {n} {WORDS}")
+        ctx.add_message(role="assistant", content=f"assistant {n} {WORDS}")
+    return ctx
+
+
+def test_assemble_within_budget_only_appends_persona_and_task(assembler):
+    chat = _chat(2)
+    assembler.task = "Ask for a description."
+    ctx = assembler.assemble(chat, "friendly")
+    assert [i.id for i in ctx.items[:-1]] == [i.id for i in chat.items]
+    assert ctx.items[-1].role == "system"
+    assert "friendly" in ctx.items[-1].text_content and "Ask for a description." in ctx.items[-1].text_content
+    assert len(chat.items) == 5  # the agent's own context is left alone
+    assert assembler.trimmed_requests == 0
+
+
+def test_assemble_over_the_cap_cuts_at_a_user_turn(assembler):
+    ctx = assembler.assemble(_chat(5), "friendly")
+    assert ctx.items[0].role == "system"  # instructions stay
+    history = ctx.items[1:-1]
+    assert history[0].role == "user"
+    assert history[-1].text_content.startswith("assistant 4")
+    assert sum(assembler.item_tokens(i) for i in history) <= 500
+    assert assembler.trimmed_requests == 1
+
+
+def test_cut_keeps_the_latest_exchange_even_when_it_alone_is_over(assembler):
+    chat = _chat(1)
+    history = [i for i in chat.items if i.role != "system"]
+    assert assembler._cut(history, keep_tokens=10) == 0
+
+
+def test_cut_never_orphans_a_tool_result(assembler):
+    chat = _chat(2)
+    chat.items.append(FunctionCall(call_id="c1", name="take_photo", arguments="{}"))
+    chat.items.append(FunctionCallOutput(call_id="c1", name="take_photo", output=WORDS * 2, is_error=False))
+    chat.add_message(role="assistant", content="done")
+    history = [i for i in chat.items if i.type != "message" or i.role != "system"]
+    cut = assembler._cut(history, keep_tokens=300)
+    assert history[cut].type == "message" and history[cut].role == "user"
+
+
+def test_compact_folds_old_turns_into_a_summary(assembler, monkeypatch):
+    class FakeAgent:
+        def __init__(self, chat_ctx):
+            self.chat_ctx = chat_ctx
+
+        async def update_chat_ctx(self, ctx):
+            self.chat_ctx = ctx
+
+    async def summarize(transcript: str) -> str:
+        assert "user 0" in transcript and "user 4" not in transcript
+        return "They talked about avatars."
+
+    monkeypatch.setattr(assembler, "_summarize", summarize)
+    fake = FakeAgent(_chat(5))
+    asyncio.run(assembler.compact(fake))
+
+    items = fake.chat_ctx.items
+    assert items[0].text_content == "instructions"
+    assert items[1].id == PromptAssembler.SUMMARY_ID
+    assert items[2].role == "user"
+    assert items[-1].text_content.startswith("assistant 4")
+    assert "They talked about avatars." in items[1].text_content
+    assert assembler.compactions == 1
+    assert assembler.summarized_items == len(_chat(5).items) - len(items) + 1
@@ -0,0 +1,82 @@
+import asyncio
+import types
+
+from agent import Msg, SessionSnapshotStore, SessionState, VoiceCloner
+
+
+def test_save_and_load_round_trip(make_orchestrator):
+    store = SessionSnapshotStore(make_orchestrator().cfg)
+    store.save("room-a", "job-1", {"mode": SessionState.AVATAR, "voice_ids": ["v1"]})
+    snapshot = store.load("room-a")
+    assert snapshot["mode"] == SessionState.AVATAR
+    assert snapshot["voice_ids"] == ["v1"]
+    assert snapshot["job_id"] == "job-1"
+    assert store.load("room-b") is None
+    assert store.writes == 1
+
+
+def test_later_save_replaces_the_room_snapshot(make_orchestrator):
+    store = SessionSnapshotStore(make_orchestrator().cfg)
+    store.save("room-a", "job-1", {"mode": SessionState.ALEXA})
+    store.save("room-a", "job-2", {"mode": SessionState.AVATAR})
+    snapshot = store.load("room-a")
+    assert (snapshot["job_id"], snapshot["mode"]) == ("job-2", SessionState.AVATAR)
+
+
+def test_expired_snapshots_are_pruned(make_orchestrator, monkeypatch):
+    store = SessionSnapshotStore(make_orchestrator(snapshot_max_age_secs=60).cfg)
+    monkeypatch.setattr("agent.time.time", lambda: 1000.0)
+    store.save("room-a", "job-1", {"mode": SessionState.ALEXA})
+    monkeypatch.setattr("agent.time.time", lambda: 1059.0)
+    assert store.load("room-a") is not None
+    monkeypatch.setattr("agent.time.time", lambda: 1061.0)
+    assert store.load("room-a") is None
+    monkeypatch.setattr("agent.time.time", lambda: 1000.0)
+    assert store.load("room-a") is None  # the row was deleted, not just skipped
+
+
+def test_delete_leaves_a_newer_jobs_snapshot(make_orchestrator):
+    store = SessionSnapshotStore(make_orchestrator().cfg)
+    store.save("room-a", "job-2", {"mode": SessionState.ALEXA})
+    store.delete("room-a", "job-1")
+    assert store.load("room-a") is not None
+    store.delete("room-a", "job-2")
+    assert store.load("room-a") is None
+
+
+def _restorable(make_orchestrator):
+    orch = make_orchestrator()
+    orch.ctx.shutdown = lambda reason="": None
+    orch.cloner = VoiceCloner(orch.cfg, orch.ctx.room, orch)
+    deleted = []
+    orch.cloner.client = types.SimpleNamespace(
+        voices=types.SimpleNamespace(delete=lambda voice_id: deleted.append(voice_id)),
+    )
+    return orch, deleted
+
+
+def test_restore_adopts_the_dead_jobs_voices_and_deletes_them_on_close(make_orchestrator):
+    orch, deleted = _restorable(make_orchestrator)
+    snapshot = {"job_id": "job-dead", "mode": SessionState.ALEXA, "voice_ids": ["v1", "v2"]}
+
+    async def main():
+        await orch._restore_snapshot(snapshot)
+        assert orch.cloner.created_voice_ids == ["v1", "v2"]
+        await orch._aclose_impl("test")
+
+    asyncio.run(main())
+    assert orch.restored_from == "job-dead"
+    assert sorted(deleted) == ["v1", "v2"]
+    assert orch.cloner.created_voice_ids == []
+
+
+def test_restore_skips_the_onboarding_greeting(make_orchestrator):
+    orch, _ = _restorable(make_orchestrator)
+
+    async def main():
+        await orch._restore_snapshot({"job_id": "job-dead", "mode": SessionState.ALEXA})
+        await orch._alexa_greeting()
+        await orch.tasks.aclose()
+
+    asyncio.run(main())
+    assert orch.speech.said == [Msg.SESSION_RESTORED]
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+from livekit.agents.metrics import EOUMetrics
+
+from agent import SpeculationTracker
+
+
+def _created(tracker, speech_id, source="generate_reply", user_initiated=True):
+    tracker.on_speech_created(SimpleNamespace(
+        speech_handle=SimpleNamespace(id=speech_id), source=source, user_initiated=user_initiated,
+    ))
+
+
+def _eou(speech_id, decided_at):
+    return EOUMetrics(
+        timestamp=decided_at + 0.2, end_of_utterance_delay=0.5, transcription_delay=0.1,
+        on_user_turn_completed_delay=0.2, last_speaking_time=decided_at - 0.5, speech_id=speech_id,
+    )
+
+
+def _turn(tracker, monkeypatch, created, chosen, decided_at=100.0):
+    """One user turn: `created` is [(speech_id, created_at, source)], `chosen` the reply used."""
+    tracker.on_user_state("speaking")
+    for speech_id, at, source in created:
+        monkeypatch.setattr("agent.time.time", lambda at=at: at)
+        _created(tracker, speech_id, source)
+    tracker.on_eou_metrics(_eou(chosen, decided_at))
+
+
+def test_hit_records_lead_time(monkeypatch):
+    tracker = SpeculationTracker()
+    _turn(tracker, monkeypatch, [("s1", 99.25, "generate_reply")], chosen="s1")
+    stats = tracker.stats()
+    assert (stats["turns"], stats["started"], stats["speculated_turns"], stats["hits"]) == (1, 1, 1, 1)
+    assert stats["hit_rate"] == 1.0
+    assert list(tracker.lead.samples) == [0.75]
+
+
+def test_miss_when_the_turn_used_a_fresh_reply(monkeypatch):
+    tracker = SpeculationTracker()
+    # The speculative s1 was cancelled; s2 was generated after the decision
+    _turn(tracker, monkeypatch, [("s1", 99.0, "generate_reply"), ("s2", 100.1, "generate_reply")], chosen="s2")
+    stats = tracker.stats()
+    assert (stats["turns"], stats["started"], stats["speculated_turns"], stats["hits"]) == (1, 1, 1, 0)
+    assert stats["hit_rate"] == 0.0
+
+
+def test_turn_without_speculation(monkeypatch):
+    tracker = SpeculationTracker()
+    _turn(tracker, monkeypatch, [("s1", 100.1, "generate_reply")], chosen="s1")
+    stats = tracker.stats()
+    assert (stats["turns"], stats["started"], stats["speculated_turns"]) == (1, 0, 0)
+
+
+def test_replies_outside_a_user_turn_are_not_counted(monkeypatch):
+    tracker = SpeculationTracker()
+    monkeypatch.setattr("agent.time.time", lambda: 99.0)
+    _created(tracker, "greeting")
+    tracker.on_eou_metrics(_eou("s1", 100.0))
+    assert tracker.stats()["started"] == 0
+
+
+def test_announcements_and_own_replies_during_the_turn_are_not_speculative(monkeypatch):
+    tracker = SpeculationTracker()
+    tracker.on_user_state("speaking")
+    monkeypatch.setattr("agent.time.time", lambda: 99.0)
+    # An announcement (e.g. a deferred RPC failure) released while the user talks
+    _created(tracker, "failure", source="say")
+    # A reply our own code asked for (e.g. the return-to-Alexa greeting)
+    _created(tracker, "own")
+    tracker.ignore("own")
+    # A realtime-model generation the session did not start for this turn
+    _created(tracker, "server", user_initiated=False)
+    _created(tracker, "s1")
+    tracker.on_eou_metrics(_eou("s1", 100.0))
+    stats = tracker.stats()
+    assert (stats["started"], stats["speculated_turns"], stats["hits"]) == (1, 1, 1)
+
+
+def test_hit_rate_over_several_turns(monkeypatch):
+    tracker = SpeculationTracker()
+    _turn(tracker, monkeypatch, [("a", 99.0, "generate_reply")], chosen="a")
+    _turn(tracker, monkeypatch, [("b", 199.0, "generate_reply")], chosen="c", decided_at=200.0)
+    _turn(tracker, monkeypatch, [], chosen="d", decided_at=300.0)
+    stats = tracker.stats()
+    assert (stats["turns"], stats["speculated_turns"], stats["hits"]) == (3, 2, 1)
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,136 @@
+import asyncio
+
+from agent import SpeechPriority, SpeechScheduler
+
+
+class FakeHandle:
+    def __init__(self, text: str, allow_interruptions: bool = True):
+        self.text = text
+        self.allow_interruptions = allow_interruptions
+        self.interrupted = False
+
+    def interrupt(self) -> None:
+        self.interrupted = True
+
+    def done(self) -> bool:
+        return True
+
+    async def wait_for_playout(self) -> None:
+        pass
+
+    def __await__(self):
+        return self.wait_for_playout().__await__()
+
+
+class FakeSession:
+    def __init__(self):
+        self.current_speech = None
+        self.agent_state = "listening"
+        self.user_state = "listening"
+        self.said = []
+
+    def say(self, text: str, **kwargs) -> FakeHandle:
+        self.said.append(text)
+        return FakeHandle(text, kwargs.get("allow_interruptions", True))
+
+
+async def _drain(scheduler: SpeechScheduler) -> None:
+    runner = asyncio.create_task(scheduler.run())
+    for _ in range(20):
+        await asyncio.sleep(0)
+    runner.cancel()
+
+
+def test_highest_priority_first_then_fifo():
+    async def main():
+        session = FakeSession()
+        scheduler = SpeechScheduler(session, max_queue=8)
+        scheduler.submit("first normal")
+        scheduler.submit("low", priority=SpeechPriority.LOW)
+        scheduler.submit("high", priority=SpeechPriority.HIGH)
+        scheduler.submit("second normal")
+        await _drain(scheduler)
+        return session.said
+
+    assert asyncio.run(main()) == ["high", "first normal", "second normal", "low"]
+
+
+def test_waits_while_the_conversation_is_busy():
+    async def main():
+        session = FakeSession()
+        session.user_state = "speaking"
+        scheduler = SpeechScheduler(session, max_queue=8)
+        scheduler.submit("later")
+        await _drain(scheduler)
+        return session.said
+
+    assert asyncio.run(main()) == []
+
+
+def test_duplicate_text_is_queued_once_and_keys_supersede():
+    async def main():
+        session = FakeSession()
+        scheduler = SpeechScheduler(session, max_queue=8)
+        first = scheduler.submit("same")
+        assert scheduler.submit("same") is first
+        replaced = scheduler.submit("You're number 3 in line.", priority=SpeechPriority.LOW, key="queue_position")
+        scheduler.submit("You're number 2 in line.", priority=SpeechPriority.LOW, key="queue_position")
+        assert await replaced is None
+        await _drain(scheduler)
+        return session.said, scheduler.counts
+
+    said, counts = asyncio.run(main())
+    assert said == ["same", "You're number 2 in line."]
+    assert counts["deduplicated"] == 1
+    assert counts["superseded"] == 1
+
+
+def test_full_queue_sheds_least_important():
+    async def main():
+        session = FakeSession()
+        scheduler = SpeechScheduler(session, max_queue=2)
+        low = scheduler.submit("low", priority=SpeechPriority.LOW)
+        scheduler.submit("normal")
+        scheduler.submit("high", priority=SpeechPriority.HIGH)
+        assert await low is None
+        # A newcomer less important than everything queued is the one shed
+        assert await scheduler.submit("another low", priority=SpeechPriority.LOW) is None
+        await _drain(scheduler)
+        return session.said, scheduler.counts
+
+    said, counts = asyncio.run(main())
+    assert said == ["high", "normal"]
+    assert counts["overflow"] == 2
+
+
+def test_stale_and_user_turn_drops():
+    async def main():
+        session = FakeSession()
+        session.agent_state = "speaking"
+        scheduler = SpeechScheduler(session, max_queue=8)
+        expired = scheduler.submit("expired", max_age=0.0)
+        chatter = scheduler.submit("chatter", priority=SpeechPriority.LOW)
+        await asyncio.sleep(0.01)
+        scheduler.on_user_turn()
+        scheduler.submit("kept")
+        return await expired, await chatter, [e["text"] for e in scheduler.pending]
+
+    expired, chatter, pending = asyncio.run(main())
+    assert expired is None and chatter is None
+    assert pending == ["kept"]
+
+
+def test_urgent_interrupts_and_bypasses_the_queue():
+    async def main():
+        session = FakeSession()
+        session.agent_state = "speaking"
+        session.current_speech = FakeHandle("reply")
+        scheduler = SpeechScheduler(session, max_queue=8)
+        scheduler.submit("queued")
+        handle = await scheduler.submit("draining", priority=SpeechPriority.URGENT)
+        return session, handle
+
+    session, handle = asyncio.run(main())
+    assert session.current_speech.interrupted
+    assert session.said == ["draining"]
+    assert handle.text == "draining"
@@ -0,0 +1,71 @@
+import dataclasses
+import threading
+
+import numpy as np
+
+import agent
+from agent import BatchedSileroVAD, SharedVadBatcher, load_vad, silero, silero_onnx
+
+SAMPLE_RATE = 16000
+WINDOW = 512
+
+
+def _audio(seed: int, secs: float = 2.0) -> np.ndarray:
+    """Noise with tone bursts, so the probabilities move between speech and silence."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(SAMPLE_RATE * secs)) / SAMPLE_RATE
+    bursts = (np.sin(2 * np.pi * 3 * t) > 0).astype(np.float32)
+    tone = 0.5 * np.sin(2 * np.pi * 220 * t) * np.sin(2 * np.pi * 5 * t) * bursts
+    return (tone + 0.02 * rng.standard_normal(t.size)).astype(np.float32)
+
+
+def _windows(audio: np.ndarray):
+    return [audio[i:i + WINDOW] for i in range(0, audio.size - WINDOW + 1, WINDOW)]
+
+
+def _unbatched(audio: np.ndarray) -> list:
+    """One window at a time through the same model, carrying context and RNN state."""
+    session = silero_onnx.new_inference_session(force_cpu=True)
+    sr = np.array(SAMPLE_RATE, dtype=np.int64)
+    context = np.zeros((1, 64), dtype=np.float32)
+    state = np.zeros((2, 1, 128), dtype=np.float32)
+    probs = []
+    for window in _windows(audio):
+        x = np.concatenate([context, window[None, :]], axis=1)
+        out, state = session.run(None, {"input": x, "state": state, "sr": sr})
+        context = x[:, -64:]
+        probs.append(float(out[0, 0]))
+    return probs
+
+
+def test_batched_probabilities_match_unbatched():
+    clips = [_audio(seed) for seed in range(3)]
+    batcher = SharedVadBatcher(SAMPLE_RATE, max_batch=len(clips), max_wait_secs=0.05)
+    models = [batcher.model() for _ in clips]
+    results = [[] for _ in clips]
+
+    def run(i: int) -> None:
+        results[i] = [models[i](w) for w in _windows(clips[i])]
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(clips))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert batcher.windows == sum(len(r) for r in results)
+    assert batcher.batches < batcher.windows  # windows from different streams shared a run
+    for clip, batched in zip(clips, results):
+        np.testing.assert_allclose(batched, _unbatched(clip), atol=1e-5)
+
+
+def test_load_vad_is_opt_in_and_checks_the_plugin_version(monkeypatch):
+    cfg = dataclasses.replace(agent.Config(), vad_batching=False)
+    assert not isinstance(load_vad(cfg, min_silence_duration=0.5, min_speech_duration=0.1), BatchedSileroVAD)
+
+    cfg = dataclasses.replace(cfg, vad_batching=True)
+    assert isinstance(load_vad(cfg, min_silence_duration=0.5, min_speech_duration=0.1), BatchedSileroVAD)
+
+    monkeypatch.setattr(agent, "SILERO_VERSION", "99.0.0")
+    vad = load_vad(cfg, min_silence_duration=0.5, min_speech_duration=0.1)
+    assert isinstance(vad, silero.VAD) and not isinstance(vad, BatchedSileroVAD)
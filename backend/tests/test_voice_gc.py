@@ -0,0 +1,105 @@
+import dataclasses
+import time
+import types
+
+import pytest
+
+import agent
+from agent import Config, SessionRegistry, VoiceCloner, VoiceGarbageCollector
+
+HOUR = 3600
+
+
+def _voice(voice_id: str, age_secs: float, name: str = None):
+    return types.SimpleNamespace(
+        voice_id=voice_id,
+        name=name or f"{VoiceCloner.FINAL_LABEL} ({voice_id})",
+        created_at_unix=int(time.time() - age_secs),
+    )
+
+
+class FakeVoices:
+    def __init__(self, voices, page_size: int = 2, fail=()):
+        self.voices = voices
+        self.page_size = page_size
+        self.fail = set(fail)
+        self.deleted = []
+
+    def search(self, *, search, voice_type, page_size, next_page_token):
+        start = int(next_page_token or 0)
+        end = start + self.page_size
+        return types.SimpleNamespace(
+            voices=self.voices[start:end],
+            has_more=end < len(self.voices),
+            next_page_token=str(end),
+        )
+
+    def delete(self, *, voice_id):
+        if voice_id in self.fail:
+            raise RuntimeError("rate limited")
+        self.deleted.append(voice_id)
+
+
+@pytest.fixture
+def gc_factory(tmp_path, monkeypatch):
+    pauses = []
+    monkeypatch.setattr(agent.time, "sleep", pauses.append)
+
+    def make(voices, dry_run=False, live=(), **overrides):
+        cfg = dataclasses.replace(
+            Config(), state_dir=str(tmp_path), voice_gc_dry_run=dry_run, voice_gc_min_age_secs=HOUR,
+            voice_gc_batch_size=2, voice_gc_batch_pause_secs=1.5, **overrides,
+        )
+        SessionRegistry(cfg).publish("live-session", {"voice_ids": list(live)})
+        gc = VoiceGarbageCollector(cfg)
+        gc.client = types.SimpleNamespace(voices=voices)
+        return gc
+
+    make.pauses = pauses
+    return make
+
+
+def test_classifies_live_too_young_and_orphaned(gc_factory):
+    voices = FakeVoices([
+        _voice("live", 2 * HOUR),
+        _voice("young", 60),
+        _voice("orphan", 2 * HOUR),
+        _voice("other", 2 * HOUR, name="Someone's own voice"),
+    ])
+    run = gc_factory(voices, live=["live"]).run_once()
+    assert run["scanned"] == 3  # the voice without our label is never considered
+    assert (run["live"], run["too_young"], run["orphans"], run["deleted"]) == (1, 1, 1, 1)
+    assert voices.deleted == ["orphan"]
+
+
+def test_dry_run_is_the_default():
+    assert Config.voice_gc_dry_run is True
+
+
+def test_dry_run_reports_without_deleting(gc_factory):
+    voices = FakeVoices([_voice("orphan", 2 * HOUR)])
+    run = gc_factory(voices, dry_run=True).run_once()
+    assert run["orphans"] == 1 and run["deleted"] == 0
+    assert voices.deleted == []
+
+
+def test_deletes_in_batches_with_pauses_and_cap(gc_factory):
+    voices = FakeVoices([_voice(f"o{i}", 2 * HOUR) for i in range(7)], fail={"o1"})
+    run = gc_factory(voices, voice_gc_max_per_run=5).run_once()
+    assert run["orphans"] == 5
+    assert voices.deleted == ["o0", "o2", "o3", "o4"]
+    assert run["failed"] == 1
+    assert gc_factory.pauses == [1.5, 1.5]  # three batches of at most two
+
+
+def test_voice_claimed_after_listing_is_spared(gc_factory, monkeypatch):
+    voices = FakeVoices([_voice("o0", 2 * HOUR), _voice("o1", 2 * HOUR), _voice("o2", 2 * HOUR)])
+    gc = gc_factory(voices)
+
+    def claim_during_pause(secs):
+        SessionRegistry(gc.cfg).publish("new-session", {"voice_ids": ["o2"]})
+
+    monkeypatch.setattr(agent.time, "sleep", claim_during_pause)
+    run = gc.run_once()
+    assert voices.deleted == ["o0", "o1"]
+    assert run["live"] == 1
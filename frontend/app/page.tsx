@@ -43,6 +43,7 @@ export default function Page() {
   const [showAlexaTransition, setShowAlexaTransition] = useState(false);
   const [showAvatarAppears, setShowAvatarAppears] = useState(false);
   const [voiceCloningEnabled, setVoiceCloningEnabled] = useState(false);
+  const [queueMessage, setQueueMessage] = useState<string | null>(null);
   const avatarSetup = useAvatarSetup(voiceCloningEnabled);
   const photoCaptureRef = useRef<PhotoCaptureRef | null>(null);
 
@@ -151,8 +152,8 @@ export default function Page() {
 
       room.registerRpcMethod("isCameraActive", async () => {
         console.log("📷 RPC Method Called: isCameraActive");
-        // Check if camera is available and ready
-        const isActive = photoCaptureRef.current?.startCamera !== undefined;
+        // Whether the camera is streaming right now (it stops after a capture)
+        const isActive = photoCaptureRef.current?.isStreaming() ?? false;
         console.log("📷 Camera active status:", isActive);
         return JSON.stringify(isActive ? "true" : "false");
       });
@@ -255,6 +256,11 @@ export default function Page() {
               avatarSetup.handleSkipPhoto();
               break;
 
+            case "queue_status":
+              // Waiting for capacity before the agent joins; null once admitted
+              setQueueMessage(message.message || null);
+              break;
+
             case "generate_avatar":
               // Trigger avatar generation with the provided prompt
               console.log("🎨 Triggering avatar generation with prompt:", message.prompt);
@@ -441,6 +447,22 @@ export default function Page() {
         {/* Floating Loading Avatar */}
         <FloatingLoadingAvatar />
 
+        {/* Capacity queue notice */}
+        <AnimatePresence>
+          {queueMessage && (
+            <motion.div
+              key="queue-notification"
+              initial={{ opacity: 0, y: -50 }}
+              animate={{ opacity: 1, y: 0 }}
+              exit={{ opacity: 0, y: -50 }}
+              transition={{ duration: 0.3 }}
+              className="fixed top-4 left-1/2 -translate-x-1/2 z-50 bg-black/80 backdrop-blur-sm text-white px-6 py-3 rounded-lg shadow-lg"
+            >
+              <p className="text-sm">{queueMessage}</p>
+            </motion.div>
+          )}
+        </AnimatePresence>
+
         {/* Error notification */}
         <AnimatePresence>
           {avatarSetup.state.error && (
@@ -15,6 +15,7 @@ export interface PhotoCaptureRef {
   startCamera: () => void;
   capturePhoto: () => void;
   retakePhoto: () => void;
+  isStreaming: () => boolean;
 }
 
 const PhotoCapture = forwardRef<PhotoCaptureRef | null, PhotoCaptureProps>(({ onPhotoCapture, onStateChange, onShowAlexaTransition }, ref) => {
@@ -171,8 +172,9 @@ const PhotoCapture = forwardRef<PhotoCaptureRef | null, PhotoCaptureProps>(({ on
   useImperativeHandle(ref, () => ({
     startCamera,
     capturePhoto,
-    retakePhoto
-  }), [startCamera, capturePhoto, retakePhoto]);
+    retakePhoto,
+    isStreaming: () => isStreaming
+  }), [startCamera, capturePhoto, retakePhoto, isStreaming]);
 
   // Cleanup on unmount
   React.useEffect(() => {